@@ -0,0 +1,272 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_CACHE_PATH = Path.home() / ".ai_file_organizer_ai_cache.db"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AIError(Exception):
+    """Raised when the AI service cannot produce a response"""
+
+
+def cache_key(model, system, prompt, context):
+    """Stable hash of everything that determines a response"""
+    payload = json.dumps([model, system, prompt, context], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-level response cache: an in-memory LRU in front of a SQLite table"""
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, memory_size=256, max_age=7 * 24 * 3600):
+        self.memory_size = memory_size
+        self.max_age = max_age
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path is not None:
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS responses ("
+                               "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            if self._conn is None:
+                return None
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?",
+                                     (key,)).fetchone()
+            if row is None or (self.max_age and time.time() - row[1] > self.max_age):
+                return None
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, key, response):
+        with self._lock:
+            self._remember(key, response)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                                       (key, response, time.time()))
+
+    def _remember(self, key, response):
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class AIClient:
+    """Shared client for chat-completion style AI services.
+
+    - requests run on a small worker pool, never on the caller's (Tk) thread,
+    - one pooled requests.Session keeps HTTP connections alive between calls,
+    - identical requests in flight at the same time are coalesced into one call
+      (different prompts are never batched together: the chat-completions API
+      takes one conversation per call, so each distinct request is its own POST),
+    - timeouts and retries with exponential backoff on transient failures,
+    - responses are cached by a hash of model, system prompt, prompt and context,
+    - chat answers can be streamed piece by piece as they are generated.
+
+    Any server that speaks the OpenAI chat-completions format works, which is
+    also how the client is exercised against a local stub server.
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, api_key=None, model=DEFAULT_MODEL,
+                 timeout=30, retries=3, backoff=0.5, max_workers=4, cache=None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_workers = max_workers
+        self.cache = cache if cache is not None else ResponseCache()
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai")
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_lock = threading.RLock()
+
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        """Build a client from the "ai" section of the config (and OPENAI_API_KEY)"""
+        ai = config.get("ai", {})
+        return cls(base_url=ai.get("base_url", DEFAULT_BASE_URL),
+                   api_key=ai.get("api_key") or os.environ.get("OPENAI_API_KEY"),
+                   model=ai.get("model", DEFAULT_MODEL),
+                   timeout=ai.get("timeout", 30),
+                   retries=ai.get("retries", 3),
+                   max_workers=ai.get("max_workers", 4),
+                   **kwargs)
+
+    @property
+    def configured(self):
+        """True when there is a service to talk to (a key, or a custom/local endpoint)"""
+        return bool(self.api_key) or self.base_url != DEFAULT_BASE_URL
+
+    def _get_session(self):
+        with self._session_lock:
+            if self._session is None:
+                import requests  # imported lazily: only needed once the AI is actually used
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                if self.api_key:
+                    session.headers["Authorization"] = f"Bearer {self.api_key}"
+                self._session = session
+            return self._session
+
+    def complete(self, prompt, context="", system=None):
+        """Return the model's answer, blocking the calling thread"""
+        return self.submit(prompt, context, system).result()
+
+    def submit(self, prompt, context="", system=None):
+        """Return a Future for the answer; cached answers resolve immediately.
+
+        A request identical to one still in flight shares that request's Future.
+        """
+        key = cache_key(self.model, system, prompt, context)
+        cached = self.cache.get(key)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._pool.submit(self._call, key, prompt, context, system)
+                self._inflight[key] = future
+                future.add_done_callback(lambda f, k=key: self._forget(k))
+        return future
+
+    def _forget(self, key):
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+
+    def _call(self, key, prompt, context, system):
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        content = f"{context}\n\n{prompt}" if context else prompt
+        messages.append({"role": "user", "content": content})
+        payload = {"model": self.model, "messages": messages}
+
+        answer = self._post("/chat/completions", payload)
+        self.cache.put(key, answer)
+        return answer
+
+    def stream(self, messages, cancel=None):
+        """Yield the answer to a chat `messages` list piece by piece as it is generated.
+
+        Runs on the calling (worker) thread. A cached answer comes back as one
+        piece and a complete answer is cached. Transient failures are retried
+        only before the first piece; setting `cancel` stops reading and closes
+        the connection.
+        """
+        key = cache_key(self.model, None, messages, "")
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        import requests
+        response = self._request("/chat/completions",
+                                 {"model": self.model, "messages": messages, "stream": True},
+                                 stream=True)
+        parts = []
+        try:
+            if "text/event-stream" not in response.headers.get("Content-Type", ""):
+                # The server ignored "stream": the whole answer arrives at once
+                parts.append(self._content(response))
+                yield parts[0]
+            else:
+                # Server-sent events: "data: {json chunk}" lines, ended by "data: [DONE]".
+                # chunk_size=None hands over each chunk as it arrives instead of filling a buffer
+                for line in response.iter_lines(chunk_size=None):
+                    if cancel is not None and cancel.is_set():
+                        return
+                    if not line.startswith(b"data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == b"[DONE]":
+                        break
+                    try:
+                        piece = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    except (ValueError, KeyError, IndexError) as e:
+                        raise AIError(f"Unexpected stream chunk: {data[:200]!r}") from e
+                    if piece:
+                        parts.append(piece)
+                        yield piece
+        except requests.RequestException as e:
+            raise AIError(f"AI stream interrupted: {e}") from e
+        finally:
+            response.close()
+        self.cache.put(key, "".join(parts))
+
+    def _request(self, endpoint, payload, stream=False):
+        """POST with retries on transient failures; returns the successful response"""
+        import requests
+        session = self._get_session()
+        last_error = None
+        retry_after = 0
+        for attempt in range(self.retries + 1):
+            if attempt:
+                # One wait per retry: the server's Retry-After if it asked for longer
+                time.sleep(max(self.backoff * (2 ** (attempt - 1)), retry_after))
+                retry_after = 0
+            try:
+                response = session.post(self.base_url + endpoint, json=payload,
+                                        timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+                continue
+            if response.status_code in RETRY_STATUSES:
+                last_error = AIError(f"HTTP {response.status_code}")
+                header = response.headers.get("Retry-After")
+                response.close()
+                if header and header.isdigit():
+                    retry_after = min(float(header), 30)
+                continue
+            if response.status_code >= 400:
+                raise AIError(f"HTTP {response.status_code}: {response.text[:200]}")
+            return response
+        raise AIError(f"AI request failed after {self.retries + 1} attempts: {last_error}")
+
+    def _content(self, response):
+        try:
+            return response.json()["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError) as e:
+            raise AIError(f"Unexpected response: {response.text[:200]}") from e
+
+    def _post(self, endpoint, payload):
+        return self._content(self._request(endpoint, payload))
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._session is not None:
+            self._session.close()
+        self.cache.close()
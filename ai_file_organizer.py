@@ -1,14 +1,29 @@
 import os
-import shutil
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import json
-import threading
+import queue
 from pathlib import Path
-import openai  # You can use OpenAI API or other AI services
-import requests
-import hashlib
 from datetime import datetime
+import organizer_core
+from archives import ArchiveIndex, split_member_path
+from digest import DigestBuilder
+from disk_usage import DiskUsage
+from file_index import FileIndex
+from name_index import NameSearch
+from content_search import ContentSearch, FileMatches
+from search_worker import BackgroundSearch
+from lazy_tree import LazyTree
+from duplicates import DuplicateFinder, resolve_duplicates
+from fs_watch import DirectoryWatcher
+from ai_client import AIClient
+from chat import ChatHistory, ChatTranscript
+from instrumentation import Recorder
+from jobs import JobBusy, JobScheduler
+from organize_plan import Journal, execute, incomplete_journal, resume, undo, undoable_journal
+
+AI_SYSTEM_PROMPT = ("You are an assistant inside a desktop file organizer. Give short, concrete "
+                    "advice about folder structure, file organization and GitHub projects.")
 
 class AIFileOrganizer:
     def __init__(self, root):
@@ -19,6 +34,33 @@ class AIFileOrganizer:
         # Configuration
         self.config = self.load_config()
         
+        # Persistent metadata index used by the explorer, search and analysis
+        self.index = FileIndex()
+        self.names = NameSearch(self.index)
+        self.content_search = ContentSearch(workers=self.config.get("grep_workers"))
+        # Member listings of zip/tar archives, read once per archive version
+        self.archives = ArchiveIndex() if self.config.get("archive_introspection", True) else None
+        self.duplicate_finder = DuplicateFinder(workers=self.config.get("dedupe_workers"),
+                                                archives=self.archives)
+        self.digests = DigestBuilder(self.index)
+        self.usage = DiskUsage(self.index)
+        self.usage_job = (None, None)    # (root, job) of the directory size rollup
+        
+        # Watches the directories shown in the explorer so it stays live without Refresh
+        self.fs_events = queue.Queue()
+        self.watcher = DirectoryWatcher(self.fs_events.put,
+                                        poll_interval=self.config.get("watch_poll_interval", 2.0),
+                                        force_polling=self.config.get("watch_force_polling", False))
+        
+        # Long-running actions share one bounded worker pool, shown in the Jobs panel
+        self.jobs = JobScheduler(self.root, workers=self.config.get("job_workers", 4))
+        self.jobs_panel = None
+        
+        # Timing of long operations, shown in the status bar and the Performance panel
+        self.recorder = Recorder()
+        if self.config.get("profile_operation"):
+            self.recorder.profile_next(self.config["profile_operation"])
+        
         # AI API setup (you'll need to add your API key)
         self.ai_enabled = False
         self.setup_ai()
@@ -28,41 +70,34 @@ class AIFileOrganizer:
     def setup_ai(self):
         """Setup AI API configuration"""
         try:
-            # You can use OpenAI, Hugging Face, or local models
-            # Example with OpenAI (you'll need to install openai package)
-            # openai.api_key = "your-api-key"
+            # Any OpenAI-compatible endpoint (hosted or local) configured under "ai".
+            # Without one the assistant falls back to built-in placeholder answers.
+            # The HTTP client library is imported lazily on first use.
+            self.ai_client = AIClient.from_config(self.config)
             self.ai_enabled = True
         except:
             self.ai_enabled = False
     
     def load_config(self):
         """Load configuration file"""
-        config_path = Path.home() / ".ai_file_organizer_config.json"
-        default_config = {
-            "file_categories": {
-                "images": [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".svg"],
-                "documents": [".pdf", ".doc", ".docx", ".txt", ".rtf"],
-                "code": [".py", ".js", ".html", ".css", ".java", ".cpp", ".c"],
-                "archives": [".zip", ".rar", ".7z", ".tar", ".gz"],
-                "media": [".mp4", ".avi", ".mkv", ".mp3", ".wav", ".flac"]
-            },
-            "project_templates": {
-                "python": ["src/", "tests/", "docs/", "requirements.txt", "README.md"],
-                "web": ["css/", "js/", "images/", "index.html"],
-                "data_science": ["data/", "notebooks/", "models/", "src/"]
-            }
-        }
-        
-        if config_path.exists():
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        else:
-            with open(config_path, 'w') as f:
-                json.dump(default_config, f, indent=2)
-            return default_config
+        return organizer_core.load_config()
     
     def create_ui(self):
         """Create the main user interface"""
+        # Status bar with the last/running operation timings
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10)
+        self.perf_var = tk.StringVar()
+        ttk.Label(status_frame, textvariable=self.perf_var).pack(side=tk.LEFT)
+        ttk.Button(status_frame, text="Performance",
+                  command=self.show_performance_panel).pack(side=tk.RIGHT)
+        ttk.Button(status_frame, text="Jobs",
+                  command=self.show_jobs_panel).pack(side=tk.RIGHT, padx=5)
+        self.jobs_var = tk.StringVar()
+        ttk.Label(status_frame, textvariable=self.jobs_var).pack(side=tk.RIGHT, padx=5)
+        self.root.after(500, self.update_perf_status)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         # Create notebook for tabs
         notebook = ttk.Notebook(self.root)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -109,6 +144,23 @@ class AIFileOrganizer:
         search_entry.pack(side=tk.LEFT, padx=5)
         search_entry.bind('<KeyRelease>', self.search_files)
         
+        # Content mode greps inside files instead of matching names
+        self.content_mode_var = tk.BooleanVar(value=False)
+        self.regex_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_frame, text="Contents", variable=self.content_mode_var,
+                        command=self.search_files).pack(side=tk.LEFT)
+        ttk.Checkbutton(search_frame, text="Regex", variable=self.regex_var,
+                        command=self.search_files).pack(side=tk.LEFT)
+        
+        self.search_status_var = tk.StringVar()
+        ttk.Label(search_frame, textvariable=self.search_status_var).pack(side=tk.LEFT, padx=5)
+        
+        self.searcher = BackgroundSearch(
+            self.root, self.run_search, self.clear_tree, self.insert_search_results,
+            self.search_status_var.set,
+            debounce_ms=self.config.get("search_debounce_ms", 250),
+            max_results=self.config.get("search_max_results", 5000))
+        
         # File tree view
         tree_frame = ttk.Frame(self.explorer_frame)
         tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -121,7 +173,14 @@ class AIFileOrganizer:
         
         vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.tree.configure(xscrollcommand=hsb.set)
+        
+        # Lazy model: subdirectories load on expand, large ones page in on scroll
+        self.lazy_tree = LazyTree(self.tree, self.list_children, self.format_row,
+                                  yscroll=vsb.set,
+                                  page_size=self.config.get("explorer_page_size", 500),
+                                  on_change=self.sync_watches)
+        self.root.after(200, self.process_fs_events)
         
         self.tree.grid(row=0, column=0, sticky="nsew")
         vsb.grid(row=0, column=1, sticky="ns")
@@ -136,10 +195,14 @@ class AIFileOrganizer:
         
         ttk.Button(action_frame, text="Organize Files", 
                   command=self.organize_files).pack(side=tk.LEFT, padx=5)
+        ttk.Button(action_frame, text="Undo Organize", 
+                  command=self.undo_organize).pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="Get AI Suggestions", 
                   command=self.get_file_suggestions).pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="Analyze Structure", 
                   command=self.analyze_structure).pack(side=tk.LEFT, padx=5)
+        ttk.Button(action_frame, text="Find Duplicates", 
+                  command=self.find_duplicates).pack(side=tk.LEFT, padx=5)
         
         self.load_directory(self.path_var.get())
         
@@ -167,6 +230,8 @@ class AIFileOrganizer:
         
         ttk.Button(project_create_frame, text="Generate Project", 
                   command=self.generate_project).grid(row=1, column=3, padx=5, pady=5)
+        ttk.Button(project_create_frame, text="Generate Batch...", 
+                  command=self.generate_project_batch).grid(row=1, column=4, padx=5, pady=5)
         
         # GitHub integration frame
         github_frame = ttk.LabelFrame(self.project_frame, text="GitHub Integration")
@@ -200,6 +265,12 @@ class AIFileOrganizer:
         
         self.chat_display = scrolledtext.ScrolledText(chat_frame, height=20, state=tk.DISABLED)
         self.chat_display.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        # Answers stream in through coalesced inserts; old lines are trimmed from the
+        # widget while the whole conversation is kept in ~/.ai_file_organizer_chat.jsonl
+        self.chat_transcript = ChatTranscript(self.chat_display,
+                                              max_lines=self.config.get("chat_max_lines", 1000))
+        self.chat_history = ChatHistory()
+        self.chat_job = None
         
         input_frame = ttk.Frame(chat_frame)
         input_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -238,36 +309,118 @@ class AIFileOrganizer:
     
     def load_directory(self, path):
         """Load directory contents into tree view"""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.searcher.cancel()
         
         try:
             path_obj = Path(path)
             if path_obj.exists() and path_obj.is_dir():
-                # Add parent directory entry
-                if path_obj.parent != path_obj:
-                    self.tree.insert("", "end", text="..", values=("", "Directory", ""),
-                                   tags=("directory",))
-                
-                # Add directories
-                for item in sorted(path_obj.iterdir()):
-                    if item.is_dir():
-                        self.tree.insert("", "end", text=item.name, 
-                                       values=("", "Directory", item.stat().st_mtime),
-                                       tags=("directory",))
-                
-                # Add files
-                for item in sorted(path_obj.iterdir()):
-                    if item.is_file():
-                        size = self.format_size(item.stat().st_size)
-                        modified = datetime.fromtimestamp(item.stat().st_mtime).strftime("%Y-%m-%d %H:%M")
-                        self.tree.insert("", "end", text=item.name, 
-                                       values=(size, item.suffix, modified),
-                                       tags=("file",))
+                # Only this directory is read; subdirectories load when expanded
+                self.lazy_tree.load(path_obj, show_parent=path_obj.parent != path_obj)
+                self.start_usage_rollup(path_obj)
+            else:
+                self.lazy_tree.clear()
         
         except PermissionError:
             messagebox.showerror("Error", "Permission denied to access this directory")
     
+    def list_children(self, path):
+        """Return index rows for the direct children of path, re-reading it if changed"""
+        with self.recorder.span("load_directory", path=str(path)) as span:
+            self.index.refresh(path, max_depth=0)
+            rows = self.with_usage(path, self.index.list_dir(path))
+            span.items = len(rows)
+        return rows
+    
+    def with_usage(self, directory, rows, usage=None):
+        """Give directory rows their recursive size and file count (size -1 while unknown).
+        
+        `usage` maps paths to disk_usage.Usage; by default the cached rollups are used.
+        """
+        if usage is None:
+            usage = self.usage.cached([os.path.join(directory, row[0]) for row in rows if row[1]])
+        result = []
+        for row in rows:
+            if row[1]:
+                known = usage.get(os.path.join(directory, row[0]))
+                row = row[:2] + ((known.bytes, row[3], row[4], known.files) if known is not None
+                                 else (-1, row[3], row[4]))
+            result.append(row)
+        return result
+    
+    def start_usage_rollup(self, path):
+        """Recompute directory sizes below the explorer root in the background"""
+        if not self.config.get("explorer_dir_sizes", True):
+            return
+        path = os.path.abspath(str(path))
+        running_path, job = self.usage_job
+        if job is not None and job.active:
+            if running_path == path:
+                return
+            self.jobs.cancel(job)
+        
+        def work(job):
+            def progress(update):
+                job.report(update["files"], message=f"Scanning: {update['files']:,} entries")
+            with self.recorder.span("disk_usage", path=path) as span:
+                usage = self.usage.rollup(path, job.cancel, progress)
+                span.items = len(usage or ())
+            return usage
+        
+        def done(usage):
+            if usage is not None and self.lazy_tree.root_path is not None:
+                self.lazy_tree.update_rows(
+                    lambda directory, row: self.with_usage(directory, [row], usage)[0])
+        
+        # Not keyed by directory: sizing only reads, so it must not block organize and friends.
+        # Failures (e.g. an unreadable root) are already reported by load_directory.
+        job = self.jobs.submit(f"Directory sizes {os.path.basename(path) or path}",
+                               work, done, lambda e: None)
+        self.usage_job = (path, job)
+    
+    def format_row(self, row):
+        """Return tree view values and tags for an index row"""
+        name, is_dir, size, mtime, ext = row[:5]
+        modified = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M")
+        if is_dir:
+            if size < 0 or len(row) < 6:
+                return ("", "Directory", modified), ("directory",)
+            files = f"{row[5]:,} file{'s' if row[5] != 1 else ''}"
+            return (self.format_size(size), f"Directory, {files}", modified), ("directory",)
+        return (self.format_size(size), ext, modified), ("file",)
+    
+    def sync_watches(self):
+        """Watch exactly the directories currently expanded in the explorer"""
+        self.watcher.set_paths(self.lazy_tree.expanded_paths())
+    
+    def process_fs_events(self):
+        """Drain watcher events on the Tk thread and reschedule"""
+        try:
+            while True:
+                self.apply_fs_events(self.fs_events.get_nowait())
+        except queue.Empty:
+            pass
+        self.root.after(200, self.process_fs_events)
+    
+    def apply_fs_events(self, events):
+        """Apply watcher events to the index and the visible tree rows in place"""
+        for event in events:
+            if event.kind == "rescan":
+                # The kernel dropped events; fall back to a full reload once
+                self.refresh_explorer()
+                return
+            if event.kind in ("deleted", "moved"):
+                self.index.remove_entry(event.path)
+                self.lazy_tree.remove(event.path)
+                if event.kind == "deleted":
+                    continue
+            path = event.dest if event.kind == "moved" else event.path
+            row = self.index.update_entry(path)
+            if row is None:
+                self.lazy_tree.remove(path)
+            else:
+                directory = os.path.dirname(path)
+                self.lazy_tree.upsert(directory, self.with_usage(directory, [row])[0])
+    
     def format_size(self, size_bytes):
         """Format file size in human readable format"""
         for unit in ['B', 'KB', 'MB', 'GB']:
@@ -278,52 +431,163 @@ class AIFileOrganizer:
     
     def search_files(self, event=None):
         """Search files in current directory"""
-        query = self.search_var.get().lower()
+        query = self.search_var.get()
         if not query:
+            self.searcher.cancel()
+            self.search_status_var.set("")
             self.load_directory(self.path_var.get())
             return
         
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        # Runs on a worker thread; a newer keystroke cancels this one
+        if self.content_mode_var.get():
+            self.searcher.request(query, self.path_var.get(), "content", self.regex_var.get())
+        else:
+            self.searcher.request(query.lower(), self.path_var.get(), "name", False)
+    
+    def run_search(self, query, path, mode, regex, cancel):
+        """Yield search hits below path (called on the search worker thread)"""
+        if mode == "content":
+            with self.recorder.span("grep", pattern=query) as span:
+                for match in organizer_core.grep(path, query, regex, index=self.index,
+                                                 max_age=self.config.get("index_max_age", 60),
+                                                 cancel=cancel, searcher=self.content_search,
+                                                 max_size=self.config.get("grep_max_size")):
+                    span.items += 1
+                    yield match
+            return
         
-        path_obj = Path(self.path_var.get())
-        try:
-            for item in path_obj.rglob("*"):
-                if query in item.name.lower():
-                    if item.is_dir():
-                        self.tree.insert("", "end", text=str(item.relative_to(path_obj)), 
-                                       values=("", "Directory", ""), tags=("directory",))
-                    else:
-                        size = self.format_size(item.stat().st_size)
-                        modified = datetime.fromtimestamp(item.stat().st_mtime).strftime("%Y-%m-%d %H:%M")
-                        self.tree.insert("", "end", text=str(item.relative_to(path_obj)), 
-                                       values=(size, item.suffix, modified), tags=("file",))
-        except PermissionError:
-            pass
+        with self.recorder.span("search", query=query) as span:
+            for row in organizer_core.search(path, query, self.index,
+                                             self.config.get("index_max_age", 60), cancel, self.names,
+                                             self.archives):
+                span.items += 1
+                yield row
+    
+    def clear_tree(self):
+        """Remove all rows from the explorer tree"""
+        self.lazy_tree.clear()
+    
+    def insert_search_results(self, rows):
+        """Insert a batch of search hits into the tree view"""
+        base = self.path_var.get()
+        for row in rows:
+            if isinstance(row, FileMatches):
+                # Content hit: the file, with its matching lines underneath
+                parent = self.tree.insert("", "end", text=os.path.relpath(row.path, base),
+                                          values=("", f"{len(row.lines)} matches", ""),
+                                          tags=("file",), open=len(row.lines) <= 3)
+                for line_no, line in row.lines:
+                    self.tree.insert(parent, "end", text=f"{line_no}: {line.strip()}")
+                continue
+            path, is_dir, size, mtime, ext = row
+            values, tags = self.format_row((path, is_dir, size, mtime, ext))
+            if is_dir:
+                values = ("", "Directory", "")
+            self.tree.insert("", "end", text=os.path.relpath(path, base), 
+                           values=values, tags=tags)
     
     def organize_files(self):
         """Organize files into categories"""
         path = Path(self.path_var.get())
-        try:
-            for item in path.iterdir():
-                if item.is_file():
-                    category = self.get_file_category(item.suffix)
-                    if category:
-                        category_dir = path / category
-                        category_dir.mkdir(exist_ok=True)
-                        shutil.move(str(item), str(category_dir / item.name))
-            
-            messagebox.showinfo("Success", "Files organized successfully!")
-            self.load_directory(path)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to organize files: {str(e)}")
+        workers = self.config.get("organize_workers", 8)
+        
+        # A run that was interrupted in this folder can be finished or rolled back first
+        pending = incomplete_journal(path)
+        if pending is not None:
+            answer = messagebox.askyesnocancel(
+                "Interrupted Organize",
+                "A previous organize run in this folder did not finish.\n\n"
+                "Yes: resume it\nNo: undo it\nCancel: ignore it and plan a new run")
+            if answer is True:
+                self.run_organize("Resume organize", path,
+                                  lambda job: resume(pending, workers, job.report, job.cancel), "resumed")
+                return
+            if answer is False:
+                self.run_organize("Undo organize", path, lambda job: undo(pending), "restored")
+                return
+        
+        def planned(plan):
+            if not plan:
+                messagebox.showinfo("Organize", "Nothing to organize")
+                return
+            self.show_organize_preview(plan, workers)
+        
+        self.start_job(f"Plan organize {path.name}",
+                       lambda job: organizer_core.plan_organize(path, self.config),
+                       planned, "Failed to organize files", key=path)
+    
+    def show_organize_preview(self, plan, workers):
+        """Show a dry run of the move plan and execute it on confirmation"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Organize Preview")
+        dialog.geometry("700x450")
+        
+        ttk.Label(dialog, text=f"{len(plan)} files will be moved (dry run, nothing changed yet):").pack(pady=5)
+        
+        tree = ttk.Treeview(dialog, columns=("Target",), show="tree headings")
+        tree.heading("#0", text="File")
+        tree.heading("Target", text="Moves to")
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        for category, moves in sorted(plan.by_category().items()):
+            parent = tree.insert("", "end", text=f"{category} ({len(moves)})", open=False)
+            for move in moves:
+                tree.insert(parent, "end", text=os.path.basename(move.source),
+                            values=(os.path.relpath(move.target, plan.root),))
+        
+        def confirm():
+            dialog.destroy()
+            self.run_organize("Organize", plan.root,
+                              lambda job: execute(plan, Journal.create(plan), workers,
+                                                  job.report, job.cancel), "moved")
+        
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(pady=5)
+        ttk.Button(button_frame, text="Organize", command=confirm).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+    
+    def run_organize(self, name, path, work, verb):
+        """Run a move/undo operation as a job and report the outcome"""
+        def timed(job):
+            with self.recorder.span("organize", action=verb) as span:
+                result = work(job)
+                span.items = result[0]
+            return result
+        
+        def done(result):
+            count, errors = result
+            if errors:
+                messagebox.showwarning("Organize", f"{count} files {verb}, {len(errors)} failed.\n"
+                                       f"First failure: {errors[0][0]}: {errors[0][1]}")
+            else:
+                messagebox.showinfo("Success", f"{count} files {verb} successfully!")
+            self.refresh_explorer()
+        
+        def cancelled(result):
+            if result is None:
+                messagebox.showinfo("Organize", "Cancelled before starting.")
+            else:
+                messagebox.showinfo("Organize", f"Cancelled after {result[0]} files {verb}.\n"
+                                    "Organize the folder again to resume or undo the run.")
+            self.refresh_explorer()
+        
+        self.start_job(f"{name} {Path(path).name}", timed, done, "Failed to organize files",
+                       key=path, on_cancel=cancelled, show=True)
+    
+    def undo_organize(self):
+        """Undo the most recent organize run in the current directory"""
+        path = Path(self.path_var.get())
+        journal_path = undoable_journal(path)
+        if journal_path is None:
+            messagebox.showinfo("Undo", "Nothing to undo in this folder")
+            return
+        
+        if messagebox.askyesno("Undo", "Move the files from the last organize run back?"):
+            self.run_organize("Undo organize", path, lambda job: undo(journal_path), "restored")
     
     def get_file_category(self, extension):
         """Get category for file extension"""
-        for category, extensions in self.config["file_categories"].items():
-            if extension.lower() in extensions:
-                return category
-        return "others"
+        return organizer_core.get_file_category(self.config, extension)
     
     def get_file_suggestions(self):
         """Get AI suggestions for file organization"""
@@ -331,14 +595,22 @@ class AIFileOrganizer:
             messagebox.showwarning("AI Disabled", "AI features are not configured")
             return
         
-        # This would integrate with an AI service
-        # For now, we'll show a placeholder
-        suggestions = self.generate_ai_suggestions(self.path_var.get())
-        self.show_suggestions_dialog(suggestions)
+        path = self.path_var.get()
+        self.start_job("AI suggestions", lambda job: self.generate_ai_suggestions(path, job.cancel),
+                       self.show_suggestions_dialog, "Failed to get AI suggestions")
     
-    def generate_ai_suggestions(self, path):
-        """Generate AI suggestions for file organization"""
-        # This is a placeholder - you would integrate with actual AI API
+    def generate_ai_suggestions(self, path, cancel=None):
+        """Generate AI suggestions for file organization (runs off the Tk thread)"""
+        if self.ai_client.configured:
+            context = self.directory_context(path, cancel)
+            with self.recorder.span("ai.suggestions"):
+                answer = self.ai_client.complete(
+                    "Suggest up to 5 concrete ways to organize this directory, one per line.",
+                    context=context, system=AI_SYSTEM_PROMPT)
+            suggestions = [line.lstrip(" -*0123456789.)").strip() for line in answer.splitlines()]
+            return [s for s in suggestions if s]
+        
+        # Placeholder used until an AI service is configured
         return [
             "Create a 'project_docs' folder for documentation files",
             "Move image files to 'assets' folder",
@@ -346,6 +618,11 @@ class AIFileOrganizer:
             "Remove duplicate files in the downloads folder"
         ]
     
+    def directory_context(self, path, cancel=None):
+        """Compact, token-budgeted digest of a directory used as context for AI prompts"""
+        return self.digests.build(path, self.config.get("ai_context_tokens", 800), cancel,
+                                  self.config.get("index_max_age", 60))
+    
     def show_suggestions_dialog(self, suggestions):
         """Show AI suggestions in a dialog"""
         dialog = tk.Toplevel(self.root)
@@ -373,50 +650,32 @@ class AIFileOrganizer:
     def analyze_structure(self):
         """Analyze directory structure"""
         path = Path(self.path_var.get())
-        analysis = self.analyze_directory(path)
-        
-        # Show analysis results
-        self.show_analysis_results(analysis)
-    
-    def analyze_directory(self, path):
-        """Analyze directory structure and return insights"""
-        analysis = {
-            "total_files": 0,
-            "total_folders": 0,
-            "file_types": {},
-            "largest_files": [],
-            "recent_files": [],
-            "suggestions": []
-        }
         
-        try:
-            for item in path.rglob("*"):
-                if item.is_file():
-                    analysis["total_files"] += 1
-                    ext = item.suffix.lower()
-                    analysis["file_types"][ext] = analysis["file_types"].get(ext, 0) + 1
-                    
-                    # Track largest files
-                    file_size = item.stat().st_size
-                    analysis["largest_files"].append((item, file_size))
-                    
-                    # Track recent files
-                    mod_time = item.stat().st_mtime
-                    analysis["recent_files"].append((item, mod_time))
-                
-                elif item.is_dir():
-                    analysis["total_folders"] += 1
-            
-            # Sort and limit lists
-            analysis["largest_files"].sort(key=lambda x: x[1], reverse=True)
-            analysis["recent_files"].sort(key=lambda x: x[1], reverse=True)
-            analysis["largest_files"] = analysis["largest_files"][:10]
-            analysis["recent_files"] = analysis["recent_files"][:10]
+        # Progress and Cancel live in the Jobs panel
+        def work(job):
+            def progress(update):
+                verb = {"scan": "Scanning", "archives": "Reading archives"}.get(update["phase"], "Analyzing")
+                job.report(update["files"], message=f"{verb}: {update['files']:,} files"
+                           + (f", {self.format_size(update['bytes'])}" if update["bytes"] else "")
+                           + f" ({update['rate']:,.0f} files/s)")
+            return self.analyze_directory(path, progress, job.cancel)
+        
+        self.start_job(f"Analyze {path.name}", work, self.show_analysis_results,
+                       "Failed to analyze directory", key=path, show=True)
+    
+    def analyze_directory(self, path, progress=None, cancel=None):
+        """Analyze directory structure and return insights (None if cancelled)"""
+        with self.recorder.span("analyze", path=str(path)) as span:
+            def report(update):
+                span.items, span.bytes = update["files"], update["bytes"]
+                if progress is not None:
+                    progress(update)
             
-        except PermissionError:
-            pass
-        
-        return analysis
+            # analysis_workers > 1 walks the tree directly across a worker pool
+            return organizer_core.analyze(path, self.index,
+                                          workers=self.config.get("analysis_workers", 1),
+                                          processes=self.config.get("analysis_processes", False),
+                                          progress=report, cancel=cancel, archives=self.archives)
     
     def show_analysis_results(self, analysis):
         """Show directory analysis results"""
@@ -434,6 +693,7 @@ Directory Analysis Report:
 Basic Statistics:
 - Total Files: {analysis['total_files']}
 - Total Folders: {analysis['total_folders']}
+- Total Size: {self.format_size(analysis.get('total_bytes', 0))}
 
 File Type Distribution:
 """
@@ -444,9 +704,125 @@ File Type Distribution:
         for file, size in analysis['largest_files']:
             report += f"- {file.name}: {self.format_size(size)}\n"
         
+        archives = analysis.get("archives")
+        if archives:
+            report += (f"\nInside {archives['count']} Archives"
+                       + (f" ({archives['unreadable']} unreadable)" if archives["unreadable"] else "")
+                       + f":\n- {archives['total_files']} files, "
+                       f"{self.format_size(archives['total_bytes'])} uncompressed\n")
+            for ext, count in sorted(archives['file_types'].items(), key=lambda x: x[1], reverse=True)[:5]:
+                report += f"- {ext if ext else 'No extension'}: {count} files\n"
+            for file, size in archives['largest_files'][:5]:
+                archive, member = split_member_path(file)
+                report += (f"- {os.path.basename(member)} (in {os.path.basename(archive)}): "
+                           f"{self.format_size(size)}\n")
+        
         text_widget.insert(tk.END, report)
         text_widget.config(state=tk.DISABLED)
     
+    def start_job(self, name, work, on_done, error_title, key=None, on_cancel=None, show=False):
+        """Run work(job) on the job pool and hand its result to on_done on the Tk thread.
+        
+        `key` is the directory the job works on; a second job on the same
+        directory is refused until the first one finishes.
+        """
+        try:
+            job = self.jobs.submit(name, work, on_done,
+                                   lambda e: messagebox.showerror("Error", f"{error_title}: {e}"),
+                                   on_cancel, key=key)
+        except JobBusy as e:
+            messagebox.showinfo("Busy", f"'{e.job.name}' is still working on {e.job.key}.\n"
+                                "Wait for it to finish or cancel it in the Jobs panel.")
+            return None
+        if show:
+            self.show_jobs_panel()
+        return job
+    
+    def find_duplicates(self):
+        """Find duplicate files below the current directory in the background"""
+        path = self.path_var.get()
+        def work(job):
+            def progress(stage, done, total):
+                job.report(done, total, f"{stage.capitalize()}: {done:,} of {total:,}")
+            
+            with self.recorder.span("find_duplicates", path=path) as span:
+                groups = self.duplicate_finder.find(path, progress, job.cancel)
+                span.items = len(groups)
+            return groups
+        
+        self.start_job(f"Find duplicates in {Path(path).name}", work,
+                       lambda groups: self.show_duplicates_dialog(groups, path),
+                       "Failed to find duplicates", key=path, show=True)
+    
+    def show_duplicates_dialog(self, groups, root):
+        """Show duplicate groups and let the user delete or hardlink the extra copies"""
+        if not groups:
+            messagebox.showinfo("Duplicates", "No duplicate files found")
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Duplicate Files")
+        dialog.geometry("800x500")
+        
+        wasted = sum(group.wasted for group in groups)
+        ttk.Label(dialog, text=f"{len(groups)} groups, {self.format_size(wasted)} reclaimable. "
+                  "Select a file and press 'Keep Selected' to choose which copy survives.").pack(pady=5)
+        
+        tree = ttk.Treeview(dialog, columns=("Size", "Keep"), show="tree headings")
+        tree.heading("#0", text="File")
+        tree.heading("Size", text="Size")
+        tree.heading("Keep", text="Keep")
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        keep = {}
+        by_iid = {}
+        for group in groups:
+            keep[group.digest] = group.paths[0]
+            parent = tree.insert("", "end", text=f"{len(group.paths)} copies of {Path(group.paths[0]).name}",
+                                 values=(self.format_size(group.size), ""), open=True)
+            by_iid[parent] = group
+            for path in group.paths:
+                iid = tree.insert(parent, "end", text=path, values=(self.format_size(group.size),
+                                  "✔" if path == keep[group.digest] else ""))
+                by_iid[iid] = group
+        
+        def keep_selected():
+            for iid in tree.selection():
+                parent = tree.parent(iid)
+                if not parent:
+                    continue
+                keep[by_iid[iid].digest] = tree.item(iid, "text")
+                for child in tree.get_children(parent):
+                    tree.set(child, "Keep", "✔" if child == iid else "")
+        
+        def resolve(mode):
+            selected = {by_iid[iid] for iid in tree.selection()} or set(groups)
+            if not messagebox.askyesno("Confirm", f"{mode.capitalize()} duplicates in "
+                                       f"{len(selected)} groups?", parent=dialog):
+                return
+            dialog.destroy()
+            
+            def done(result):
+                reclaimed, errors = result
+                message = f"Reclaimed {self.format_size(reclaimed)}"
+                if errors:
+                    message += f"\n{len(errors)} files skipped, e.g. {errors[0][0]}: {errors[0][1]}"
+                messagebox.showinfo("Duplicates", message)
+                self.refresh_explorer()
+            
+            self.start_job(f"{mode.capitalize()} duplicates", 
+                           lambda job: resolve_duplicates(selected, mode=mode, keep=dict(keep)),
+                           done, "Failed to resolve duplicates", key=root)
+        
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(pady=5)
+        ttk.Button(button_frame, text="Keep Selected", command=keep_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Delete Duplicates", 
+                  command=lambda: resolve("delete")).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Hardlink Duplicates", 
+                  command=lambda: resolve("hardlink")).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Close", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+    
     def browse_project_location(self):
         """Browse for project location"""
         directory = filedialog.askdirectory(initialdir=self.project_location_var.get())
@@ -463,39 +839,61 @@ File Type Distribution:
             messagebox.showerror("Error", "Please enter a project name")
             return
         
-        project_path = Path(location) / name
-        template = self.config["project_templates"].get(project_type, [])
+        def work(job):
+            with self.recorder.span("generate_project", type=project_type):
+                return organizer_core.generate_project(name, project_type, location, self.config)
         
-        try:
-            project_path.mkdir(exist_ok=True)
-            
-            for item in template:
-                item_path = project_path / item
-                if item.endswith('/'):
-                    item_path.mkdir(exist_ok=True)
-                else:
-                    item_path.touch()
-            
+        def done(project_path):
             # Update structure preview
             self.update_structure_preview(project_path)
             messagebox.showinfo("Success", f"Project '{name}' created successfully!")
+        
+        self.start_job(f"Generate {name}", work, done, "Failed to create project",
+                       key=Path(location) / name)
+    
+    def generate_project_batch(self):
+        """Generate one project per line of a names file (CSV columns become template variables)"""
+        source = filedialog.askopenfilename(
+            title="Project names (one per line, or CSV with a 'name' column)",
+            filetypes=[("Names", "*.txt *.csv"), ("All files", "*.*")])
+        if not source:
+            return
+        project_type = self.project_type_var.get()
+        location = self.project_location_var.get()
+        
+        def work(job):
+            from scaffold import read_projects
+            projects = read_projects(source)
+            def progress(done, total):
+                job.report(done, total, f"{len(projects):,} projects: {done:,} of {total:,} files")
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to create project: {str(e)}")
+            with self.recorder.span("generate_projects", type=project_type) as span:
+                paths, errors = organizer_core.generate_projects(
+                    projects, project_type, location, self.config,
+                    workers=self.config.get("scaffold_workers", 8),
+                    progress=progress, cancel=job.cancel)
+                span.items = len(paths)
+            return paths, errors
+        
+        def done(result):
+            paths, errors = result
+            self.update_structure_preview(location, max_depth=2)
+            message = f"Created {len(paths):,} projects in {location}"
+            if errors:
+                message += f"\n\n{len(errors):,} problems, first: {errors[0][0]}: {errors[0][1]}"
+            messagebox.showinfo("Batch Generation", message)
+        
+        self.start_job(f"Generate batch from {Path(source).name}", work, done,
+                       "Failed to create projects", key=location, show=True)
     
-    def update_structure_preview(self, project_path):
+    def update_structure_preview(self, project_path, max_depth=4):
         """Update project structure preview"""
+        with self.recorder.span("structure_preview") as span:
+            text = organizer_core.structure_preview(project_path, max_depth)
+            span.items = text.count("\n") + 1
+        # One insert for the whole listing instead of one per line
         self.structure_text.delete(1.0, tk.END)
-        
-        def add_structure(path, prefix=""):
-            for item in sorted(path.iterdir()):
-                if item.is_dir():
-                    self.structure_text.insert(tk.END, f"{prefix}📁 {item.name}\n")
-                    add_structure(item, prefix + "  ")
-                else:
-                    self.structure_text.insert(tk.END, f"{prefix}📄 {item.name}\n")
-        
-        add_structure(project_path)
+        self.structure_text.insert(tk.END, text)
     
     def get_repo_suggestions(self):
         """Get AI suggestions for repository"""
@@ -504,14 +902,27 @@ File Type Distribution:
             return
         
         project_name = self.project_name_var.get()
-        suggestions = self.generate_repo_suggestions(project_name)
         
-        # Show suggestions
-        self.show_repo_suggestions(suggestions)
+        # Show suggestions once the (background) request finishes
+        self.start_job("AI repository suggestions", lambda job: self.generate_repo_suggestions(project_name),
+                       self.show_repo_suggestions, "Failed to get repository suggestions")
     
     def generate_repo_suggestions(self, project_name):
-        """Generate repository suggestions using AI"""
-        # Placeholder - integrate with actual AI
+        """Generate repository suggestions using AI (runs off the Tk thread)"""
+        if self.ai_client.configured:
+            with self.recorder.span("ai.repo_suggestions"):
+                answer = self.ai_client.complete(
+                    f"Suggest a GitHub repository for a project called '{project_name}'. Reply with "
+                    "only a JSON object with keys name, description, topics (list) and readme_template.",
+                    system=AI_SYSTEM_PROMPT)
+            try:
+                suggestions = json.loads(answer[answer.index("{"):answer.rindex("}") + 1])
+                if {"name", "description", "readme_template"} <= suggestions.keys():
+                    return suggestions
+            except ValueError:
+                pass
+        
+        # Placeholder used until an AI service is configured (or its reply was unusable)
         return {
             "name": f"awesome-{project_name.lower().replace(' ', '-')}",
             "description": f"A Python project for {project_name} with modern development practices",
@@ -542,28 +953,65 @@ File Type Distribution:
             messagebox.showerror("Error", f"Failed to generate README: {str(e)}")
     
     def send_ai_message(self):
-        """Send message to AI assistant"""
+        """Send message to AI assistant; the answer streams into the chat as it arrives"""
         message = self.chat_input.get(1.0, tk.END).strip()
         if not message:
             return
+        if self.chat_job is not None and self.chat_job.active:
+            messagebox.showinfo("AI Assistant", "Still answering the previous message.\n"
+                                "Wait for it to finish or cancel it in the Jobs panel.")
+            return
         
         self.chat_input.delete(1.0, tk.END)
         self.display_message("You", message)
         
-        # Get AI response (placeholder)
-        response = self.get_ai_response(message)
-        self.display_message("AI Assistant", response)
+        path = self.path_var.get()
+        def work(job):
+            # Context is cut to a token budget, so requests stay the same size as the chat
+            # grows; the placeholder answer needs none, so don't refresh the index for it
+            context = self.directory_context(path, job.cancel) if self.ai_client.configured else ""
+            if job.cancel.is_set():
+                return None
+            messages = self.chat_history.messages(message, AI_SYSTEM_PROMPT, context,
+                                                  self.config.get("chat_context_tokens", 3000))
+            self.chat_history.add("user", message)
+            self.chat_transcript.write("\nAI Assistant: ")
+            parts = []
+            try:
+                with self.recorder.span("ai.chat") as span:
+                    for piece in self.stream_ai_response(message, messages, job.cancel):
+                        parts.append(piece)
+                        self.chat_transcript.write(piece)
+                        span.items = len(parts)
+                        job.report(len(parts), None, f"{len(parts):,} pieces received")
+            except Exception:
+                self.chat_transcript.write(" [failed]\n")
+                raise
+            return "".join(parts)
+        
+        def done(answer):
+            self.chat_transcript.write("\n")
+            self.chat_history.add("assistant", answer)
+        
+        def cancelled(answer):
+            if answer is not None:
+                self.chat_transcript.write(" [stopped]\n")
+                if answer:
+                    self.chat_history.add("assistant", answer)
+        
+        self.chat_job = self.start_job("AI chat", work, done, "AI request failed", on_cancel=cancelled)
     
     def display_message(self, sender, message):
         """Display message in chat"""
-        self.chat_display.config(state=tk.NORMAL)
-        self.chat_display.insert(tk.END, f"\n{sender}: {message}\n")
-        self.chat_display.config(state=tk.DISABLED)
-        self.chat_display.see(tk.END)
-    
-    def get_ai_response(self, message):
-        """Get response from AI service"""
-        # Placeholder - integrate with actual AI service
+        self.chat_transcript.write(f"\n{sender}: {message}\n")
+    
+    def stream_ai_response(self, message, messages, cancel=None):
+        """Yield the answer to `message` piece by piece; `messages` is the budgeted chat context"""
+        if self.ai_client.configured:
+            yield from self.ai_client.stream(messages, cancel)
+            return
+        
+        # Placeholder used until an AI service is configured
         responses = {
             "project structure": "I suggest creating a modular structure with separate folders for source code, tests, documentation, and assets.",
             "organization": "Based on your files, I recommend categorizing by file type and creating a logical folder hierarchy.",
@@ -572,9 +1020,10 @@ File Type Distribution:
         
         for key, response in responses.items():
             if key in message.lower():
-                return response
+                yield response
+                return
         
-        return "I can help you with project organization, file structure, and GitHub setup. What specific assistance do you need?"
+        yield "I can help you with project organization, file structure, and GitHub setup. What specific assistance do you need?"
     
     def use_prompt(self, prompt):
         """Use predefined prompt"""
@@ -582,6 +1031,174 @@ File Type Distribution:
         self.chat_input.insert(1.0, prompt)
         self.send_ai_message()
     
+    def update_perf_status(self):
+        """Show the running operation (or the last finished one) in the status bar"""
+        running = self.recorder.active()
+        span = running[-1] if running else self.recorder.last()
+        if span is not None:
+            text = f"{span.name}: {span.duration:.2f} s"
+            if span.items:
+                text += f", {span.items:,} items ({span.rate:,.0f}/s)"
+            if span.bytes:
+                text += f", {self.format_size(span.bytes)}"
+            if running:
+                text += " – running"
+            elif span.error:
+                text += f" – {span.error}"
+            self.perf_var.set(text)
+        
+        running = self.jobs.running()
+        if running:
+            job = running[0]
+            self.jobs_var.set(f"{len(running)} job{'s' if len(running) != 1 else ''}: "
+                              f"{job.message or job.name}")
+        else:
+            self.jobs_var.set("")
+        self.root.after(500, self.update_perf_status)
+    
+    def show_jobs_panel(self):
+        """Running and recent jobs with progress bars and Cancel buttons"""
+        if self.jobs_panel is not None and self.jobs_panel.winfo_exists():
+            self.jobs_panel.lift()
+            return
+        dialog = self.jobs_panel = tk.Toplevel(self.root)
+        dialog.title("Jobs")
+        dialog.geometry("650x300")
+        
+        body = ttk.Frame(dialog)
+        body.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        body.columnconfigure(1, weight=1)
+        rows = {}   # job id -> (status var, progress bar, cancel button, widgets)
+        
+        def add_row(job, row):
+            status_var = tk.StringVar()
+            label = ttk.Label(body, text=job.name, width=28)
+            bar = ttk.Progressbar(body, length=200, maximum=1.0)
+            status = ttk.Label(body, textvariable=status_var, width=40)
+            button = ttk.Button(body, text="Cancel", command=lambda: self.jobs.cancel(job))
+            label.grid(row=row, column=0, sticky=tk.W, pady=2)
+            bar.grid(row=row, column=1, sticky=tk.EW, padx=5)
+            status.grid(row=row, column=2, sticky=tk.W)
+            button.grid(row=row, column=3, padx=5)
+            rows[job.id] = (status_var, bar, button, (label, bar, status, button))
+        
+        def refresh():
+            if not dialog.winfo_exists():
+                return
+            jobs = self.jobs.jobs()
+            if [job.id for job in jobs] != list(rows):
+                for *_, widgets in rows.values():
+                    for widget in widgets:
+                        widget.destroy()
+                rows.clear()
+                for row, job in enumerate(jobs):
+                    add_row(job, row)
+            for job in jobs:
+                status_var, bar, button, _ = rows[job.id]
+                fraction = job.fraction
+                if job.active:
+                    if fraction is None and job.status == "running":
+                        # Unknown total: an indeterminate bar just shows it is alive
+                        if str(bar.cget("mode")) != "indeterminate":
+                            bar.config(mode="indeterminate")
+                            bar.start(50)
+                    else:
+                        bar.config(mode="determinate", value=fraction or 0.0)
+                    text = job.message or job.status.capitalize()
+                    if job.cancelled:
+                        text = "Cancelling…"
+                    status_var.set(f"{text} ({job.elapsed:.0f} s)" if job.started else text)
+                else:
+                    bar.stop()
+                    bar.config(mode="determinate", value=1.0 if job.status == "done" else fraction or 0.0)
+                    text = job.status.capitalize()
+                    if job.error is not None:
+                        text += f": {job.error}"
+                    status_var.set(f"{text} ({job.elapsed:.1f} s)")
+                    button.state(["disabled"])
+            dialog.after(250, refresh)
+        
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(pady=5)
+        ttk.Button(button_frame, text="Clear Finished",
+                  command=self.jobs.clear_finished).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Close", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+        refresh()
+    
+    def show_performance_panel(self):
+        """Live per-operation timings with trace export and one-shot profiling"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Performance")
+        dialog.geometry("800x350")
+        
+        columns = ("Calls", "Total", "Mean", "Max", "Last", "Items", "Items/s")
+        tree = ttk.Treeview(dialog, columns=columns, show="tree headings")
+        tree.heading("#0", text="Operation")
+        for column in columns:
+            tree.heading(column, text=column)
+            tree.column(column, width=80, anchor=tk.E)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        profile_var = tk.StringVar()
+        ttk.Label(dialog, textvariable=profile_var).pack()
+        
+        def refresh():
+            if not dialog.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for span in self.recorder.active():
+                tree.insert("", "end", text=f"{span.name} (running)",
+                            values=("", "", "", "", f"{span.duration:.2f} s", f"{span.items:,}",
+                                    f"{span.rate:,.0f}"))
+            for s in self.recorder.summary():
+                tree.insert("", "end", text=s["name"],
+                            values=(s["calls"], f"{s['total_s']:.2f} s", f"{s['mean_s']:.3f} s",
+                                    f"{s['max_s']:.3f} s", f"{s['last_s']:.3f} s", f"{s['items']:,}",
+                                    f"{s['items_per_s']:,.0f}"))
+            if self.recorder.profile_armed:
+                profile_var.set("Profiler armed: the next operation will be profiled")
+            elif self.recorder.last_profile is not None:
+                profile_var.set(f"Last profile: {self.recorder.last_profile[0]}")
+            dialog.after(1000, refresh)
+        
+        def save_trace():
+            path = filedialog.asksaveasfilename(parent=dialog, defaultextension=".json",
+                                                filetypes=[("Chrome trace", "*.json")])
+            if path:
+                self.recorder.write_trace(path)
+        
+        def show_profile():
+            if self.recorder.last_profile is None:
+                messagebox.showinfo("Profile", "No profile captured yet", parent=dialog)
+                return
+            window = tk.Toplevel(dialog)
+            window.title(f"Profile – {self.recorder.last_profile[0].name}")
+            text = scrolledtext.ScrolledText(window, width=120, height=40, font=("Courier", 9))
+            text.pack(fill=tk.BOTH, expand=True)
+            text.insert(tk.END, self.recorder.last_profile[1])
+            text.config(state=tk.DISABLED)
+        
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(pady=5)
+        ttk.Button(button_frame, text="Save Trace…", command=save_trace).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Profile Next Operation",
+                  command=self.recorder.profile_next).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Show Last Profile", command=show_profile).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Close", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+        refresh()
+    
+    def on_close(self):
+        """Write the trace (if "trace_path" is configured) and quit"""
+        self.jobs.close()
+        self.watcher.close()
+        self.content_search.close()
+        if self.config.get("trace_path"):
+            try:
+                self.recorder.write_trace(os.path.expanduser(self.config["trace_path"]))
+            except OSError:
+                pass
+        self.root.destroy()
+    
     def refresh_explorer(self):
         """Refresh file explorer"""
         self.load_directory(self.path_var.get())
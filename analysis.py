@@ -0,0 +1,200 @@
+import heapq
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from archives import ARCHIVE_EXTENSIONS
+from fs_walk import scan_dir, walk
+
+
+class AnalysisStats:
+    """Constant-memory aggregate of a directory tree.
+
+    Keeps counters, a per-extension histogram and two fixed-size min-heaps for
+    the largest and most recently modified files, so memory does not grow with
+    the number of files seen. Archives are only counted; analyze_archives
+    gets their list from the FileIndex.
+    """
+
+    __slots__ = ("top", "total_files", "total_folders", "total_bytes",
+                 "file_types", "largest", "recent", "archives")
+
+    def __init__(self, top=10):
+        self.top = top
+        self.total_files = 0
+        self.total_folders = 0
+        self.total_bytes = 0
+        self.file_types = Counter()
+        self.largest = []
+        self.recent = []
+        self.archives = 0
+
+    def add_file(self, path, size, mtime, ext):
+        self.total_files += 1
+        self.total_bytes += size
+        self.file_types[ext] += 1
+        if ext in ARCHIVE_EXTENSIONS:
+            self.archives += 1
+        self._push(self.largest, (size, path))
+        self._push(self.recent, (mtime, path))
+
+    def add_folder(self):
+        self.total_folders += 1
+
+    def _push(self, heap, item):
+        if len(heap) < self.top:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def merge(self, other):
+        """Fold another partial result into this one"""
+        self.total_files += other.total_files
+        self.total_folders += other.total_folders
+        self.total_bytes += other.total_bytes
+        self.file_types.update(other.file_types)
+        for item in other.largest:
+            self._push(self.largest, item)
+        for item in other.recent:
+            self._push(self.recent, item)
+        self.archives += other.archives
+        return self
+
+    def result(self):
+        """Return the analysis dict shown by AIFileOrganizer.show_analysis_results"""
+        return {
+            "total_files": self.total_files,
+            "total_folders": self.total_folders,
+            "total_bytes": self.total_bytes,
+            "file_types": dict(self.file_types),
+            "largest_files": [(Path(p), size) for size, p in sorted(self.largest, reverse=True)],
+            "recent_files": [(Path(p), mtime) for mtime, p in sorted(self.recent, reverse=True)],
+            "suggestions": []
+        }
+
+
+class Progress:
+    """Rate-limited progress reporting: files/sec and bytes seen"""
+
+    def __init__(self, callback, phase, interval=0.1):
+        self.callback = callback
+        self.phase = phase
+        self.interval = interval
+        self.start = time.monotonic()
+        self._next = self.start + interval
+
+    def update(self, files, bytes_seen, force=False):
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        if not force and now < self._next:
+            return
+        self._next = now + self.interval
+        elapsed = max(now - self.start, 1e-9)
+        self.callback({"phase": self.phase, "files": files, "bytes": bytes_seen,
+                       "rate": files / elapsed, "elapsed": elapsed})
+
+
+def analyze_rows(rows, top=10, progress=None, cancel=None, stats=None):
+    """Aggregate (path, is_dir, size, mtime, ext) rows into AnalysisStats in one pass.
+
+    Returns None if `cancel` was set before the rows ran out.
+    """
+    stats = stats if stats is not None else AnalysisStats(top)
+    reporter = Progress(progress, "analyze")
+    for count, (path, is_dir, size, mtime, ext) in enumerate(rows, 1):
+        if is_dir:
+            stats.add_folder()
+        else:
+            stats.add_file(path, size, mtime, ext)
+        if count % 1000 == 0:
+            if cancel is not None and cancel.is_set():
+                return None
+            reporter.update(stats.total_files, stats.total_bytes)
+    reporter.update(stats.total_files, stats.total_bytes, force=True)
+    return stats
+
+
+def analyze_archives(root, file_index, archive_index, top=10, progress=None, cancel=None):
+    """Analyze the members of the archives `file_index` lists below `root`.
+
+    Listings come from (and are added to) `archive_index`, an archives.ArchiveIndex.
+    Returns the analysis dict of all members plus the "count" of archives and
+    how many were "unreadable", or None if cancelled.
+    """
+    reporter = Progress(progress, "archives")
+    archive_index.update(root, file_index.files_with_extensions(root, ARCHIVE_EXTENSIONS), cancel,
+                         lambda done, total: reporter.update(done, 0, force=done == total))
+    stats = analyze_rows(archive_index.iter_rows(root, cancel), top, cancel=cancel)
+    if stats is None or (cancel is not None and cancel.is_set()):
+        return None
+    count, unreadable, _ = archive_index.stats(root)
+    return dict(stats.result(), count=count, unreadable=unreadable)
+
+
+def analyze_entries(entries, top=10, progress=None, cancel=None):
+    """Like analyze_rows, but for fs_walk.Entry records"""
+    return analyze_rows(((e.path, e.is_dir, e.size, e.mtime, e.ext) for e in entries),
+                        top, progress, cancel)
+
+
+def _analyze_subtree(path, top, cancel=None):
+    """Worker: aggregate everything below one directory"""
+    stats = analyze_entries(walk(path), top, cancel=cancel)
+    return stats if stats is not None else AnalysisStats(top)
+
+
+def _split(root, stats, pieces_wanted, max_levels=3):
+    """Split `root` into subtrees for the workers.
+
+    Starts at the top-level subdirectories and, while there are fewer pieces
+    than wanted, opens the pieces one more level. Files and folders above the
+    cut are counted straight into `stats`.
+    """
+    pieces = [os.fspath(root)]
+    for level in range(max_levels):
+        if level > 0 and len(pieces) >= pieces_wanted:
+            break
+        next_pieces = []
+        for piece in pieces:
+            for entry in scan_dir(piece):
+                if entry.is_dir:
+                    stats.add_folder()
+                    next_pieces.append(entry.path)
+                else:
+                    stats.add_file(entry.path, entry.size, entry.mtime, entry.ext)
+        pieces = next_pieces
+    return pieces
+
+
+def analyze_parallel(root, workers=None, top=10, processes=False, progress=None, cancel=None):
+    """Analyze `root` across a thread (or process) pool and merge the partial stats.
+
+    The merged AnalysisStats is identical to a serial analyze_entries(walk(root))
+    run. Progress is reported as subtrees finish; returns None if cancelled.
+    """
+    # Absolute paths, as the index-backed serial run reports them
+    root = os.path.abspath(os.fspath(root))
+    workers = workers or os.cpu_count() or 1
+    stats = AnalysisStats(top)
+    pieces = _split(root, stats, workers * 4)
+    reporter = Progress(progress, "analyze")
+
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(max_workers=workers) as pool:
+        if processes:
+            # Events do not cross process boundaries; cancelling drops pending pieces
+            futures = [pool.submit(_analyze_subtree, piece, top) for piece in pieces]
+        else:
+            futures = [pool.submit(_analyze_subtree, piece, top, cancel) for piece in pieces]
+        for future in as_completed(futures):
+            if cancel is not None and cancel.is_set():
+                for pending in futures:
+                    pending.cancel()
+                return None
+            stats.merge(future.result())
+            reporter.update(stats.total_files, stats.total_bytes)
+    reporter.update(stats.total_files, stats.total_bytes, force=True)
+    return stats
@@ -0,0 +1,384 @@
+import bz2
+import gzip
+import lzma
+import os
+import sqlite3
+import struct
+import tarfile
+import threading
+import time
+import zipfile
+import zlib
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+DEFAULT_CACHE_PATH = Path.home() / ".ai_file_organizer_archives.db"
+
+ZIP_EXTENSIONS = {".zip", ".jar", ".whl", ".apk", ".epub"}
+TAR_EXTENSIONS = {".tar", ".tgz", ".tbz", ".tbz2", ".txz"}
+COMPRESSED_EXTENSIONS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+# Formats the standard library can list; .7z/.rar stay opaque
+ARCHIVE_EXTENSIONS = ZIP_EXTENSIONS | TAR_EXTENSIONS | set(COMPRESSED_EXTENSIONS)
+
+# Member paths look like "<archive>!/<name inside the archive>"
+MEMBER_SEP = "!" + os.sep
+
+CHUNK_BYTES = 1024 * 1024
+
+Member = namedtuple("Member", "name is_dir size mtime crc")  # crc: CRC32 of the content, None for dirs
+
+_READ_ERRORS = (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError, lzma.LZMAError, zlib.error)
+
+
+def is_archive(path):
+    return os.path.splitext(str(path))[1].lower() in ARCHIVE_EXTENSIONS
+
+
+def member_path(archive, name):
+    """Virtual path of member `name` (a "/"-separated archive name) inside `archive`"""
+    return archive + MEMBER_SEP + name.strip("/").replace("/", os.sep)
+
+
+def is_member_path(path):
+    return MEMBER_SEP in str(path) and bool(split_member_path(path)[1])
+
+
+def split_member_path(path):
+    """Return (archive path, member name) of a member path, or (path, "") for any other.
+
+    "!/" only separates a member where the part before it is an archive file,
+    so real folders whose names end in "!" are not mistaken for archives.
+    """
+    path = str(path)
+    start = 0
+    while True:
+        i = path.find(MEMBER_SEP, start)
+        if i == -1:
+            return path, ""
+        archive = path[:i]
+        if is_archive(archive) and os.path.isfile(archive):
+            return archive, path[i + len(MEMBER_SEP):]
+        start = i + 1
+
+
+class Cancelled(Exception):
+    pass
+
+
+def _crc(stream, cancel=None):
+    """CRC32 and length of everything left in `stream`"""
+    crc = size = 0
+    for chunk in iter(lambda: stream.read(CHUNK_BYTES), b""):
+        if cancel is not None and cancel.is_set():
+            raise Cancelled()
+        crc = zlib.crc32(chunk, crc)
+        size += len(chunk)
+    return crc, size
+
+
+def _zip_mtime(info):
+    try:
+        return time.mktime(info.date_time + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return 0.0
+
+
+def _list_zip(path):
+    with zipfile.ZipFile(path) as archive:
+        # Only the central directory at the end of the file is read
+        return [Member(info.filename.rstrip("/"), info.is_dir(), info.file_size, _zip_mtime(info),
+                       None if info.is_dir() else info.CRC)
+                for info in archive.infolist()]
+
+
+def _list_tar(path, cancel):
+    """Member headers only: an uncompressed tar is read by seeking from header to
+    header, and a compressed one decompresses past member data without checksumming it"""
+    members = []
+    with tarfile.open(path, "r:*") as archive:
+        for info in archive:
+            if cancel is not None and cancel.is_set():
+                raise Cancelled()
+            if info.isdir():
+                members.append(Member(info.name.rstrip("/"), True, 0, info.mtime, None))
+            elif info.isfile():
+                members.append(Member(info.name, False, info.size, info.mtime, None))
+    return members
+
+
+def _tar_crcs(path, names, cancel):
+    """{name: CRC32} for the member files `names` of a tar, read in one pass"""
+    crcs = {}
+    with tarfile.open(path, "r:*") as archive:
+        for info in archive:
+            if cancel is not None and cancel.is_set():
+                raise Cancelled()
+            if info.isfile() and info.name in names:
+                crcs[info.name] = _crc(archive.extractfile(info), cancel)[0]
+                if len(crcs) == len(names):
+                    break
+    return crcs
+
+
+def _gzip_trailer(path):
+    """(CRC32, size) from the last 8 bytes of a gzip file; the size is modulo 2**32,
+    and describes only the last member of a concatenated file"""
+    with open(path, "rb") as f:
+        if f.read(2) != b"\x1f\x8b":
+            raise OSError(f"Not a gzip file: {path}")
+        f.seek(-8, os.SEEK_END)
+        return struct.unpack("<II", f.read(8))
+
+
+def _list_compressed(path, opener, mtime, cancel):
+    """A single compressed file (e.g. "access.log.gz") holds one member"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    if opener is gzip.open:
+        crc, size = _gzip_trailer(path)
+    else:
+        # bzip2 and xz record no uncompressed size: the stream has to be read once anyway
+        with opener(path, "rb") as stream:
+            crc, size = _crc(stream, cancel)
+    return [Member(name, False, size, mtime, crc)]
+
+
+def list_archive(path, mtime=0.0, cancel=None):
+    """Return the Members of the archive at `path` without extracting anything.
+
+    Zip listings come straight from the central directory and gzip files from
+    their trailer; tar archives are read header by header, leaving member
+    CRC32s unset (see ArchiveIndex.fill_checksums). Single bzip2/xz files are
+    streamed once, as they store no size. Raises Cancelled or one of the read
+    errors.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ZIP_EXTENSIONS:
+        return _list_zip(path)
+    if ext in TAR_EXTENSIONS:
+        return _list_tar(path, cancel)
+    if ext in COMPRESSED_EXTENSIONS:
+        if path.lower().endswith(".tar" + ext) or tarfile.is_tarfile(path):
+            return _list_tar(path, cancel)
+        return _list_compressed(path, COMPRESSED_EXTENSIONS[ext], mtime, cancel)
+    raise ValueError(f"Not a supported archive: {path}")
+
+
+def _restat(item):
+    path = os.path.abspath(item[0])   # rows are looked up by absolute root bounds
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return path, st.st_size, st.st_mtime
+
+
+def _read(item, cancel):
+    path, size, mtime = item
+    try:
+        return item, list_archive(path, mtime, cancel), None
+    except Cancelled:
+        return item, None, None
+    except _READ_ERRORS as e:
+        return item, [], str(e) or type(e).__name__
+
+
+class ArchiveIndex:
+    """On-disk cache of archive member listings keyed by (path, size, mtime).
+
+    `update(root, archives)` lists every archive that is new or changed since
+    it was cached (across a small thread pool; decompression releases the GIL)
+    and forgets archives below `root` that are gone, so a multi-GB backup is
+    read once and afterwards costs one lookup. Member rows can then be
+    streamed, searched by name or matched by (size, CRC32) with plain SQL.
+
+    `refresh(root, file_index)` is the cheap form for per-query callers: it
+    only runs `update` again once the FileIndex has reported an archive added,
+    changed or removed (index refreshes and watcher events both go through
+    it), or when the last refresh of `root` is older than `max_age`.
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, workers=4):
+        self.db_path = str(db_path)
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._generation = 0    # bumped whenever a FileIndex reports an archive change
+        self._fresh = {}        # root -> (generation, time) of its last complete refresh
+        self._file_indexes = []
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS archives (
+                path TEXT PRIMARY KEY, size INTEGER, mtime REAL, members INTEGER, error TEXT);
+            CREATE TABLE IF NOT EXISTS members (
+                archive TEXT, name TEXT, lname TEXT, is_dir INTEGER, size INTEGER,
+                mtime REAL, crc INTEGER);
+            CREATE INDEX IF NOT EXISTS members_archive ON members(archive);
+        """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def update(self, root, archives, cancel=None, progress=None):
+        """Cache the listings of `archives`, (path, size, mtime) tuples found below `root`.
+
+        Each archive is re-stat'ed (an archive appended to in place keeps its
+        directory's mtime, so index rows may lag). Returns the number of
+        archives that had to be read. `progress(done, total)` is called as they
+        finish; setting `cancel` keeps what was read so far.
+        """
+        archives = [item for item in map(_restat, archives) if item is not None]
+        low, high = _bounds(root)
+        with self._lock:
+            cached = {row[0]: row[1:] for row in self._conn.execute(
+                "SELECT path, size, mtime FROM archives WHERE path > ? AND path < ?", (low, high))}
+        present = {path for path, _, _ in archives}
+        stale = [item for item in archives if cached.get(item[0]) != (item[1], item[2])]
+        gone = [path for path in cached if path not in present]
+        if gone:
+            with self._lock, self._conn:
+                for path in gone:
+                    self._forget(path)
+
+        read = 0
+        if not stale:
+            return read
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for item, members, error in pool.map(lambda item: _read(item, cancel), stale):
+                if members is None:
+                    continue  # cancelled mid-archive
+                self._store(item, members, error)
+                read += 1
+                if progress is not None:
+                    progress(read, len(stale))
+        return read
+
+    def refresh(self, root, file_index, max_age=60, cancel=None, progress=None):
+        """update() `root` from the archives `file_index` lists there, unless no archive
+        changed since its last complete refresh, less than `max_age` seconds ago"""
+        root = os.path.abspath(str(root))
+        if not any(known is file_index for known in self._file_indexes):
+            file_index.add_listener(self._on_change)
+            self._file_indexes.append(file_index)
+        generation = self._generation
+        fresh = self._fresh.get(root)
+        if fresh is not None and fresh[0] == generation and time.monotonic() - fresh[1] < max_age:
+            return 0
+        read = self.update(root, file_index.files_with_extensions(root, ARCHIVE_EXTENSIONS),
+                           cancel, progress)
+        if cancel is None or not cancel.is_set():
+            self._fresh[root] = (generation, time.monotonic())
+        return read
+
+    def _on_change(self, kind, items):
+        paths = (row[0] for row in items) if kind == "added" else items
+        if any(is_archive(path) for path in paths):
+            self._generation += 1
+
+    def _forget(self, path):
+        self._conn.execute("DELETE FROM archives WHERE path = ?", (path,))
+        self._conn.execute("DELETE FROM members WHERE archive = ?", (path,))
+
+    def _store(self, item, members, error):
+        path, size, mtime = item
+        with self._lock, self._conn:
+            self._forget(path)
+            self._conn.execute("INSERT INTO archives VALUES (?, ?, ?, ?, ?)",
+                               (path, size, mtime, len(members), error))
+            self._conn.executemany(
+                "INSERT INTO members VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((path, m.name, os.path.basename(m.name).lower(), int(m.is_dir), m.size, m.mtime, m.crc)
+                 for m in members))
+
+    def members(self, path):
+        """Cached Members of one archive ([] if unknown or unreadable)"""
+        with self._lock:
+            return [Member(name, bool(is_dir), size, mtime, crc) for name, is_dir, size, mtime, crc
+                    in self._conn.execute("SELECT name, is_dir, size, mtime, crc FROM members "
+                                          "WHERE archive = ?", (path,))]
+
+    def stats(self, root):
+        """(archives, unreadable archives, members) cached below `root`"""
+        low, high = _bounds(root)
+        with self._lock:
+            return self._conn.execute(
+                "SELECT count(*), count(error), coalesce(sum(members), 0) FROM archives "
+                "WHERE path > ? AND path < ?", (low, high)).fetchone()
+
+    def _select(self, sql, params, cancel, chunk):
+        """Stream a query's rows in chunks over a private connection (WAL keeps writers unblocked)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            cursor = conn.execute(sql, params)
+            while cancel is None or not cancel.is_set():
+                rows = cursor.fetchmany(chunk)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+    def iter_rows(self, root, cancel=None, chunk=2000):
+        """Yield (member path, is_dir, size, mtime, ext) for every member of the archives below `root`"""
+        low, high = _bounds(root)
+        for archive, name, is_dir, size, mtime in self._select(
+                "SELECT archive, name, is_dir, size, mtime FROM members "
+                "WHERE archive > ? AND archive < ?", (low, high), cancel, chunk):
+            yield (member_path(archive, name), is_dir, size, mtime,
+                   "" if is_dir else os.path.splitext(name)[1].lower())
+
+    def iter_search(self, root, query, cancel=None, chunk=500):
+        """Like iter_rows, but only members whose name contains `query`"""
+        low, high = _bounds(root)
+        for archive, name, is_dir, size, mtime in self._select(
+                "SELECT archive, name, is_dir, size, mtime FROM members "
+                "WHERE archive > ? AND archive < ? AND instr(lname, ?) > 0 ORDER BY archive, name",
+                (low, high, query.lower()), cancel, chunk):
+            yield (member_path(archive, name), is_dir, size, mtime,
+                   "" if is_dir else os.path.splitext(name)[1].lower())
+
+    def checksums(self, root, min_size=1, cancel=None):
+        """Yield (archive, member name, size, crc32) for the member files below `root`.
+
+        The crc32 is None for tar members until fill_checksums computed it.
+        """
+        low, high = _bounds(root)
+        yield from self._select(
+            "SELECT archive, name, size, crc FROM members WHERE archive > ? AND archive < ? "
+            "AND is_dir = 0 AND size >= ?", (low, high, min_size), cancel, 2000)
+
+    def fill_checksums(self, wanted, cancel=None, progress=None):
+        """Compute and cache the CRC32s of the (archive, member name) pairs `wanted`.
+
+        Each archive is read once, up to the last wanted member. Returns
+        {(archive, name): crc32}; unreadable archives are left out.
+        `progress(done, total)` counts archives.
+        """
+        names = defaultdict(set)
+        for archive, name in wanted:
+            names[archive].add(name)
+
+        def read(archive):
+            try:
+                return archive, _tar_crcs(archive, names[archive], cancel)
+            except (Cancelled, *_READ_ERRORS):
+                return archive, {}
+
+        result = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for done, (archive, crcs) in enumerate(pool.map(read, list(names)), 1):
+                with self._lock, self._conn:
+                    self._conn.executemany(
+                        "UPDATE members SET crc = ? WHERE archive = ? AND name = ?",
+                        ((crc, archive, name) for name, crc in crcs.items()))
+                result.update(((archive, name), crc) for name, crc in crcs.items())
+                if progress is not None:
+                    progress(done, len(names))
+        return result
+
+
+def _bounds(root):
+    prefix = os.path.abspath(str(root)).rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
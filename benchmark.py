@@ -0,0 +1,278 @@
+"""Reproducible benchmarks for the filesystem operations, run headlessly.
+
+Generates synthetic trees (wide or deep, with a mix of extensions), then
+times the operations behind the GUI actions, each in a fresh child process so
+that peak RSS and I/O counters belong to that operation alone:
+
+    load_directory            index refresh of one directory + listing (explorer)
+    search_files              substring search through the index
+    analyze_directory         index refresh + streaming analysis
+    organize_files            plan + journaled moves of a flat directory
+    generate_project          project skeletons from the default templates
+    update_structure_preview  the structure preview listing of a tree
+
+Examples:
+    python benchmark.py --files 10000 100000 --shape wide deep --out bench.json
+    python benchmark.py --files 10000 --compare bench.json
+
+Each result records wall time, read/write syscall counts (/proc/self/io),
+page faults, context switches and peak RSS; with --strace and strace
+installed, the total syscall count comes from `strace -c` instead.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+OPERATIONS = ["index_refresh", "load_directory", "search_files", "analyze_directory",
+              "organize_files", "generate_project", "update_structure_preview"]
+
+# (extension, weight): roughly what a home directory looks like
+EXTENSIONS = [(".txt", 10), (".py", 8), (".js", 6), (".jpg", 12), (".png", 8), (".pdf", 6),
+              (".docx", 3), (".mp3", 4), (".mp4", 2), (".zip", 2), (".json", 6), (".md", 5),
+              (".csv", 4), ("", 4)]
+
+FILES_PER_DIR = 100
+FANOUT = 32
+DEEP_LEVELS = 40
+ORGANIZE_FILES = 5000
+PROJECTS = 200
+
+
+def generate_tree(root, files, shape="wide", seed=0, max_size=1024):
+    """Create `files` files below `root` and return the number of directories.
+
+    "wide" spreads FILES_PER_DIR files per directory over a FANOUT-ary tree;
+    "deep" stacks directories DEEP_LEVELS levels deep. A manifest makes
+    repeated runs with the same parameters reuse the existing tree.
+    """
+    manifest_path = os.path.join(root, ".bench_manifest.json")
+    manifest = {"files": files, "shape": shape, "seed": seed, "max_size": max_size}
+    try:
+        with open(manifest_path) as f:
+            if json.load(f) == manifest:
+                return sum(1 for _ in os.walk(root)) - 1
+    except (OSError, ValueError):
+        pass
+    shutil.rmtree(root, ignore_errors=True)
+    os.makedirs(root)
+
+    rng = random.Random(seed)
+    names, weights = zip(*EXTENSIONS)
+    payload = b"x" * max_size
+    n_dirs = -(-files // FILES_PER_DIR)
+    made = set()
+    for d in range(n_dirs):
+        if shape == "deep":
+            chain, level = divmod(d, DEEP_LEVELS)
+            parts = [f"chain{chain:04d}"] + [f"level{k:02d}" for k in range(1, level + 1)]
+        else:
+            parts = []
+            n = d
+            while True:
+                n, digit = divmod(n, FANOUT)
+                parts.append(f"dir{digit:02d}")
+                if not n:
+                    break
+        directory = os.path.join(root, *parts)
+        if directory not in made:
+            os.makedirs(directory, exist_ok=True)
+            made.add(directory)
+        for i in range(min(FILES_PER_DIR, files - d * FILES_PER_DIR)):
+            ext = rng.choices(names, weights)[0]
+            with open(os.path.join(directory, f"file{d:06d}_{i:03d}{ext}"), "wb") as f:
+                f.write(payload[:rng.randint(0, max_size)])
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    return sum(1 for _ in os.walk(root)) - 1
+
+
+def _flat_directory(path, files, seed=0):
+    """A fresh directory of `files` files for organize_files"""
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    rng = random.Random(seed)
+    names, weights = zip(*EXTENSIONS)
+    for i in range(files):
+        open(os.path.join(path, f"file{i:06d}{rng.choices(names, weights)[0]}"), "wb").close()
+
+
+def _counters():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    counters = {"minor_faults": usage.ru_minflt, "major_faults": usage.ru_majflt,
+                "voluntary_switches": usage.ru_nvcsw, "involuntary_switches": usage.ru_nivcsw}
+    try:
+        with open("/proc/self/io") as f:
+            io = dict(line.split(": ") for line in f.read().splitlines())
+        counters["read_syscalls"] = int(io["syscr"])
+        counters["write_syscalls"] = int(io["syscw"])
+    except (OSError, KeyError):
+        pass
+    return counters
+
+
+def run_operation(operation, tree, workdir):
+    """Run one operation in this process and return its measurements"""
+    # Keep organize journals and caches out of the real home directory
+    os.environ["HOME"] = workdir
+    import organizer_core
+    from file_index import FileIndex
+
+    index_path = os.path.join(workdir, "index.db")
+    if operation == "index_refresh" and os.path.exists(index_path):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(index_path + suffix):
+                os.remove(index_path + suffix)
+    index = FileIndex(index_path)
+    config = organizer_core.DEFAULT_CONFIG
+    first_dir = os.path.join(tree, sorted(d for d in os.listdir(tree) if not d.startswith("."))[0])
+
+    # Setup that is not part of the measurement
+    if operation == "organize_files":
+        target = os.path.join(workdir, "organize")
+        _flat_directory(target, ORGANIZE_FILES)
+    elif operation == "generate_project":
+        target = os.path.join(workdir, "projects")
+        shutil.rmtree(target, ignore_errors=True)
+        os.makedirs(target)
+
+    before = _counters()
+    start = time.perf_counter()
+    if operation == "index_refresh":
+        detail = {"dirs_listed": index.refresh(tree)}
+    elif operation == "load_directory":
+        index.refresh(first_dir, max_depth=0)
+        detail = {"rows": len(index.list_dir(first_dir))}
+    elif operation == "search_files":
+        detail = {"matches": sum(1 for _ in organizer_core.search(tree, "file00", index))}
+    elif operation == "analyze_directory":
+        detail = {"files": organizer_core.analyze(tree, index)["total_files"]}
+    elif operation == "organize_files":
+        detail = {"moved": organizer_core.organize(target, config)["moved"]}
+    elif operation == "generate_project":
+        paths, errors = organizer_core.generate_projects(
+            [f"project{i}" for i in range(PROJECTS)], "python", target, config)
+        detail = {"projects": len(paths), "errors": len(errors)}
+    elif operation == "update_structure_preview":
+        detail = {"lines": organizer_core.structure_preview(tree).count("\n") + 1}
+    else:
+        raise ValueError(f"unknown operation: {operation}")
+    wall = time.perf_counter() - start
+    after = _counters()
+
+    result = {"operation": operation, "wall_s": round(wall, 4),
+              "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    result.update({k: after[k] - before[k] for k in after})
+    result.update(detail)
+    return result
+
+
+def _strace_total(output_path):
+    """Total syscall count from an `strace -c` summary"""
+    with open(output_path) as f:
+        for line in f:
+            fields = line.split()
+            if fields and fields[-1] == "total":
+                return int(fields[3])
+    return None
+
+
+def measure(operation, tree, workdir, use_strace=False):
+    """Run `operation` in a child process and return its result dict"""
+    command = [sys.executable, os.path.abspath(__file__), "--run-one", operation,
+               "--tree", tree, "--workdir", workdir]
+    strace_out = None
+    if use_strace and shutil.which("strace"):
+        strace_out = os.path.join(workdir, "strace.txt")
+        command = ["strace", "-f", "-c", "-o", strace_out] + command
+    completed = subprocess.run(command, capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        return {"operation": operation, "error": completed.stderr.strip().splitlines()[-1:]}
+    result = json.loads(completed.stdout)
+    if strace_out:
+        result["syscalls"] = _strace_total(strace_out)
+    return result
+
+
+def compare(current, baseline):
+    """Print wall-time and RSS ratios of `current` against a previous results file"""
+    previous = {(r["files"], r["shape"], r["operation"]): r for r in baseline["results"]}
+    for r in current["results"]:
+        old = previous.get((r["files"], r["shape"], r["operation"]))
+        if old is None or "wall_s" not in r or "wall_s" not in old:
+            continue
+        ratio = r["wall_s"] / old["wall_s"] if old["wall_s"] else float("inf")
+        print(f"{r['shape']:>5} {r['files']:>8} {r['operation']:<25} "
+              f"{old['wall_s']:>9.3f}s -> {r['wall_s']:>9.3f}s  x{ratio:.2f}  "
+              f"rss {old['peak_rss_kb']} -> {r['peak_rss_kb']} KB", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the file organizer operations")
+    parser.add_argument("--files", type=int, nargs="+", default=[10000],
+                        help="tree sizes to generate (e.g. 10000 100000 1000000)")
+    parser.add_argument("--shape", nargs="+", choices=["wide", "deep"], default=["wide"])
+    parser.add_argument("--ops", nargs="+", choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per operation (best is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-size", type=int, default=1024, help="largest synthetic file in bytes")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "organizer_bench"))
+    parser.add_argument("--out", help="write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    parser.add_argument("--strace", action="store_true", help="count all syscalls with strace -c")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    parser.add_argument("--tree", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.run_one:
+        json.dump(run_operation(args.run_one, args.tree, args.workdir), sys.stdout)
+        return 0
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+              "platform": platform.platform(), "cpus": os.cpu_count(), "results": []}
+    for shape in args.shape:
+        for files in args.files:
+            workdir = os.path.join(args.workdir, f"{shape}_{files}")
+            tree = os.path.join(workdir, "tree")
+            os.makedirs(workdir, exist_ok=True)
+            start = time.perf_counter()
+            dirs = generate_tree(tree, files, shape, args.seed, args.max_size)
+            print(f"{shape} tree with {files} files / {dirs} dirs ready in "
+                  f"{time.perf_counter() - start:.1f}s", file=sys.stderr)
+            # Everything after index_refresh reads the index it builds
+            ops = [op for op in OPERATIONS if op in args.ops or op == "index_refresh"]
+            for operation in ops:
+                runs = [measure(operation, tree, workdir, args.strace) for _ in range(args.repeat)]
+                ok = [r for r in runs if "wall_s" in r]
+                best = min(ok, key=lambda r: r["wall_s"]) if ok else runs[0]
+                best.update({"files": files, "shape": shape, "dirs": dirs})
+                report["results"].append(best)
+                print(f"  {operation:<25} {best.get('wall_s', 'error')}", file=sys.stderr)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import collections
+import json
+import threading
+import time
+from pathlib import Path
+
+from digest import estimate_tokens
+
+
+DEFAULT_HISTORY_PATH = Path.home() / ".ai_file_organizer_chat.jsonl"
+
+MESSAGE_OVERHEAD = 4    # tokens each chat message costs beyond its text
+
+
+class ChatHistory:
+    """The conversation: every turn is appended to a JSONL file on disk, and
+    the most recent ones are kept in memory to build the model's context."""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, keep=200):
+        self.path = Path(path) if path else None
+        self.turns = collections.deque(maxlen=keep)
+        self.session = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._lock = threading.Lock()
+
+    def add(self, role, content):
+        """Record a "user" or "assistant" turn"""
+        turn = {"role": role, "content": content}
+        with self._lock:
+            self.turns.append(turn)
+            if self.path is None:
+                return
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(dict(turn, session=self.session, time=time.time())) + "\n")
+            except OSError:
+                pass    # the conversation still works without its log
+
+    def messages(self, message, system=None, context="", budget=3000):
+        """Chat messages for the model within `budget` tokens.
+
+        The system prompt, the (already budgeted) directory `context` and the
+        new `message` always go in; the remaining budget is filled with the
+        most recent turns, newest first, so the request stops growing with the
+        length of the session.
+        """
+        content = f"{context}\n\n{message}" if context else message
+        used = estimate_tokens(content) + MESSAGE_OVERHEAD
+        if system:
+            used += estimate_tokens(system) + MESSAGE_OVERHEAD
+        with self._lock:
+            turns = list(self.turns)
+        recent = []
+        for turn in reversed(turns):
+            cost = estimate_tokens(turn["content"]) + MESSAGE_OVERHEAD
+            if used + cost > budget:
+                break
+            recent.append(turn)
+            used += cost
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.extend(recent[::-1])
+        messages.append({"role": "user", "content": content})
+        return messages
+
+
+class ChatTranscript:
+    """Streams text into a Tk Text widget in coalesced batches and keeps it short.
+
+    `write` may be called from any thread; the Tk thread inserts everything
+    written since its last poll with a single insert every `poll_ms`. Once the
+    widget holds more than `max_lines` lines, the oldest are deleted down to
+    `keep_lines` (the full conversation is in the ChatHistory file).
+    """
+
+    def __init__(self, widget, max_lines=1000, keep_lines=800, poll_ms=50):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.keep_lines = min(keep_lines, max_lines)
+        self.poll_ms = poll_ms
+        self._pending = []
+        self._lock = threading.Lock()
+        self.widget.after(self.poll_ms, self._poll)
+
+    def write(self, text):
+        with self._lock:
+            self._pending.append(text)
+
+    def _poll(self):
+        try:
+            with self._lock:
+                text = "".join(self._pending)
+                self._pending.clear()
+            if text:
+                self._insert(text)
+        finally:
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _insert(self, text):
+        widget = self.widget
+        following = widget.yview()[1] >= 0.999   # don't yank the view if the user scrolled up
+        widget.config(state="normal")
+        widget.insert("end", text)
+        lines = int(widget.index("end-1c").split(".")[0])
+        if lines > self.max_lines:
+            widget.delete("1.0", f"{lines - self.keep_lines + 1}.0")
+        widget.config(state="disabled")
+        if following:
+            widget.see("end")
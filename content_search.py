@@ -0,0 +1,186 @@
+import mmap
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+
+FileMatches = namedtuple("FileMatches", "path lines")  # lines: [(line_no, text)]
+
+DEFAULT_SKIP_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".bmp", ".ico", ".webp", ".tif", ".tiff",
+    ".mp3", ".wav", ".flac", ".ogg", ".mp4", ".avi", ".mkv", ".mov",
+    ".zip", ".gz", ".bz2", ".xz", ".7z", ".rar", ".tar", ".whl", ".jar",
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx",
+    ".exe", ".dll", ".so", ".dylib", ".o", ".a", ".pyc", ".class", ".db", ".sqlite",
+}
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+BINARY_SNIFF = 8192             # a NUL byte in the first few KB marks a file as binary
+BATCH_BYTES = 8 * 1024 * 1024   # files are sent to the workers in batches of about this size
+MAX_LINE = 300
+POOL_THRESHOLD = 32             # searches over fewer files than this run in-process
+
+
+def compile_pattern(pattern, regex=False, ignore_case=True):
+    """Compile a literal or regex pattern for matching file content (bytes).
+
+    The pattern runs over a whole file at once, so it is compiled with
+    re.MULTILINE: ^ and $ anchor at every line, as they would in grep.
+    """
+    source = pattern.encode("utf-8")
+    if not regex:
+        source = re.escape(source)
+    return re.compile(source, re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+
+
+def _count_newlines(data, start, end, step=16 * 1024 * 1024):
+    count = 0
+    for offset in range(start, end, step):
+        count += data[offset:min(offset + step, end)].count(b"\n")
+    return count
+
+
+def grep_file(path, pattern, max_matches=100):
+    """Return [(line_no, text)] of lines in `path` matching `pattern`.
+
+    The file is mapped, not read; binary files and unreadable files give [].
+    Each matching line is reported once, at most `max_matches` per file.
+    """
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data.find(b"\0", 0, BINARY_SNIFF) != -1:
+                    return []
+                lines = []
+                line_no, counted_to, next_line = 1, 0, -1
+                for match in pattern.finditer(data):
+                    start = match.start()
+                    if start < next_line:
+                        continue  # another hit on a line already reported
+                    line_start = data.rfind(b"\n", 0, start) + 1
+                    line_end = data.find(b"\n", start)
+                    if line_end == -1:
+                        line_end = len(data)
+                    line_no += _count_newlines(data, counted_to, line_start)
+                    counted_to = line_start
+                    text = data[line_start:min(line_end, line_start + MAX_LINE)]
+                    lines.append((line_no, text.decode("utf-8", "replace").rstrip("\r")))
+                    next_line = line_end + 1
+                    if len(lines) >= max_matches:
+                        break
+                return lines
+    except (OSError, ValueError):
+        return []
+
+
+def grep_batch(paths, pattern_source, flags, max_matches):
+    """Worker: grep several files; returns [(path, lines)] for files that matched"""
+    pattern = re.compile(pattern_source, flags)
+    results = []
+    for path in paths:
+        lines = grep_file(path, pattern, max_matches)
+        if lines:
+            results.append((path, lines))
+    return results
+
+
+def _batches(files, batch_bytes=BATCH_BYTES, batch_files=64):
+    batch, size = [], 0
+    for path, file_size in files:
+        batch.append(path)
+        size += file_size
+        if size >= batch_bytes or len(batch) >= batch_files:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def select_files(rows, max_size=DEFAULT_MAX_SIZE, skip_extensions=DEFAULT_SKIP_EXTENSIONS):
+    """Filter (path, is_dir, size, mtime, ext) rows down to (path, size) worth grepping"""
+    for path, is_dir, size, mtime, ext in rows:
+        if not is_dir and 0 < size <= max_size and ext not in skip_extensions:
+            yield path, size
+
+
+class ContentSearch:
+    """Greps file contents across a process pool and streams the hits.
+
+    Files are mapped with mmap and searched with a compiled bytes regex
+    (literal patterns are escaped), so content never crosses into Python
+    strings except for the matching lines. Work goes out in small batches
+    with a bounded number in flight, so results stream as they are found and
+    cancelling stops within one batch per worker. The pool is created on the
+    first large search and reused afterwards, or replaced if a worker dies.
+    """
+
+    def __init__(self, workers=None, max_matches=100):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_matches = max_matches
+        self._pool = None
+
+    def search(self, files, pattern, cancel=None):
+        """Yield FileMatches for the (path, size) pairs in `files` matching `pattern`"""
+        def cancelled():
+            return cancel is not None and cancel.is_set()
+
+        batches = _batches(files)
+        first = []
+        for batch in batches:
+            first.append(batch)
+            if sum(len(b) for b in first) >= POOL_THRESHOLD:
+                break
+        else:
+            # Small search: not worth waking the pool
+            for batch in first:
+                for path in batch:
+                    if cancelled():
+                        return
+                    lines = grep_file(path, pattern, self.max_matches)
+                    if lines:
+                        yield FileMatches(path, lines)
+            return
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        args = (pattern.pattern, pattern.flags, self.max_matches)
+        pending = set()
+        queued = iter(first)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < self.workers * 2:
+                    batch = next(queued, None)
+                    if batch is None:
+                        batch = next(batches, None)
+                    if batch is None:
+                        exhausted = True
+                        break
+                    pending.add(self._pool.submit(grep_batch, batch, *args))
+                if not pending:
+                    return
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                if cancelled():
+                    return
+                for future in done:
+                    for path, lines in future.result():
+                        if cancelled():
+                            return
+                        yield FileMatches(path, lines)
+        except BrokenProcessPool:
+            # A worker died (killed, out of memory): report it for this search and
+            # let the next one start a fresh pool instead of failing forever
+            pending = set()
+            self.close()
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self, wait=False):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+
+
+DEFAULT_CACHE_PATH = Path.home() / ".ai_file_organizer_digests.db"
+
+SAMPLES_PER_EXT = 5
+TOP_SUBTREES = 5
+RECENT_ROOTS = 16  # roots whose last digest is kept in memory
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English/paths)"""
+    return len(text) // 4 + 1
+
+
+def _human(size):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024.0:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} TB"
+
+
+def merkle_hashes(dir_mtimes):
+    """Hash every directory from its own mtime and its subdirectories' hashes.
+
+    A directory's hash changes exactly when it or something below it was
+    re-listed with a different mtime, so unchanged subtrees keep their hash.
+    """
+    children = defaultdict(list)
+    for path, _ in dir_mtimes:
+        children[os.path.dirname(path)].append(path)
+    hashes = {}
+    for path, mtime_ns in sorted(dir_mtimes, key=lambda d: d[0].count(os.sep), reverse=True):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{path}\0{mtime_ns}".encode("utf-8", "surrogateescape"))
+        for child in sorted(children.get(path, ())):
+            h.update(hashes[child].encode())
+        hashes[path] = h.hexdigest()
+    return hashes
+
+
+class TreeSummary:
+    """Mergeable, bounded-size statistics for one subtree"""
+
+    def __init__(self):
+        self.files = 0
+        self.dirs = 0
+        self.bytes = 0
+        self.max_depth = 0
+        self.ext = {}                   # ext -> [count, bytes]
+        self.size_hist = [0] * 64       # files per power-of-two size bucket
+        self.samples = {}               # ext -> a few file names
+        self.children = []              # immediate subdirectories: [bytes, name, files, depth]
+
+    def add(self, relpath, is_dir, size, ext):
+        depth = relpath.count(os.sep) + 1
+        self.max_depth = max(self.max_depth, depth)
+        if is_dir:
+            self.dirs += 1
+            return
+        self.files += 1
+        self.bytes += size
+        counts = self.ext.setdefault(ext, [0, 0])
+        counts[0] += 1
+        counts[1] += size
+        self.size_hist[min(size.bit_length(), 63)] += 1
+        names = self.samples.setdefault(ext, [])
+        if len(names) < SAMPLES_PER_EXT:
+            names.append(os.path.basename(relpath))
+
+    def merge(self, other, name=None):
+        """Fold `other` in; `name` records it as an immediate subdirectory"""
+        self.files += other.files
+        self.dirs += other.dirs + (1 if name is not None else 0)
+        self.bytes += other.bytes
+        self.max_depth = max(self.max_depth, other.max_depth + (1 if name is not None else 0))
+        for ext, (count, size) in other.ext.items():
+            counts = self.ext.setdefault(ext, [0, 0])
+            counts[0] += count
+            counts[1] += size
+        for i, count in enumerate(other.size_hist):
+            self.size_hist[i] += count
+        for ext, names in other.samples.items():
+            mine = self.samples.setdefault(ext, [])
+            mine.extend(names[:SAMPLES_PER_EXT - len(mine)])
+        if name is not None:
+            self.children.append([other.bytes, name, other.files, other.max_depth + 1])
+
+    def percentile(self, fraction):
+        """Approximate size percentile (upper bound of the power-of-two bucket)"""
+        target = fraction * self.files
+        seen = 0
+        for bucket, count in enumerate(self.size_hist):
+            seen += count
+            if count and seen >= target:
+                return 0 if bucket == 0 else 2 ** bucket - 1
+        return 0
+
+    def to_json(self):
+        return json.dumps(self.__dict__)
+
+    @classmethod
+    def from_json(cls, text):
+        summary = cls()
+        summary.__dict__.update(json.loads(text))
+        return summary
+
+
+class DigestBuilder:
+    """Summarizes a directory tree into a bounded-size text for AI prompts.
+
+    The digest lists totals, an extension histogram, size percentiles, the
+    largest and deepest subtrees and a few sample names, and stops adding
+    lines once `token_budget` is reached. Top-level subtree summaries and
+    finished digests are cached by Merkle hashes of directory mtimes from the
+    index, so only subtrees that changed are summarized again. The cache holds
+    one row per path and kind (subtree summary, or digest per token budget):
+    a changed subtree replaces its previous row. The last digest of the
+    RECENT_ROOTS most recently used roots is also kept in memory with the
+    root's generation (bumped by every change the index reports below it), so
+    repeat prompts skip even the index refresh until something changes or
+    `max_age` seconds pass.
+    """
+
+    def __init__(self, index, cache_path=DEFAULT_CACHE_PATH):
+        self.index = index
+        self._generations = {}        # root -> count of index changes seen below it
+        self._recent = OrderedDict()  # root -> (token_budget, generation, time, text), oldest first
+        self._recent_lock = threading.Lock()
+        index.add_listener(self._on_change)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(cache_path), check_same_thread=False)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(digests)")]
+        if columns and "path" not in columns:
+            # Rows keyed by hash alone were never replaced and only grew; start over
+            self._conn.execute("DROP TABLE digests")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS digests ("
+                           "path TEXT, kind TEXT, hash TEXT, value TEXT, PRIMARY KEY (path, kind))")
+
+    def _cached(self, path, kind, tree_hash):
+        with self._lock:
+            row = self._conn.execute("SELECT hash, value FROM digests WHERE path = ? AND kind = ?",
+                                     (path, kind)).fetchone()
+        return row[1] if row and row[0] == tree_hash else None
+
+    def _store(self, path, kind, tree_hash, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?)",
+                               (path, kind, tree_hash, value))
+
+    def _on_change(self, kind, items):
+        if not self._generations:
+            return
+        paths = [row[0] for row in items] if kind == "added" else items
+        with self._recent_lock:
+            for root in self._generations:
+                prefix = root.rstrip(os.sep) + os.sep
+                if any(path.startswith(prefix) for path in paths):
+                    self._generations[root] += 1
+
+    def _remember(self, root, token_budget, generation, text):
+        with self._recent_lock:
+            self._recent[root] = (token_budget, generation, time.monotonic(), text)
+            self._recent.move_to_end(root)
+            while len(self._recent) > RECENT_ROOTS:
+                old, _ = self._recent.popitem(last=False)
+                self._generations.pop(old, None)
+
+    def build(self, root, token_budget=800, cancel=None, max_age=60):
+        """Return the digest text for `root`, reusing cached work where nothing changed.
+
+        Setting `cancel` stops the index refresh early; the digest then covers
+        what was indexed so far and is not remembered.
+        """
+        root = os.path.abspath(str(root))
+        with self._recent_lock:
+            recent = self._recent.get(root)
+            if (recent is not None and recent[0] == token_budget
+                    and recent[1] == self._generations.get(root)
+                    and time.monotonic() - recent[2] < max_age):
+                self._recent.move_to_end(root)
+                return recent[3]
+
+        self.index.refresh(root, cancel=cancel)
+        # Read after the refresh: its own changes are in this digest, later ones bump it
+        with self._recent_lock:
+            generation = self._generations.setdefault(root, 0)
+        hashes = merkle_hashes(self.index.dir_mtimes(root))
+        root_hash = hashes.get(root)
+
+        kind = f"digest:{token_budget}"
+        text = self._cached(root, kind, root_hash) if root_hash is not None else None
+        if text is None:
+            summary = self.summarize(root, hashes)
+            text = render_digest(root, summary, token_budget)
+            if root_hash is not None:
+                self._store(root, kind, root_hash, text)
+        if cancel is None or not cancel.is_set():
+            self._remember(root, token_budget, generation, text)
+        else:
+            with self._recent_lock:
+                if root not in self._recent:
+                    self._generations.pop(root, None)
+        return text
+
+    def summarize(self, root, hashes):
+        """TreeSummary of `root`, built from cached top-level subtree summaries"""
+        summary = TreeSummary()
+        for name, is_dir, size, mtime, ext in self.index.list_dir(root):
+            if not is_dir:
+                summary.add(name, False, size, ext)
+                continue
+            path = os.path.join(root, name)
+            subtree_hash = hashes.get(path)
+            cached = self._cached(path, "subtree", subtree_hash) if subtree_hash else None
+            if cached is not None:
+                child = TreeSummary.from_json(cached)
+            else:
+                child = TreeSummary()
+                prefix = len(path) + 1
+                for row_path, row_is_dir, row_size, _, row_ext in self.index.iter_rows(path):
+                    child.add(row_path[prefix:], row_is_dir, row_size, row_ext)
+                if subtree_hash:
+                    self._store(path, "subtree", subtree_hash, child.to_json())
+            summary.merge(child, name)
+        return summary
+
+
+def render_digest(root, summary, token_budget):
+    """Render a TreeSummary as text, most important lines first, within the token budget"""
+    lines = []
+    used = 0
+
+    def add(line):
+        nonlocal used
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            return False
+        lines.append(line)
+        used += cost
+        return True
+
+    sections = [
+        [f"Directory: {root}",
+         f"Totals: {summary.files:,} files, {summary.dirs:,} folders, {_human(summary.bytes)}, "
+         f"max depth {summary.max_depth}"],
+    ]
+    by_count = sorted(summary.ext.items(), key=lambda x: x[1][0], reverse=True)
+    sections.append(["File types: " + ", ".join(
+        f"{ext or '(none)'} {count:,} ({_human(size)})" for ext, (count, size) in by_count[:20])])
+    if summary.files:
+        sections.append(["File sizes: " + ", ".join(
+            f"p{int(p * 100)} ~{_human(summary.percentile(p))}" for p in (0.5, 0.9, 0.99))])
+    if summary.children:
+        largest = sorted(summary.children, reverse=True)[:TOP_SUBTREES]
+        sections.append(["Largest subtrees: " + ", ".join(
+            f"{name}/ {_human(size)} ({size * 100 // max(summary.bytes, 1)}%, {files:,} files, depth {depth})"
+            for size, name, files, depth in largest)])
+        deepest = [c for c in sorted(summary.children, key=lambda c: c[3], reverse=True)[:TOP_SUBTREES]
+                   if c[3] > 1]
+        if deepest:
+            sections.append(["Deepest subtrees: " + ", ".join(
+                f"{name}/ depth {depth}" for size, name, files, depth in deepest)])
+    sections.append([f"Sample names {ext or '(none)'}: {', '.join(summary.samples.get(ext, []))}"
+                     for ext, _ in by_count[:10] if summary.samples.get(ext)])
+
+    for section in sections:
+        for line in section:
+            if not add(line):
+                return "\n".join(lines)
+    return "\n".join(lines)
@@ -0,0 +1,94 @@
+import os
+from collections import defaultdict, namedtuple
+
+
+Usage = namedtuple("Usage", "bytes files dirs")
+
+# Above this many re-listed directories one grouped scan beats per-directory lookups
+BULK_THRESHOLD = 500
+
+
+class DiskUsage:
+    """Recursive size and file-count rollups per directory.
+
+    Rollups live in the index database next to the directory mtimes they were
+    computed from. A rollup pass refreshes the index (which only re-lists
+    directories whose mtime changed), recomputes the files-only totals of
+    those directories and then re-adds subtotals bottom-up, touching only the
+    ancestors whose children actually changed. An unchanged tree is rolled up
+    from the cache without reading a single entry row.
+
+    As with the index itself, a file edited in place does not change its
+    directory's mtime, so its new size is counted once the directory is
+    re-listed.
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    def rollup(self, root, cancel=None, progress=None, refresh=True):
+        """Bring the rollups below `root` up to date; returns {directory: Usage} (None if cancelled)"""
+        root = os.path.abspath(str(root))
+        if refresh:
+            self.index.refresh(root, cancel=cancel, progress=progress)
+        if cancel is not None and cancel.is_set():
+            return None
+
+        mtimes = dict(self.index.dir_mtimes(root))
+        stored = self.index.usage_rows(root)
+        relisted = [path for path, mtime_ns in mtimes.items()
+                    if path not in stored or stored[path][0] != mtime_ns]
+        if len(relisted) > BULK_THRESHOLD:
+            own = self.index.file_totals(root)
+        else:
+            own = self.index.file_totals(root, relisted)
+        relisted = set(relisted)
+
+        children = defaultdict(list)
+        for path in mtimes:
+            if path != root:
+                children[os.path.dirname(path)].append(path)
+
+        rows = {}
+        changed = set()
+        # Deepest first, so every subdirectory is settled before its parent
+        for path in sorted(mtimes, key=lambda p: p.count(os.sep), reverse=True):
+            kids = children.get(path, ())
+            previous = stored.get(path)
+            if path not in relisted and not changed.intersection(kids):
+                rows[path] = previous
+                continue
+            if path in relisted:
+                own_bytes, own_files = own.get(path, (0, 0))
+            else:
+                own_bytes, own_files = previous[1], previous[2]
+            total_bytes, total_files, total_dirs = own_bytes, own_files, len(kids)
+            for kid in kids:
+                kid_row = rows[kid]
+                total_bytes += kid_row[3]
+                total_files += kid_row[4]
+                total_dirs += kid_row[5]
+            row = (mtimes[path], own_bytes, own_files, total_bytes, total_files, total_dirs)
+            rows[path] = row
+            if row != previous:
+                changed.add(path)
+
+        if cancel is not None and cancel.is_set():
+            return None
+        self.index.store_usage([(path,) + rows[path] for path in changed],
+                               forget=[path for path in stored if path not in mtimes])
+        return {path: Usage(*row[3:]) for path, row in rows.items()}
+
+    def cached(self, paths):
+        """Return {directory: Usage} for the `paths` that have a stored rollup (possibly stale)"""
+        return {path: Usage(*row) for path, row in self.index.usage_for(list(paths)).items()}
+
+    def largest(self, root, top=20, cancel=None):
+        """Roll up `root` and return (its Usage, [(subdirectory, Usage)] largest first)"""
+        root = os.path.abspath(str(root))
+        usage = self.rollup(root, cancel)
+        if usage is None or root not in usage:
+            return None, []
+        kids = [(path, u) for path, u in usage.items() if os.path.dirname(path) == root and path != root]
+        kids.sort(key=lambda item: item[1].bytes, reverse=True)
+        return usage[root], kids[:top]
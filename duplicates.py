@@ -0,0 +1,357 @@
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import zlib
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from archives import ARCHIVE_EXTENSIONS, is_member_path, member_path
+from fs_walk import walk
+
+
+DEFAULT_CACHE_PATH = Path.home() / ".ai_file_organizer_hashes.db"
+
+EDGE_BYTES = 4096               # bytes hashed from each end in the partial stage
+CHUNK_BYTES = 1024 * 1024       # read size for chunked full hashing
+MMAP_THRESHOLD = 8 * 1024 * 1024  # files at least this big are hashed through mmap
+POOL_THRESHOLD = 16             # fewer full hashes than this run in-process
+
+
+class DuplicateGroup(namedtuple("DuplicateGroup", "size digest paths")):
+    """Files with identical content; `paths` are sorted and the first is kept by default.
+
+    Copies inside archives ("<archive>!/<member>" paths) come after the files
+    on disk; they are reported but never deleted or linked.
+    """
+    __slots__ = ()
+
+    @property
+    def wasted(self):
+        """Bytes that would be reclaimed by keeping a single copy on disk"""
+        on_disk = sum(1 for path in self.paths if not is_member_path(path))
+        return self.size * max(on_disk - 1, 0)
+
+
+def _new_hash():
+    return hashlib.blake2b(digest_size=20)
+
+
+def partial_hash(path, size, edge=EDGE_BYTES):
+    """Hash the first and last `edge` bytes; for small files this is the full content hash"""
+    h = _new_hash()
+    with open(path, "rb") as f:
+        if size <= 2 * edge:
+            h.update(f.read())
+        else:
+            h.update(f.read(edge))
+            f.seek(-edge, os.SEEK_END)
+            h.update(f.read(edge))
+    return h.hexdigest()
+
+
+def file_crc32(path):
+    """CRC32 of a whole file, comparable with the checksums stored in archives (None on error)"""
+    crc = 0
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+                crc = zlib.crc32(chunk, crc)
+    except OSError:
+        return None
+    return crc
+
+
+def full_hash(path):
+    """Hash a whole file, through mmap for large files; returns (path, digest or None)"""
+    h = _new_hash()
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    with memoryview(m) as view:
+                        for offset in range(0, size, CHUNK_BYTES):
+                            h.update(view[offset:offset + CHUNK_BYTES])
+            else:
+                for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+                    h.update(chunk)
+    except (OSError, ValueError):
+        return path, None
+    return path, h.hexdigest()
+
+
+class HashCache:
+    """On-disk cache of partial/full hashes keyed by (dev, inode, size, mtime)"""
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(hashes)")]
+        if columns and "dev" not in columns:
+            # Keys without the device were ambiguous across filesystems; start over
+            self._conn.execute("DROP TABLE hashes")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "dev INTEGER, inode INTEGER, size INTEGER, mtime REAL, path TEXT, partial TEXT, full TEXT, "
+            "PRIMARY KEY (dev, inode, size, mtime));"
+            "CREATE INDEX IF NOT EXISTS hashes_path ON hashes (path);")
+
+    @staticmethod
+    def key(entry):
+        return entry.dev, entry.inode, entry.size, entry.mtime
+
+    def get(self, entry):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT partial, full FROM hashes WHERE dev = ? AND inode = ? AND size = ? AND mtime = ?",
+                self.key(entry)).fetchone()
+        return row if row else (None, None)
+
+    def put(self, entry, partial=None, full=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (dev, inode, size, mtime) DO UPDATE SET path = excluded.path, "
+                "partial = COALESCE(excluded.partial, partial), full = COALESCE(excluded.full, full)",
+                self.key(entry) + (os.path.abspath(entry.path), partial, full))
+
+    def prune(self, root, live):
+        """Drop the rows of files below `root` whose key is not in `live` (deleted or changed)"""
+        prefix = os.path.join(os.path.abspath(root), "")
+        end = prefix[:-1] + chr(ord(os.sep) + 1)
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT dev, inode, size, mtime FROM hashes WHERE path >= ? AND path < ?",
+                (prefix, end)).fetchall()
+            self._conn.executemany(
+                "DELETE FROM hashes WHERE dev = ? AND inode = ? AND size = ? AND mtime = ?",
+                [row for row in rows if row not in live])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DuplicateFinder:
+    """Staged duplicate detection: size buckets, then edge hashes, then full hashes.
+
+    Each stage only looks at files that still collide, and full hashes are spread
+    over a process pool. Hashes are cached by (dev, inode, size, mtime), so
+    re-running over an unchanged tree reads no file content at all.
+
+    Given an archives.ArchiveIndex, archive members take part too: they match
+    each other and files on disk by (size, CRC32) from the cached listings, and
+    only files on disk whose size equals some member's are read for a CRC32.
+    """
+
+    def __init__(self, cache=None, workers=None, min_size=1, archives=None):
+        self.cache = cache if cache is not None else HashCache()
+        self.workers = workers
+        self.min_size = min_size
+        self.archives = archives
+
+    def find(self, root, progress=None, cancel=None):
+        """Return DuplicateGroups below `root`, largest reclaimable space first.
+
+        `progress(stage, done, total)` is called as work completes; setting the
+        `cancel` event stops early and returns an empty list.
+        """
+        # Absolute paths throughout, so archive rows and cached hashes match root bounds
+        root = os.path.abspath(os.fspath(root))
+
+        def cancelled():
+            return cancel is not None and cancel.is_set()
+
+        def report(stage, done, total):
+            if progress is not None:
+                progress(stage, done, total)
+
+        # Stage 1: bucket by size; hardlinks to one inode count as a single file
+        by_size = defaultdict(dict)
+        archive_files = []
+        live = set()
+        for entry in walk(root):
+            if cancelled():
+                return []
+            if entry.is_dir or entry.is_symlink:
+                continue
+            live.add(self.cache.key(entry))
+            if entry.size >= self.min_size:
+                by_size[entry.size].setdefault((entry.dev, entry.inode), entry)
+                if entry.ext in ARCHIVE_EXTENSIONS:
+                    archive_files.append((entry.path, entry.size, entry.mtime))
+        # The whole tree was walked, so cached hashes of anything else below it are stale
+        self.cache.prune(root, live)
+        candidates = [list(bucket.values()) for bucket in by_size.values() if len(bucket) > 1]
+        total = sum(len(bucket) for bucket in candidates)
+        report("size", total, total)
+
+        # Stage 2: hash the first and last few KB
+        by_partial = defaultdict(list)
+        done = 0
+        for bucket in candidates:
+            for entry in bucket:
+                if cancelled():
+                    return []
+                partial = self.cache.get(entry)[0]
+                if partial is None:
+                    try:
+                        partial = partial_hash(entry.path, entry.size)
+                    except OSError:
+                        continue
+                    self.cache.put(entry, partial=partial)
+                by_partial[(entry.size, partial)].append(entry)
+                done += 1
+                if done % 500 == 0:
+                    report("partial", done, total)
+        report("partial", done, total)
+
+        # Stage 3: full hashes for what still collides (small files are already fully hashed)
+        groups = defaultdict(list)
+        pending = []
+        for (size, partial), entries in by_partial.items():
+            if len(entries) < 2:
+                continue
+            for entry in entries:
+                if size <= 2 * EDGE_BYTES:
+                    groups[(size, partial)].append(entry.path)
+                    continue
+                cached_full = self.cache.get(entry)[1]
+                if cached_full is not None:
+                    groups[(size, cached_full)].append(entry.path)
+                else:
+                    pending.append(entry)
+
+        for entry, digest in self._hash_all(pending, cancelled, report):
+            if digest is not None:
+                self.cache.put(entry, full=digest)
+                groups[(entry.size, digest)].append(entry.path)
+        if cancelled():
+            return []
+
+        result = [DuplicateGroup(size, digest, sorted(paths))
+                  for (size, digest), paths in groups.items() if len(paths) > 1]
+        if self.archives is not None and archive_files:
+            result = self._add_members(root, result, by_size, archive_files, cancel, report)
+            if cancelled():
+                return []
+        result.sort(key=lambda g: g.wasted, reverse=True)
+        return result
+
+    def _add_members(self, root, result, by_size, archive_files, cancel, report):
+        """Attach archive members to the groups by (size, CRC32)"""
+        self.archives.update(root, archive_files, cancel,
+                             lambda done, total: report("archives", done, total))
+        rows = list(self.archives.checksums(root, self.min_size, cancel))
+        # Tar listings carry no CRC32: read only the members whose size could pair them
+        counts = Counter(size for _, _, size, _ in rows)
+        wanted = [(archive, name) for archive, name, size, crc in rows
+                  if crc is None and (size in by_size or counts[size] > 1)]
+        crcs = self.archives.fill_checksums(
+            wanted, cancel, lambda done, total: report("archives", done, total)) if wanted else {}
+        members = defaultdict(list)
+        for archive, name, size, crc in rows:
+            crc = crc if crc is not None else crcs.get((archive, name))
+            if crc is not None:
+                members[(size, crc)].append(member_path(archive, name))
+
+        # Files on disk are only read when an archive member has the same size
+        sizes = {size for size, _ in members}
+        candidates = [entry for size in sizes for entry in by_size.get(size, {}).values()]
+        on_disk = defaultdict(list)
+        with ThreadPoolExecutor(max_workers=self.workers or 4) as pool:
+            for done, (entry, crc) in enumerate(zip(candidates, pool.map(
+                    lambda entry: file_crc32(entry.path), candidates)), 1):
+                if cancel is not None and cancel.is_set():
+                    return result
+                if crc is not None:
+                    on_disk[(entry.size, crc)].append(entry.path)
+                report("crc", done, len(candidates))
+
+        group_of = {path: i for i, group in enumerate(result) for path in group.paths}
+        for (size, crc), paths in members.items():
+            paths = sorted(paths)
+            files = sorted(on_disk.get((size, crc), ()))
+            grouped = [group_of[path] for path in files if path in group_of]
+            if grouped:
+                group = result[grouped[0]]
+                result[grouped[0]] = group._replace(paths=group.paths + paths)
+            elif files or len(paths) > 1:
+                # Only one file on disk joins: a CRC32 match alone never pairs two files on disk
+                result.append(DuplicateGroup(size, f"crc32:{crc:08x}", files[:1] + paths))
+        return result
+
+    def _hash_all(self, entries, cancelled, report):
+        """Yield (entry, digest) for every entry, in a process pool when worthwhile"""
+        total = len(entries)
+        if total < POOL_THRESHOLD or self.workers == 1:
+            for done, entry in enumerate(entries, 1):
+                if cancelled():
+                    return
+                yield entry, full_hash(entry.path)[1]
+                report("full", done, total)
+            return
+
+        by_path = {entry.path: entry for entry in entries}
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            results = pool.map(full_hash, list(by_path), chunksize=8)
+            for done, (path, digest) in enumerate(results, 1):
+                if cancelled():
+                    pool.shutdown(cancel_futures=True)
+                    return
+                yield by_path[path], digest
+                report("full", done, total)
+
+
+def _same_file_size(path, size):
+    try:
+        return os.stat(path).st_size == size
+    except OSError:
+        return False
+
+
+def resolve_duplicates(groups, mode="delete", keep=None):
+    """Delete or hardlink every duplicate, keeping one copy per group.
+
+    `keep` maps a group's digest to the path that survives (default: first path).
+    Files whose size changed since the scan are left alone. Returns
+    (bytes_reclaimed, errors) where errors is a list of (path, message).
+    """
+    if mode not in ("delete", "hardlink"):
+        raise ValueError(f"Unknown mode: {mode}")
+    keep = keep or {}
+    reclaimed = 0
+    errors = []
+    for group in groups:
+        keeper = keep.get(group.digest, group.paths[0])
+        if is_member_path(keeper):
+            errors.append((keeper, "inside an archive"))
+            continue
+        if not _same_file_size(keeper, group.size):
+            errors.append((keeper, "changed since scan"))
+            continue
+        for path in group.paths:
+            if path == keeper or is_member_path(path):
+                continue
+            if not _same_file_size(path, group.size):
+                errors.append((path, "changed since scan"))
+                continue
+            try:
+                if mode == "delete":
+                    os.remove(path)
+                else:
+                    # Link under a temporary name first so the swap is atomic
+                    tmp = f"{path}.dup-link"
+                    os.link(keeper, tmp)
+                    try:
+                        os.replace(tmp, path)
+                    except OSError:
+                        os.remove(tmp)
+                        raise
+                reclaimed += group.size
+            except OSError as e:
+                errors.append((path, str(e)))
+    return reclaimed, errors
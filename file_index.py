@@ -0,0 +1,401 @@
+import os
+import sqlite3
+import stat
+import threading
+import time
+from pathlib import Path
+
+from analysis import Progress, analyze_rows
+from fs_walk import scan_dir
+
+
+DEFAULT_INDEX_PATH = Path.home() / ".ai_file_organizer_index.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    path TEXT PRIMARY KEY,
+    refreshed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    lname TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    ext TEXT NOT NULL,
+    inode INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_parent ON entries(parent);
+CREATE TABLE IF NOT EXISTS usage (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    own_bytes INTEGER NOT NULL,
+    own_files INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    files INTEGER NOT NULL,
+    dirs INTEGER NOT NULL
+);
+"""
+
+
+def _reraise(path, exc):
+    raise exc
+
+
+def _prefix_bounds(path):
+    """Return (low, high) so that low < p < high selects every path below `path`"""
+    prefix = path.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class FileIndex:
+    """Persistent metadata index of scanned directory trees.
+
+    Every entry records path, size, mtime, extension and inode. A directory is
+    only re-listed when its own mtime changed since the last scan, so refreshing
+    an unchanged tree costs one stat per directory instead of one per file.
+    Note that in-place edits to a file do not touch its directory's mtime; such
+    size/mtime changes are picked up the next time that directory is re-listed.
+
+    Listeners registered with add_listener(callback) are told about every change
+    as callback("added", rows) or callback("removed", paths), so in-memory
+    structures such as name_index.NameSearch stay in sync without rescanning.
+    """
+
+    # A refresh commits at least this often so other threads never wait long
+    COMMIT_INTERVAL = 0.25
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH):
+        self.db_path = str(db_path)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._listeners = []
+        self._db().executescript(SCHEMA)
+
+    def _db(self):
+        """Return this thread's connection (WAL lets readers run alongside a refresh)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """Close every database connection opened by this index"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def add_listener(self, callback):
+        """Call `callback(kind, items)` on every change (from the thread making it)"""
+        self._listeners.append(callback)
+
+    def _notify(self, kind, items):
+        if items:
+            for callback in self._listeners:
+                callback(kind, items)
+
+    def _list_directory(self, directory):
+        """Read one directory from disk and return entry rows"""
+        return [(e.path, directory, e.name, e.name.lower(), int(e.is_dir),
+                 e.size, e.mtime, e.ext, e.inode)
+                for e in scan_dir(directory, on_error=_reraise)]
+
+    def _forget_subtree(self, conn, directory):
+        """Drop a directory and everything recorded below it"""
+        low, high = _prefix_bounds(directory)
+        if self._listeners:
+            self._notify("removed", [row[0] for row in conn.execute(
+                "SELECT path FROM entries WHERE path > ? AND path < ?", (low, high))])
+        conn.execute("DELETE FROM entries WHERE path > ? AND path < ?", (low, high))
+        conn.execute("DELETE FROM dirs WHERE path = ? OR (path > ? AND path < ?)",
+                     (directory, low, high))
+
+    def refresh(self, root, max_depth=None, cancel=None, progress=None):
+        """Bring the index for `root` up to date and return the number of re-listed dirs.
+
+        `max_depth=0` only refreshes `root` itself (used by the explorer view).
+        Unreadable subdirectories are skipped; an unreadable `root` raises OSError.
+        Setting the `cancel` event stops early, keeping what was already indexed.
+        `progress` receives the same dicts as analysis.Progress, counting entries listed.
+        """
+        root = os.path.abspath(str(root))
+        low, high = _prefix_bounds(root)
+        conn = self._db()
+        rescanned = 0
+        known = set()
+        if max_depth is None:
+            known = {row[0] for row in conn.execute(
+                "SELECT path FROM dirs WHERE path = ? OR (path > ? AND path < ?)",
+                (root, low, high))}
+        seen = set()
+        stack = [(root, 0)]
+        listed = 0
+        reporter = Progress(progress, "scan")
+        last_commit = time.monotonic()
+        try:
+            while stack:
+                if cancel is not None and cancel.is_set():
+                    return rescanned
+                directory, depth = stack.pop()
+                try:
+                    mtime_ns = os.stat(directory).st_mtime_ns
+                except OSError:
+                    continue
+                seen.add(directory)
+
+                stored = conn.execute(
+                    "SELECT mtime_ns FROM dirs WHERE path = ?", (directory,)).fetchone()
+                old_subdirs = [row[0] for row in conn.execute(
+                    "SELECT path FROM entries WHERE parent = ? AND is_dir = 1", (directory,))]
+                if stored is not None and stored[0] == mtime_ns:
+                    subdirs = old_subdirs
+                else:
+                    try:
+                        rows = self._list_directory(directory)
+                    except OSError:
+                        if directory == root:
+                            raise
+                        continue
+                    subdirs = [row[0] for row in rows if row[4]]
+                    for removed in set(old_subdirs) - set(subdirs):
+                        self._forget_subtree(conn, removed)
+                    if self._listeners:
+                        current = {row[0] for row in rows}
+                        self._notify("removed", [row[0] for row in conn.execute(
+                            "SELECT path FROM entries WHERE parent = ?", (directory,))
+                            if row[0] not in current])
+                    conn.execute("DELETE FROM entries WHERE parent = ?", (directory,))
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    self._notify("added", rows)
+                    conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)",
+                                 (directory, mtime_ns))
+                    rescanned += 1
+                    listed += len(rows)
+                    reporter.update(listed, 0)
+
+                if max_depth is None or depth < max_depth:
+                    stack.extend((sub, depth + 1) for sub in subdirs)
+
+                if time.monotonic() - last_commit > self.COMMIT_INTERVAL:
+                    conn.commit()
+                    last_commit = time.monotonic()
+
+            if max_depth is None:
+                # Directories that vanished since the last scan take their listings with them
+                for gone in known - seen:
+                    if self._listeners:
+                        self._notify("removed", [row[0] for row in conn.execute(
+                            "SELECT path FROM entries WHERE parent = ?", (gone,))])
+                    conn.execute("DELETE FROM dirs WHERE path = ?", (gone,))
+                    conn.execute("DELETE FROM entries WHERE parent = ?", (gone,))
+                conn.execute("INSERT OR REPLACE INTO roots VALUES (?, ?)", (root, time.time()))
+        finally:
+            conn.commit()
+        return rescanned
+
+    def update_entry(self, path):
+        """Re-stat a single path and store it; returns its list_dir row, or None if it is gone"""
+        path = os.path.abspath(str(path))
+        try:
+            st = os.lstat(path)
+        except OSError:
+            self.remove_entry(path)
+            return None
+        name = os.path.basename(path)
+        is_dir = stat.S_ISDIR(st.st_mode)
+        size = 0 if is_dir else st.st_size
+        ext = "" if is_dir else os.path.splitext(name)[1].lower()
+        row = (path, os.path.dirname(path), name, name.lower(), int(is_dir),
+               size, st.st_mtime, ext, st.st_ino)
+        conn = self._db()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+        self._notify("added", [row])
+        return (name, int(is_dir), size, st.st_mtime, ext)
+
+    def remove_entry(self, path):
+        """Forget a path and, if it was a directory, everything below it"""
+        path = os.path.abspath(str(path))
+        conn = self._db()
+        with conn:
+            conn.execute("DELETE FROM entries WHERE path = ?", (path,))
+            self._notify("removed", [path])
+            self._forget_subtree(conn, path)
+
+    def last_refresh(self, root):
+        """Return the time `root` was last fully refreshed, or None"""
+        root = os.path.abspath(str(root))
+        row = self._db().execute("SELECT refreshed FROM roots WHERE path = ?", (root,)).fetchone()
+        return row[0] if row else None
+
+    def ensure(self, root, max_age=60, cancel=None):
+        """Refresh `root` only if it was never indexed or its last refresh is older than `max_age`"""
+        refreshed = self.last_refresh(root)
+        if refreshed is None or time.time() - refreshed > max_age:
+            self.refresh(root, cancel=cancel)
+
+    def dir_mtimes(self, root):
+        """Return (path, mtime_ns) for `root` and every indexed directory below it"""
+        root = os.path.abspath(str(root))
+        low, high = _prefix_bounds(root)
+        return self._db().execute(
+            "SELECT path, mtime_ns FROM dirs WHERE path = ? OR (path > ? AND path < ?)",
+            (root, low, high)).fetchall()
+
+    def file_totals(self, root, parents=None):
+        """Return {directory: (bytes, files)} summed over the files directly in each directory.
+
+        Covers `parents` if given, otherwise `root` and every directory below it.
+        """
+        conn = self._db()
+        if parents is None:
+            root = os.path.abspath(str(root))
+            low, high = _prefix_bounds(root)
+            return {parent: (size, count) for parent, size, count in conn.execute(
+                "SELECT parent, sum(size), count(*) FROM entries "
+                "WHERE path > ? AND path < ? AND is_dir = 0 GROUP BY parent", (low, high))}
+        totals = {}
+        parents = list(parents)
+        for start in range(0, len(parents), 500):
+            batch = parents[start:start + 500]
+            totals.update((parent, (size, count)) for parent, size, count in conn.execute(
+                "SELECT parent, sum(size), count(*) FROM entries WHERE parent IN (%s) AND is_dir = 0 "
+                "GROUP BY parent" % ",".join("?" * len(batch)), batch))
+        return totals
+
+    def usage_rows(self, root):
+        """Return {path: (mtime_ns, own_bytes, own_files, bytes, files, dirs)} stored below `root`"""
+        root = os.path.abspath(str(root))
+        low, high = _prefix_bounds(root)
+        return {row[0]: row[1:] for row in self._db().execute(
+            "SELECT * FROM usage WHERE path = ? OR (path > ? AND path < ?)", (root, low, high))}
+
+    def usage_for(self, paths):
+        """Return {path: (bytes, files, dirs)} of the stored rollups for `paths`"""
+        usage = {}
+        conn = self._db()
+        for start in range(0, len(paths), 500):
+            batch = paths[start:start + 500]
+            usage.update((row[0], row[1:]) for row in conn.execute(
+                "SELECT path, bytes, files, dirs FROM usage WHERE path IN (%s)"
+                % ",".join("?" * len(batch)), batch))
+        return usage
+
+    def store_usage(self, rows, forget=()):
+        """Save (path, mtime_ns, own_bytes, own_files, bytes, files, dirs) rollups, dropping `forget`"""
+        conn = self._db()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO usage VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany("DELETE FROM usage WHERE path = ?", ((path,) for path in forget))
+
+    def files_with_extensions(self, root, extensions):
+        """Return (path, size, mtime) of the files below `root` with one of `extensions`"""
+        low, high = _prefix_bounds(os.path.abspath(str(root)))
+        extensions = sorted(extensions)
+        return self._db().execute(
+            "SELECT path, size, mtime FROM entries WHERE path > ? AND path < ? AND is_dir = 0 "
+            "AND ext IN (%s)" % ",".join("?" * len(extensions)), [low, high] + extensions).fetchall()
+
+    def list_dir(self, directory):
+        """Return (name, is_dir, size, mtime, ext) rows for the direct children of `directory`"""
+        directory = os.path.abspath(str(directory))
+        return self._db().execute(
+            "SELECT name, is_dir, size, mtime, ext FROM entries WHERE parent = ? "
+            "ORDER BY is_dir DESC, name", (directory,)).fetchall()
+
+    def search(self, root, query, limit=None):
+        """Return (path, is_dir, size, mtime, ext) rows below `root` whose name contains `query`"""
+        low, high = _prefix_bounds(os.path.abspath(str(root)))
+        sql = ("SELECT path, is_dir, size, mtime, ext FROM entries "
+               "WHERE path > ? AND path < ? AND instr(lname, ?) > 0 ORDER BY path")
+        params = [low, high, query.lower()]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._db().execute(sql, params).fetchall()
+
+    def iter_search(self, root, query, cancel=None, chunk=500):
+        """Like search(), but yields rows in chunks and stops once `cancel` is set"""
+        low, high = _prefix_bounds(os.path.abspath(str(root)))
+        cursor = self._db().execute(
+            "SELECT path, is_dir, size, mtime, ext FROM entries "
+            "WHERE path > ? AND path < ? AND instr(lname, ?) > 0 ORDER BY path",
+            (low, high, query.lower()))
+        try:
+            while cancel is None or not cancel.is_set():
+                rows = cursor.fetchmany(chunk)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def iter_rows(self, root, cancel=None, chunk=2000):
+        """Yield (path, is_dir, size, mtime, ext) for everything below `root`, streamed in chunks"""
+        low, high = _prefix_bounds(os.path.abspath(str(root)))
+        cursor = self._db().execute(
+            "SELECT path, is_dir, size, mtime, ext FROM entries WHERE path > ? AND path < ?",
+            (low, high))
+        try:
+            while cancel is None or not cancel.is_set():
+                rows = cursor.fetchmany(chunk)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def iter_names(self, root, chunk=5000):
+        """Yield (path, lname) for everything below `root`"""
+        low, high = _prefix_bounds(os.path.abspath(str(root)))
+        cursor = self._db().execute(
+            "SELECT path, lname FROM entries WHERE path > ? AND path < ?", (low, high))
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def rows_for(self, paths):
+        """Return (path, is_dir, size, mtime, ext) rows for `paths`, in the same order"""
+        rows = {}
+        conn = self._db()
+        for start in range(0, len(paths), 500):
+            batch = paths[start:start + 500]
+            rows.update((row[0], row) for row in conn.execute(
+                "SELECT path, is_dir, size, mtime, ext FROM entries WHERE path IN (%s)"
+                % ",".join("?" * len(batch)), batch))
+        return [rows[p] for p in paths if p in rows]
+
+    def analyze_stats(self, root, top=10, progress=None, cancel=None):
+        """Aggregate everything below `root` into analysis.AnalysisStats (None if cancelled)"""
+        stats = analyze_rows(self.iter_rows(root, cancel), top, progress, cancel)
+        if stats is None or (cancel is not None and cancel.is_set()):
+            return None
+        return stats
+
+    def analyze(self, root, top=10, progress=None, cancel=None):
+        """Return the same analysis dict as AIFileOrganizer.analyze_directory, from the index.
+
+        One streaming pass with bounded memory; returns None if cancelled.
+        """
+        stats = self.analyze_stats(root, top, progress, cancel)
+        return stats.result() if stats is not None else None
@@ -0,0 +1,100 @@
+import os
+from collections import namedtuple
+
+
+# Symlink policies
+SYMLINKS_LIST = "list"      # report links as entries, never descend through them
+SYMLINKS_FOLLOW = "follow"  # resolve links and descend into linked dirs (loop-safe)
+SYMLINKS_SKIP = "skip"      # leave links out entirely
+
+
+class Entry(namedtuple("Entry", "path name is_dir is_symlink size mtime inode dev depth")):
+    """Compact record for one directory entry produced by scan_dir/walk"""
+    __slots__ = ()
+
+    @property
+    def ext(self):
+        """Lower-cased extension, '' for directories"""
+        return "" if self.is_dir else os.path.splitext(self.name)[1].lower()
+
+
+def scan_dir(directory, depth=0, symlinks=SYMLINKS_LIST, on_error=None, stat=True):
+    """List one directory with a single os.scandir pass.
+
+    The stat data cached on each DirEntry is reused, so every entry costs at most
+    one stat call (none at all with `stat=False`, where size, mtime and dev are 0).
+    Directory-level errors are passed to `on_error(path, exc)`, which may raise
+    to abort; without a callback they are skipped. Entries that disappear while
+    being listed are skipped silently.
+    """
+    follow = symlinks == SYMLINKS_FOLLOW
+    entries = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    is_symlink = entry.is_symlink()
+                    if is_symlink and symlinks == SYMLINKS_SKIP:
+                        continue
+                    is_dir = entry.is_dir(follow_symlinks=follow)
+                    if stat:
+                        st = entry.stat(follow_symlinks=follow)
+                        size = 0 if is_dir else st.st_size
+                        mtime = st.st_mtime
+                        inode = st.st_ino
+                        dev = st.st_dev
+                    else:
+                        size = mtime = dev = 0
+                        inode = entry.inode()
+                except OSError:
+                    continue
+                entries.append(Entry(entry.path, entry.name, is_dir, is_symlink,
+                                     size, mtime, inode, dev, depth))
+    except OSError as e:
+        if on_error is not None:
+            on_error(directory, e)
+    return entries
+
+
+def walk(root, max_depth=None, symlinks=SYMLINKS_LIST, on_error=None, stat=True, sort=False):
+    """Yield an Entry for everything below `root`, depth first, parents before children.
+
+    Children of `root` have depth 0; `max_depth=0` therefore lists `root` only.
+    With `sort=True` siblings are yielded in name order.
+    """
+    root = os.fspath(root)
+    visited = None
+    if symlinks == SYMLINKS_FOLLOW:
+        visited = set()
+        try:
+            st = os.stat(root)
+            visited.add((st.st_dev, st.st_ino))
+        except OSError:
+            pass
+
+    def listing(directory, depth):
+        entries = scan_dir(directory, depth, symlinks, on_error, stat)
+        if sort:
+            entries.sort(key=lambda e: e.name)
+        return iter(entries)
+
+    stack = [listing(root, 0)]
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+            continue
+        yield entry
+
+        if not entry.is_dir or (max_depth is not None and entry.depth >= max_depth):
+            continue
+        if visited is not None:
+            try:
+                st = os.stat(entry.path)
+            except OSError:
+                continue
+            key = (st.st_dev, st.st_ino)
+            if key in visited:
+                continue
+            visited.add(key)
+        stack.append(listing(entry.path, entry.depth + 1))
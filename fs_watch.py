@@ -0,0 +1,300 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from fs_walk import scan_dir
+
+
+FsEvent = namedtuple("FsEvent", "kind path dest")  # kind: created/deleted/modified/moved/rescan
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Coalescer:
+    """Collapse bursts of events per path into the net change.
+
+    Per-path changes only merge between moves and rescans: those split the
+    burst, so events come out in arrival order (a delete of B followed by a
+    move of A to B must not be replayed the other way round).
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.ordered = []   # settled events, in arrival order
+        self.first = None
+
+    def add(self, kind, path, dest=None):
+        if self.first is None:
+            self.first = time.monotonic()
+        if kind == "rescan":
+            self._settle()
+            self.ordered.append(FsEvent(kind, path, None))
+        elif kind == "moved":
+            if self.pending.get(path) == "created":
+                # Created and moved away within the window: just a create at the target
+                del self.pending[path]
+                self._merge("created", dest)
+            else:
+                self._settle()
+                self.ordered.append(FsEvent("moved", path, dest))
+        else:
+            self._merge(kind, path)
+
+    def _settle(self):
+        """Fix the per-path changes so far in front of whatever comes next"""
+        self.ordered.extend(FsEvent(kind, path, None) for path, kind in self.pending.items())
+        self.pending = {}
+
+    def _merge(self, kind, path):
+        previous = self.pending.get(path)
+        if previous is None:
+            self.pending[path] = kind
+        elif previous == "created" and kind == "deleted":
+            del self.pending[path]
+        elif previous == "created":
+            pass  # created then modified is still just created
+        elif previous == "deleted" and kind == "created":
+            self.pending[path] = "modified"
+        else:
+            self.pending[path] = kind
+
+    def due(self, window):
+        return self.first is not None and time.monotonic() - self.first >= window
+
+    def flush(self):
+        self._settle()
+        events = self.ordered
+        self.ordered = []
+        self.first = None
+        return events
+
+
+class _Inotify:
+    """Minimal ctypes binding to Linux inotify"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm = libc.inotify_rm_watch
+        self._rm.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path):
+        wd = self._add(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def rm_watch(self, wd):
+        self._rm(self.fd, wd)
+
+    def read(self, timeout):
+        """Return a list of (wd, mask, cookie, name) waiting at most `timeout` seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, cookie, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _snapshot(path):
+    """Listing used by the polling fallback: {name: (is_dir, size, mtime)}"""
+    return {e.name: (e.is_dir, e.size, e.mtime) for e in scan_dir(path)}
+
+
+class DirectoryWatcher:
+    """Watches a set of directories (non-recursively) and reports coalesced changes.
+
+    inotify is used where available; directories it cannot watch (other OSes,
+    exhausted watch limits, some network filesystems) fall back to polling
+    their listing every `poll_interval` seconds. `callback(events)` runs on the
+    watcher thread with a list of FsEvent, at most once per `coalesce` seconds.
+    """
+
+    def __init__(self, callback, coalesce=0.2, poll_interval=2.0, force_polling=False):
+        self.callback = callback
+        self.coalesce = coalesce
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._inotify = None
+        if not force_polling and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None
+        self._wd_paths = {}     # inotify watch descriptor -> directory
+        self._path_wds = {}     # directory -> inotify watch descriptor
+        self._polled = {}       # directory -> last snapshot
+        self._next_poll = 0
+        self._move_sources = {}
+        self._coalescer = _Coalescer()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def uses_inotify(self):
+        return self._inotify is not None
+
+    def watch(self, path):
+        path = os.path.abspath(str(path))
+        with self._lock:
+            if path in self._path_wds or path in self._polled:
+                return
+            if self._inotify is not None:
+                try:
+                    wd = self._inotify.add_watch(path)
+                    self._wd_paths[wd] = path
+                    self._path_wds[path] = wd
+                    return
+                except OSError:
+                    pass
+            self._polled[path] = _snapshot(path)
+
+    def unwatch(self, path):
+        path = os.path.abspath(str(path))
+        with self._lock:
+            wd = self._path_wds.pop(path, None)
+            if wd is not None:
+                self._wd_paths.pop(wd, None)
+                self._inotify.rm_watch(wd)
+            self._polled.pop(path, None)
+
+    def set_paths(self, paths):
+        """Watch exactly `paths`, adding and dropping watches as needed"""
+        wanted = {os.path.abspath(str(p)) for p in paths}
+        with self._lock:
+            current = set(self._path_wds) | set(self._polled)
+        for path in current - wanted:
+            self.unwatch(path)
+        for path in wanted - current:
+            self.watch(path)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        if self._inotify is not None:
+            self._inotify.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._inotify is not None:
+                self._read_inotify(timeout=0.05)
+            else:
+                self._stop.wait(0.05)
+            if time.monotonic() >= self._next_poll:
+                self._poll()
+                self._next_poll = time.monotonic() + self.poll_interval
+            if self._coalescer.due(self.coalesce):
+                events = self._coalescer.flush()
+                if events:
+                    try:
+                        self.callback(events)
+                    except Exception:
+                        pass
+
+    def _read_inotify(self, timeout):
+        for wd, mask, cookie, name in self._inotify.read(timeout):
+            if mask & IN_Q_OVERFLOW:
+                with self._lock:
+                    directories = list(self._path_wds)
+                for directory in directories:
+                    self._coalescer.add("rescan", directory)
+                continue
+            with self._lock:
+                directory = self._wd_paths.get(wd)
+                if mask & IN_IGNORED and directory is not None:
+                    self._wd_paths.pop(wd, None)
+                    self._path_wds.pop(directory, None)
+            if directory is None:
+                continue
+            path = os.path.join(directory, name) if name else directory
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self._coalescer.add("deleted", directory)
+            elif mask & IN_CREATE:
+                self._coalescer.add("created", path)
+            elif mask & IN_DELETE:
+                self._coalescer.add("deleted", path)
+            elif mask & IN_MOVED_FROM:
+                self._move_sources[cookie] = path
+            elif mask & IN_MOVED_TO:
+                source = self._move_sources.pop(cookie, None)
+                if source is None:
+                    self._coalescer.add("created", path)  # moved in from an unwatched dir
+                else:
+                    self._coalescer.add("moved", source, path)
+            elif mask & (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE):
+                self._coalescer.add("modified", path)
+        # A MOVED_FROM whose MOVED_TO never arrived left the watched set
+        if self._move_sources and not self._inotify_pending():
+            for source in self._move_sources.values():
+                self._coalescer.add("deleted", source)
+            self._move_sources.clear()
+
+    def _inotify_pending(self):
+        ready, _, _ = select.select([self._inotify.fd], [], [], 0)
+        return bool(ready)
+
+    def _poll(self):
+        with self._lock:
+            polled = list(self._polled.items())
+        for directory, before in polled:
+            if not os.path.isdir(directory):
+                self._coalescer.add("deleted", directory)
+                with self._lock:
+                    self._polled.pop(directory, None)
+                continue
+            after = _snapshot(directory)
+            for name in before.keys() - after.keys():
+                self._coalescer.add("deleted", os.path.join(directory, name))
+            for name in after.keys() - before.keys():
+                self._coalescer.add("created", os.path.join(directory, name))
+            for name in before.keys() & after.keys():
+                if before[name] != after[name]:
+                    self._coalescer.add("modified", os.path.join(directory, name))
+            with self._lock:
+                if directory in self._polled:
+                    self._polled[directory] = after
@@ -0,0 +1,163 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+
+DEFAULT_PROFILE_DIR = Path.home() / ".ai_file_organizer_profiles"
+
+
+class Span:
+    """One timed operation; `items` and `bytes` may be updated while it runs"""
+
+    __slots__ = ("name", "args", "start", "end", "items", "bytes", "thread", "error")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = time.perf_counter()
+        self.end = None
+        self.items = 0
+        self.bytes = 0
+        self.thread = threading.get_ident()
+        self.error = None
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    @property
+    def rate(self):
+        """Items per second"""
+        return self.items / self.duration if self.duration > 0 else 0.0
+
+
+class Recorder:
+    """Collects spans for long operations: durations, item counts, throughput.
+
+    `span(name)` is a context manager usable from any thread. Finished spans
+    are kept in a bounded ring, summarized per name by `summary()` and can be
+    written as Chrome trace JSON (chrome://tracing, Perfetto). `profile_next()`
+    arms cProfile for the next span that starts (optionally only one with a
+    given name); its stats are written below `profile_dir`.
+    """
+
+    def __init__(self, max_spans=5000, profile_dir=DEFAULT_PROFILE_DIR):
+        self.profile_dir = Path(profile_dir)
+        self.epoch = time.perf_counter()
+        self.last_profile = None        # (path, text report) of the last capture
+        self._spans = deque(maxlen=max_spans)
+        self._active = []
+        self._lock = threading.Lock()
+        self._profile_armed = False
+        self._profile_name = None
+
+    @contextmanager
+    def span(self, name, **args):
+        span = Span(name, args)
+        profiler = self._claim_profiler(name)
+        with self._lock:
+            self._active.append(span)
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:
+                profiler = None  # another profiler is already running in this process
+        try:
+            yield span
+        except GeneratorExit:
+            raise  # the consumer of an instrumented generator stopped early
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._save_profile(span, profiler)
+            span.end = time.perf_counter()
+            with self._lock:
+                self._active.remove(span)
+                self._spans.append(span)
+
+    def active(self):
+        """Spans that are still running"""
+        with self._lock:
+            return list(self._active)
+
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def last(self):
+        with self._lock:
+            return self._spans[-1] if self._spans else None
+
+    def summary(self):
+        """Per-operation aggregates, slowest total first"""
+        stats = {}
+        for span in self.spans():
+            s = stats.setdefault(span.name, {"name": span.name, "calls": 0, "errors": 0, "total_s": 0.0,
+                                             "max_s": 0.0, "last_s": 0.0, "items": 0, "bytes": 0})
+            s["calls"] += 1
+            s["errors"] += span.error is not None
+            s["total_s"] += span.duration
+            s["max_s"] = max(s["max_s"], span.duration)
+            s["last_s"] = span.duration
+            s["items"] += span.items
+            s["bytes"] += span.bytes
+        for s in stats.values():
+            s["mean_s"] = s["total_s"] / s["calls"]
+            s["items_per_s"] = s["items"] / s["total_s"] if s["total_s"] > 0 else 0.0
+        return sorted(stats.values(), key=lambda s: s["total_s"], reverse=True)
+
+    def chrome_trace(self):
+        """Finished and running spans as a Chrome trace-event document"""
+        pid = os.getpid()
+        events = []
+        for span in self.spans() + self.active():
+            args = dict(span.args, items=span.items, bytes=span.bytes)
+            if span.error is not None:
+                args["error"] = span.error
+            if span.end is None:
+                args["running"] = True
+            events.append({"name": span.name, "cat": span.name.split(".")[0], "ph": "X",
+                           "ts": (span.start - self.epoch) * 1e6, "dur": span.duration * 1e6,
+                           "pid": pid, "tid": span.thread,
+                           "args": {k: str(v) if not isinstance(v, (int, float, bool)) else v
+                                    for k, v in args.items()}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def profile_next(self, name=None):
+        """Capture a cProfile of the next span (named `name`, if given)"""
+        with self._lock:
+            self._profile_armed = True
+            self._profile_name = name
+
+    @property
+    def profile_armed(self):
+        return self._profile_armed
+
+    def _claim_profiler(self, name):
+        with self._lock:
+            if not self._profile_armed or self._profile_name not in (None, name):
+                return None
+            self._profile_armed = False
+        return cProfile.Profile()
+
+    def _save_profile(self, span, profiler):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        path = self.profile_dir / f"{span.name}-{time.strftime('%Y%m%d-%H%M%S')}.prof"
+        profiler.dump_stats(str(path))
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(30)
+        self.last_profile = (path, report.getvalue())
@@ -0,0 +1,188 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class JobBusy(Exception):
+    """Raised by JobScheduler.submit when a job already runs against the same directory"""
+
+    def __init__(self, job):
+        super().__init__(f"{job.name} is already running on {job.key}")
+        self.job = job
+
+
+class Job:
+    """One unit of background work and its progress.
+
+    The worker updates `done`, `total` and `message` through `report()` and
+    should check `cancelled` (or pass `cancel` on) between steps; the Tk thread
+    only reads them, so no locking is needed.
+    """
+
+    def __init__(self, job_id, name, key):
+        self.id = job_id
+        self.name = name
+        self.key = key
+        self.status = QUEUED
+        self.done = 0
+        self.total = None
+        self.message = ""
+        self.cancel = threading.Event()
+        self.result = None
+        self.error = None
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.finished = None
+
+    def report(self, done, total=None, message=None):
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message
+
+    @property
+    def cancelled(self):
+        return self.cancel.is_set()
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def fraction(self):
+        """Completed share in [0, 1], or None if the total is unknown"""
+        return min(self.done / self.total, 1.0) if self.total else None
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+
+def _overlaps(a, b):
+    return a == b or a.startswith(b.rstrip(os.sep) + os.sep) or b.startswith(a.rstrip(os.sep) + os.sep)
+
+
+class JobScheduler:
+    """Runs long GUI actions on a bounded worker pool.
+
+    `submit(name, work, ...)` queues `work(job)`; at most `workers` jobs run
+    at once and the rest wait their turn. Completion is handed back through a
+    queue drained with `root.after`, so `on_done(result)`, `on_error(exc)` and
+    `on_cancel(result)` always run on the Tk thread. A job given a directory
+    `key` is refused (JobBusy) while another job works on that directory, one
+    of its parents or one of its subdirectories.
+    """
+
+    def __init__(self, root, workers=4, poll_ms=100, keep_finished=20):
+        self.root = root
+        self.workers = workers
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._queue = queue.Queue()
+        self._ids = itertools.count(1)
+        self._active = {}               # id -> (job, callbacks, future)
+        self._finished = deque(maxlen=keep_finished)
+        self._poll_id = None
+
+    def submit(self, name, work, on_done=None, on_error=None, on_cancel=None, key=None):
+        """Queue `work(job)` and return its Job; raises JobBusy for a conflicting `key`"""
+        if key is not None:
+            key = os.path.abspath(str(key))
+            busy = self.busy(key)
+            if busy is not None:
+                raise JobBusy(busy)
+        job = Job(next(self._ids), name, key)
+        future = self._pool.submit(self._run, job, work)
+        self._active[job.id] = (job, (on_done, on_error, on_cancel), future)
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._drain)
+        return job
+
+    def busy(self, key):
+        """The active job working on or around directory `key`, if any"""
+        key = os.path.abspath(str(key))
+        for job, _, _ in self._active.values():
+            if job.key is not None and _overlaps(job.key, key):
+                return job
+        return None
+
+    def jobs(self):
+        """Active jobs in submission order, then recently finished ones (newest first)"""
+        return [job for job, _, _ in self._active.values()] + list(reversed(self._finished))
+
+    def running(self):
+        return [job for job, _, _ in self._active.values()]
+
+    def cancel(self, job):
+        """Ask `job` to stop; a job still waiting for a worker never starts"""
+        job.cancel.set()
+        entry = self._active.get(job.id)
+        if entry is not None and entry[2].cancel():
+            self._queue.put(job)    # never ran; report it from the Tk thread
+
+    def clear_finished(self):
+        self._finished.clear()
+
+    def close(self):
+        """Cancel everything and stop the pool without waiting for running work"""
+        for job, _, _ in list(self._active.values()):
+            job.cancel.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+
+    def _run(self, job, work):
+        """Worker thread"""
+        job.started = time.perf_counter()
+        job.status = RUNNING
+        try:
+            job.result = work(job)
+        except Exception as e:
+            job.error = e
+        job.finished = time.perf_counter()
+        self._queue.put(job)
+
+    def _drain(self):
+        """Tk thread: settle finished jobs and run their callbacks"""
+        self._poll_id = None
+        try:
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._settle(job)
+        finally:
+            # A failing callback must not stop the polling of the other jobs
+            if self._active or not self._queue.empty():
+                self._poll_id = self.root.after(self.poll_ms, self._drain)
+
+    def _settle(self, job):
+        entry = self._active.pop(job.id, None)
+        if entry is None:
+            return
+        on_done, on_error, on_cancel = entry[1]
+        if job.error is not None:
+            job.status = FAILED
+            callback, value = on_error, job.error
+        elif job.cancelled:
+            job.status = CANCELLED
+            callback, value = on_cancel, job.result
+        else:
+            job.status = DONE
+            callback, value = on_done, job.result
+        job.finished = job.finished or time.perf_counter()
+        self._finished.append(job)
+        if callback is not None:
+            callback(value)
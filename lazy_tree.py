@@ -0,0 +1,286 @@
+import os
+
+
+# Row layout shared with FileIndex.list_dir: (name, is_dir, size, mtime, ext)
+NAME, IS_DIR, SIZE, MTIME, EXT = range(5)
+
+SORT_KEYS = {
+    "#0": lambda row: row[NAME].lower(),
+    "Size": lambda row: row[SIZE],
+    "Type": lambda row: row[EXT],
+    "Modified": lambda row: row[MTIME],
+}
+
+# Synthetic item ids; "//" never occurs in the normalized paths used for real items
+DUMMY = "//dummy"
+MORE = "//more"
+
+
+class _Node:
+    """Backing rows for one expanded directory and how many of them are inserted"""
+    __slots__ = ("path", "rows", "shown", "placeholder")
+
+    def __init__(self, path, rows):
+        self.path = path
+        self.rows = rows
+        self.shown = 0
+        self.placeholder = None
+
+
+class LazyTree:
+    """Lazy, paged model behind a ttk.Treeview.
+
+    Directories get a dummy child so they can be expanded, and only list their
+    contents when opened. Children are inserted `page_size` at a time; the rest
+    sit behind a "… N more" row that loads the next page when it scrolls into
+    view or is selected. Sorting reorders the backing rows and moves existing
+    items instead of rebuilding the widget.
+
+    `list_children(path)` returns rows shaped like FileIndex.list_dir and
+    `format_row(row)` returns the (values, tags) to display for one row.
+    """
+
+    def __init__(self, tree, list_children, format_row, yscroll=None, page_size=500,
+                 on_change=None):
+        self.tree = tree
+        self.list_children = list_children
+        self.format_row = format_row
+        self.yscroll = yscroll
+        self.page_size = page_size
+        # Called after the set of expanded directories changes (e.g. to move watches)
+        self.on_change = on_change
+
+        self.root_path = None
+        self.show_parent = False
+        self._nodes = {}
+        self._sort = ("#0", False)
+        self._check_pending = False
+
+        tree.configure(yscrollcommand=self._on_yscroll)
+        tree.bind("<<TreeviewOpen>>", self._on_open, add="+")
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        for column in SORT_KEYS:
+            tree.heading(column, command=lambda c=column: self.sort_by(c))
+
+    def clear(self):
+        """Forget the model and remove every item"""
+        self._nodes.clear()
+        self.root_path = None
+        self.tree.delete(*self.tree.get_children())
+        self._changed()
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def expanded_paths(self):
+        """Directories whose children are currently loaded"""
+        return [node.path for node in self._nodes.values()]
+
+    def _node_key(self, directory):
+        if directory == self.root_path:
+            return ""
+        return directory if directory in self._nodes else None
+
+    def upsert(self, directory, row):
+        """Add or update one row of an expanded directory in place"""
+        key = self._node_key(directory)
+        if key is None:
+            return
+        node = self._nodes[key]
+        iid = os.path.join(node.path, row[NAME])
+        for i, existing in enumerate(node.rows):
+            if existing[NAME] == row[NAME]:
+                node.rows[i] = row
+                if self.tree.exists(iid):
+                    values, tags = self.format_row(row)
+                    self.tree.item(iid, values=values, tags=tags)
+                return
+        node.rows.append(row)
+        self._sort_rows(node.rows)
+        position = node.rows.index(row)
+        if position < node.shown:
+            offset = 1 if key == "" and self.show_parent else 0
+            self._insert(key, node, row, position + offset)
+            node.shown += 1
+        self._update_placeholder(key, node)
+
+    def update_rows(self, update):
+        """Replace every loaded row with `update(directory, row)`, refreshing changed items in place.
+
+        Directories whose rows changed are re-sorted when the view is sorted by size.
+        """
+        for parent, node in list(self._nodes.items()):
+            changed = False
+            for i, row in enumerate(node.rows):
+                new = update(node.path, row)
+                if new == row:
+                    continue
+                node.rows[i] = new
+                changed = True
+                iid = os.path.join(node.path, row[NAME])
+                if self.tree.exists(iid):
+                    values, tags = self.format_row(new)
+                    self.tree.item(iid, values=values, tags=tags)
+            if changed and self._sort[0] == "Size":
+                self._sort_rows(node.rows)
+                self._relayout(parent, node)
+
+    def remove(self, path):
+        """Drop one path (and anything expanded below it) from the model and the view"""
+        key = self._node_key(os.path.dirname(path))
+        if key is None:
+            return
+        node = self._nodes[key]
+        name = os.path.basename(path)
+        for i, existing in enumerate(node.rows):
+            if existing[NAME] == name:
+                del node.rows[i]
+                if i < node.shown:
+                    node.shown -= 1
+                break
+        if self.tree.exists(path):
+            self._forget(path)
+            self.tree.delete(path)
+            self._changed()
+        self._update_placeholder(key, node)
+
+    def load(self, path, show_parent=False):
+        """Show the children of `path` at the top level of the tree"""
+        self.clear()
+        self.root_path = str(path)
+        self.show_parent = show_parent
+        if show_parent:
+            self.tree.insert("", "end", iid="..", text="..", values=("", "Directory", ""),
+                             tags=("directory",))
+        self._expand("", self.root_path)
+        self._changed()
+
+    def path_of(self, iid):
+        """Return the filesystem path shown by a tree item, or None for synthetic rows"""
+        if iid == "..":
+            return os.path.dirname(self.root_path) if self.root_path else None
+        if not iid or "//" in iid:
+            return None
+        return iid
+
+    def is_placeholder(self, iid):
+        return iid.endswith(MORE)
+
+    def _expand(self, parent, path):
+        rows = list(self.list_children(path))
+        self._sort_rows(rows)
+        self._nodes[parent] = _Node(path, rows)
+        self._show_page(parent)
+
+    def _insert(self, parent, node, row, index="end"):
+        iid = os.path.join(node.path, row[NAME])
+        values, tags = self.format_row(row)
+        self.tree.insert(parent, index, iid=iid, text=row[NAME], values=values, tags=tags)
+        if row[IS_DIR]:
+            self.tree.insert(iid, "end", iid=iid + DUMMY, text="")
+        return iid
+
+    def _show_page(self, parent):
+        """Insert the next page of `parent`'s rows"""
+        node = self._nodes[parent]
+        if node.placeholder is not None:
+            self.tree.delete(node.placeholder)
+            node.placeholder = None
+        end = min(node.shown + self.page_size, len(node.rows))
+        for row in node.rows[node.shown:end]:
+            self._insert(parent, node, row)
+        node.shown = end
+        self._update_placeholder(parent, node)
+
+    def _update_placeholder(self, parent, node):
+        remaining = len(node.rows) - node.shown
+        if remaining <= 0:
+            if node.placeholder is not None:
+                self.tree.delete(node.placeholder)
+                node.placeholder = None
+            return
+        text = f"… {remaining} more"
+        if node.placeholder is None:
+            node.placeholder = self.tree.insert(parent, "end", iid=(parent or "") + MORE,
+                                                text=text, tags=("more",))
+        else:
+            self.tree.item(node.placeholder, text=text)
+            self.tree.move(node.placeholder, parent, "end")
+
+    def _on_open(self, event=None):
+        iid = self.tree.focus()
+        if not iid or iid in self._nodes or "//" in iid:
+            return
+        if self.tree.exists(iid + DUMMY):
+            self.tree.delete(iid + DUMMY)
+        try:
+            self._expand(iid, iid)
+        except OSError:
+            # Unreadable directory: show it as empty rather than failing the event
+            self._nodes[iid] = _Node(iid, [])
+        self._changed()
+
+    def _on_select(self, event=None):
+        for iid in self.tree.selection():
+            if self.is_placeholder(iid):
+                parent = self.tree.parent(iid)
+                if parent in self._nodes:
+                    self._show_page(parent)
+
+    def _on_yscroll(self, first, last):
+        if self.yscroll is not None:
+            self.yscroll(first, last)
+        # Near the bottom: load pages whose placeholder became visible. Deferred so
+        # inserting items does not re-enter the scroll callback.
+        if float(last) >= 0.9 and not self._check_pending:
+            self._check_pending = True
+            self.tree.after_idle(self._load_visible_pages)
+
+    def _load_visible_pages(self):
+        self._check_pending = False
+        for parent, node in list(self._nodes.items()):
+            if node.placeholder is not None and self.tree.bbox(node.placeholder):
+                self._show_page(parent)
+
+    def _sort_rows(self, rows):
+        column, reverse = self._sort
+        rows.sort(key=SORT_KEYS[column], reverse=reverse)
+        # Directories stay on top whichever way the column is sorted
+        rows.sort(key=lambda row: not row[IS_DIR])
+
+    def sort_by(self, column):
+        """Sort every loaded directory by `column`, toggling direction on repeat clicks"""
+        reverse = self._sort == (column, False)
+        self._sort = (column, reverse)
+        for parent, node in list(self._nodes.items()):
+            if parent in self._nodes:
+                self._sort_rows(node.rows)
+                self._relayout(parent, node)
+        self._changed()
+
+    def _relayout(self, parent, node):
+        """Move existing items into model order, inserting/dropping only what changed"""
+        wanted = node.rows[:node.shown]
+        existing = set(self.tree.get_children(parent))
+        offset = 1 if parent == "" and self.show_parent else 0
+        keep = set()
+        for index, row in enumerate(wanted, offset):
+            iid = os.path.join(node.path, row[NAME])
+            keep.add(iid)
+            if iid in existing:
+                self.tree.move(iid, parent, index)
+            else:
+                self._insert(parent, node, row, index)
+        for iid in existing - keep:
+            if iid == ".." or iid == node.placeholder:
+                continue
+            self._forget(iid)
+            self.tree.delete(iid)
+        self._update_placeholder(parent, node)
+
+    def _forget(self, iid):
+        """Drop model nodes for `iid` and everything expanded beneath it"""
+        prefix = iid + os.sep
+        for key in [k for k in self._nodes if k == iid or k.startswith(prefix)]:
+            del self._nodes[key]
@@ -1,18 +1,18 @@
-import json
-import pandas as pd
+from student_report import report
+from students import load_students
 
-# with open("script.json","r") as file:
-#     data = json.load(file)
-#     for student in data:
-#         print("roll no",student["roll no"])
-
-df = pd.read_json("script.json")
-print(df)
-
-
-
-dn = pd.json_normalize(df["Student"]) 
+# Streams the "Student" array in chunks straight into a flat frame with compact
+# dtypes; repeat runs read the columnar cache kept next to script.json
+dn = load_students("script.json")
 print(dn)
 
-# df = pd.DataFrame('Student')
-# print(df.to_string(index=False))
+# Per-school and per-class statistics in one vectorized pass; for exports too
+# large to load, pass students.iter_frames("script.json") instead of [dn]
+summary = report([dn])
+result = summary.result()
+print(result["school"].T)
+print(result["class"].T)
+print(dn.join(summary.ranks(dn)))
+for subject, top in result["top"].items():
+    print(f"Top {subject}")
+    print(top)
@@ -0,0 +1,262 @@
+import heapq
+import os
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from difflib import SequenceMatcher
+
+
+FUZZY_MAX_POSTING = 50000   # very common trigrams add little to fuzzy ranking
+FUZZY_MIN_SCORE = 0.7
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """In-memory trigram index over lowercase file names.
+
+    Every name gets an integer id; each trigram maps to an ascending array of
+    the ids whose name contains it. Ids are never reused: removing a name just
+    blanks its slot, and the index compacts itself once a quarter of the slots
+    are blank. Writers hold `lock`. Readers take no lock: they work on one
+    `snapshot()`, in which they only ever see appends and blanked slots, and
+    compaction builds a new state and publishes it with a single assignment,
+    so a snapshot's ids, names and posting lists always belong together.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.pending = []       # changes that arrived while the index was being built
+        # (id -> path or None once removed, id -> lowercase name, path -> id, trigram -> array of ids)
+        self.state = ([], [], {}, {})
+        self.removed = 0
+
+    def __len__(self):
+        return len(self.state[2])
+
+    def snapshot(self):
+        """(paths, names, postings) that stay consistent with each other"""
+        paths, names, _, postings = self.state
+        return paths, names, postings
+
+    def add(self, path, lname):
+        names, ids = self.state[1], self.state[2]
+        old = ids.get(path)
+        if old is not None:
+            if names[old] == lname:
+                return
+            self._blank(old)
+        self._insert(self.state, path, lname)
+
+    @staticmethod
+    def _insert(state, path, lname):
+        paths, names, ids, postings = state
+        i = len(paths)
+        paths.append(path)
+        names.append(lname)
+        ids[path] = i
+        for gram in trigrams(lname):
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array("I")
+            posting.append(i)
+
+    def remove(self, path):
+        i = self.state[2].pop(path, None)
+        if i is not None:
+            self._blank(i)
+            if self.removed > 10000 and self.removed * 4 > len(self.state[0]):
+                self.compact()
+
+    def _blank(self, i):
+        paths, names = self.state[0], self.state[1]
+        paths[i] = None
+        names[i] = None
+        self.removed += 1
+
+    def compact(self):
+        """Renumber the live names and rebuild the posting lists into a new state"""
+        paths, names = self.state[0], self.state[1]
+        state = ([], [], {}, {})
+        for path, lname in zip(paths, names):
+            if path is not None:
+                self._insert(state, path, lname)
+        self.state = state
+        self.removed = 0
+
+    def substring(self, query, snapshot):
+        """Yield ids whose name contains `query` (lowercase), in id order.
+
+        `snapshot` is the caller's snapshot(), so ids stay valid even if the
+        index compacts meanwhile.
+        """
+        _, names, postings = snapshot
+        grams = trigrams(query)
+        if not grams:
+            # One or two characters: a plain scan is still only a few ms per million names
+            for i, name in enumerate(names):
+                if name is not None and query in name:
+                    yield i
+            return
+        lists = sorted((postings.get(g, ()) for g in grams), key=len)
+        # Checking the rarest list's names directly beats intersecting the others
+        for i in lists[0]:
+            name = names[i]
+            if name is not None and query in name:
+                yield i
+
+    def fuzzy(self, query, snapshot, accept, limit):
+        """Return up to `limit` (score, id) pairs for names similar to `query`, best first.
+
+        Candidates share trigrams with the query or with one of its adjacent
+        transpositions; they are ranked by how much of the query appears in
+        order in the name, so typos and partial names still match.
+        `accept(id)` filters candidates.
+        """
+        _, names, postings = snapshot
+        grams = trigrams(query)
+        for i in range(len(query) - 1):
+            grams |= trigrams(query[:i] + query[i + 1] + query[i] + query[i + 2:])
+        if not grams:
+            return []
+        counts = Counter()
+        for gram in sorted(grams, key=lambda g: len(postings.get(g, ()))):
+            posting = postings.get(gram)
+            if not posting or (counts and len(posting) > FUZZY_MAX_POSTING):
+                continue
+            counts.update(posting)
+
+        scored = []
+        for i, shared in heapq.nlargest(limit * 20, counts.items(), key=lambda x: x[1]):
+            name = names[i]
+            if name is None or not accept(i):
+                continue
+            stem = os.path.splitext(name)[0]
+            matcher = SequenceMatcher(None, query, stem, autojunk=False)
+            coverage = sum(block.size for block in matcher.get_matching_blocks()) / len(query)
+            score = 0.8 * coverage + 0.2 * matcher.ratio()
+            if score >= FUZZY_MIN_SCORE:
+                scored.append((round(score, 3), -len(name), i))  # shorter names win ties
+        return [(score, i) for score, _, i in heapq.nlargest(limit, scored)]
+
+
+class NameSearch:
+    """Instant filename search backed by per-root trigram indexes.
+
+    The index for a root is built in the background from the FileIndex the
+    first time the root is searched (searches fall back to the SQL scan until
+    it is ready), then kept current through the FileIndex listener callbacks,
+    so a keystroke costs a posting-list lookup instead of a scan of every
+    name. Searching a subdirectory of an indexed root reuses that root's index.
+    Queries containing a path separator also match the directories, e.g.
+    "src/main" finds main.py files inside any src directory.
+    """
+
+    def __init__(self, file_index, max_roots=2, fuzzy_limit=50):
+        self.file_index = file_index
+        self.max_roots = max_roots
+        self.fuzzy_limit = fuzzy_limit
+        self._roots = OrderedDict()     # root -> TrigramIndex
+        self._lock = threading.Lock()
+        file_index.add_listener(self._on_change)
+
+    def index_for(self, root):
+        """Return the ready trigram index covering `root`, or None while it is being built"""
+        root = os.path.abspath(str(root))
+        with self._lock:
+            for indexed, tri in self._roots.items():
+                if root == indexed or root.startswith(indexed.rstrip(os.sep) + os.sep):
+                    self._roots.move_to_end(indexed)
+                    return tri if tri.ready.is_set() else None
+            tri = TrigramIndex()
+            self._roots[root] = tri
+            while len(self._roots) > self.max_roots:
+                self._roots.popitem(last=False)
+        threading.Thread(target=self._build, args=(root, tri), daemon=True).start()
+        return None
+
+    def _build(self, root, tri):
+        for path, lname in self.file_index.iter_names(root):
+            tri.add(path, lname)
+        with tri.lock:
+            for kind, items in tri.pending:
+                self._apply(tri, root, kind, items)
+            tri.pending = []
+            tri.ready.set()
+
+    def _on_change(self, kind, items):
+        with self._lock:
+            indexes = list(self._roots.items())
+        for root, tri in indexes:
+            with tri.lock:
+                if tri.ready.is_set():
+                    self._apply(tri, root, kind, items)
+                else:
+                    tri.pending.append((kind, items))
+
+    @staticmethod
+    def _apply(tri, root, kind, items):
+        prefix = root.rstrip(os.sep) + os.sep
+        if kind == "added":
+            for row in items:
+                if row[0].startswith(prefix):
+                    tri.add(row[0], row[3])
+        else:
+            for path in items:
+                if path.startswith(prefix):
+                    tri.remove(path)
+
+    def search(self, root, query, cancel=None, fuzzy=True, chunk=500):
+        """Yield (path, is_dir, size, mtime, ext) rows below `root` matching `query`.
+
+        Exact substring matches come first, followed (if `fuzzy`) by up to
+        `fuzzy_limit` similar names ranked by score.
+        """
+        root = os.path.abspath(str(root))
+        prefix = root.rstrip(os.sep) + os.sep
+        query = query.lower()
+        in_path = os.sep in query
+        dir_query, _, name_query = query.rpartition(os.sep)
+
+        tri = self.index_for(root)
+        if tri is None:
+            for row in self.file_index.iter_search(root, name_query, cancel):
+                if not in_path or query in row[0][len(prefix) - 1:].lower():
+                    yield row
+            return
+
+        snapshot = tri.snapshot()
+        paths = snapshot[0]
+
+        def under_root(i):
+            path = paths[i]
+            return path is not None and path.startswith(prefix)
+
+        def accept(i):
+            return under_root(i) and (not in_path or query in paths[i][len(prefix) - 1:].lower())
+
+        def accept_similar(i):
+            return (i not in found and under_root(i) and
+                    (not in_path or dir_query in os.path.dirname(paths[i][len(prefix) - 1:]).lower()))
+
+        found = set()
+        batch = []
+        ids = tri.substring(name_query, snapshot) if name_query else range(len(paths))
+        for i in ids:
+            if accept(i):
+                found.add(i)
+                batch.append(paths[i])
+                if len(batch) >= chunk:
+                    if cancel is not None and cancel.is_set():
+                        return
+                    yield from self.file_index.rows_for(batch)
+                    batch = []
+        yield from self.file_index.rows_for(batch)
+
+        if not fuzzy or len(name_query) < 3 or (cancel is not None and cancel.is_set()):
+            return
+        similar = tri.fuzzy(name_query, snapshot, accept_similar, self.fuzzy_limit)
+        yield from self.file_index.rows_for([paths[i] for score, i in similar])
@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fs_walk import SYMLINKS_FOLLOW, scan_dir
+
+
+DEFAULT_JOURNAL_DIR = Path.home() / ".ai_file_organizer_journals"
+KEEP_JOURNALS = 20  # newest journals kept per root; undone ones are deleted right away
+
+Move = namedtuple("Move", "source target")
+
+
+class MovePlan:
+    """The moves organize_files would perform, computed without touching the disk"""
+
+    def __init__(self, root, moves):
+        self.root = str(root)
+        self.moves = moves
+
+    def __len__(self):
+        return len(self.moves)
+
+    def target_dirs(self):
+        """Directories that have to exist before the moves run"""
+        return sorted({os.path.dirname(move.target) for move in self.moves})
+
+    def by_category(self):
+        """Return {category directory name: [Move, ...]} for previews"""
+        groups = {}
+        for move in self.moves:
+            groups.setdefault(os.path.basename(os.path.dirname(move.target)), []).append(move)
+        return groups
+
+
+def _free_name(directory, name, taken):
+    """Return `name`, or 'stem (n).ext', so it collides with nothing on disk or planned"""
+    stem, ext = os.path.splitext(name)
+    candidate = name
+    n = 1
+    while (os.path.join(directory, candidate) in taken
+           or os.path.lexists(os.path.join(directory, candidate))):
+        candidate = f"{stem} ({n}){ext}"
+        n += 1
+    return candidate
+
+
+def build_plan(directory, categorize, stat=False):
+    """Plan moving each file directly in `directory` into `directory/<category>/`.
+
+    `categorize(entry)` returns a category name or None to leave the file alone;
+    pass `stat=True` if it looks at entry sizes or mtimes.
+    Name collisions with existing or already planned targets get a numbered suffix.
+    """
+    directory = os.path.abspath(str(directory))
+    taken = set()
+    moves = []
+    entries = scan_dir(directory, symlinks=SYMLINKS_FOLLOW, stat=stat)
+    for entry in sorted(entries, key=lambda e: e.name):
+        if entry.is_dir:
+            continue
+        category = categorize(entry)
+        if not category:
+            continue
+        target_dir = os.path.join(directory, category)
+        target = os.path.join(target_dir, _free_name(target_dir, entry.name, taken))
+        taken.add(target)
+        moves.append(Move(entry.path, target))
+    return MovePlan(directory, moves)
+
+
+def _root_key(root):
+    """Short hash of a root directory, used in journal names to find a root's journals"""
+    root = os.path.abspath(str(root))
+    return hashlib.blake2b(root.encode("utf-8", "surrogateescape"), digest_size=8).hexdigest()
+
+
+class Journal:
+    """Append-only JSON-lines record of a plan and of every move made from it.
+
+    Journals are named organize-<root hash>-<time>-<pid>-<ns>.jsonl, so the
+    journals of one root are listed without opening any of them.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file = None
+
+    @classmethod
+    def create(cls, plan, journal_dir=DEFAULT_JOURNAL_DIR):
+        journal_dir = Path(journal_dir)
+        journal_dir.mkdir(parents=True, exist_ok=True)
+        # The nanosecond suffix keeps runs started in the same second apart, and
+        # "x" makes a name collision fail instead of merging two journals
+        name = (f"organize-{_root_key(plan.root)}-{time.strftime('%Y%m%d-%H%M%S')}"
+                f"-{os.getpid()}-{time.time_ns()}.jsonl")
+        journal = cls(journal_dir / name)
+        journal._file = open(journal.path, "x")
+        journal.write({"op": "plan", "root": plan.root, "created": time.time(),
+                       "moves": [list(move) for move in plan.moves]})
+        for old in journals(journal_dir, plan.root)[KEEP_JOURNALS:]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+        return journal
+
+    def write(self, record):
+        # Flushed per record so a crashed process leaves an accurate journal behind
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a")
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def read(self):
+        """Return (plan, done, complete); done lists the moves currently applied, in order"""
+        plan = None
+        done = {}
+        complete = False
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn final line from an interrupted write
+                op = record["op"]
+                if op == "plan":
+                    plan = MovePlan(record["root"], [Move(*m) for m in record["moves"]])
+                elif op == "moved":
+                    done[record["source"]] = Move(record["source"], record["target"])
+                    complete = False
+                elif op == "undone":
+                    done.pop(record["source"], None)
+                    complete = False
+                elif op == "complete":
+                    complete = True
+        return plan, list(done.values()), complete
+
+
+def _move(source, target, devices):
+    """Move one file, renaming in place when source and target share a filesystem"""
+    if os.path.lexists(target):
+        raise FileExistsError(f"Target already exists: {target}")
+    target_dir = os.path.dirname(target)
+    if target_dir not in devices:
+        devices[target_dir] = os.stat(target_dir).st_dev
+    if os.lstat(source).st_dev == devices[target_dir]:
+        os.rename(source, target)
+    else:
+        shutil.move(source, target)
+
+
+def execute(plan, journal, workers=8, progress=None, cancel=None, skip=()):
+    """Apply `plan`, journaling each move. Returns (moved, errors).
+
+    `skip` holds sources already moved (used when resuming). `progress(done, total)`
+    is called after each move; setting `cancel` stops before the next one.
+    """
+    for target_dir in plan.target_dirs():
+        os.makedirs(target_dir, exist_ok=True)
+
+    skip = set(skip)
+    moves = [move for move in plan.moves if move.source not in skip]
+    devices = {}
+    errors = []
+    moved = 0
+    lock = threading.Lock()
+
+    def run(move):
+        nonlocal moved
+        if cancel is not None and cancel.is_set():
+            return
+        try:
+            if not os.path.lexists(move.source) and os.path.lexists(move.target):
+                pass  # moved before an interruption, but the journal never heard of it
+            else:
+                _move(move.source, move.target, devices)
+        except OSError as e:
+            journal.write({"op": "failed", "source": move.source, "error": str(e)})
+            with lock:
+                errors.append((move.source, str(e)))
+            return
+        journal.write({"op": "moved", "source": move.source, "target": move.target})
+        with lock:
+            moved += 1
+            if progress is not None:
+                progress(moved, len(moves))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(run, moves))
+
+    if not errors and (cancel is None or not cancel.is_set()):
+        journal.write({"op": "complete"})
+    journal.close()
+    return moved, errors
+
+
+def resume(journal_path, workers=8, progress=None, cancel=None):
+    """Finish an interrupted run from its journal"""
+    journal = Journal(journal_path)
+    plan, done, _ = journal.read()
+    return execute(plan, journal, workers, progress, cancel,
+                   skip=[move.source for move in done])
+
+
+def undo(journal_path):
+    """Move every file recorded in the journal back where it came from.
+
+    Returns (restored, errors); category directories left empty are removed,
+    and so is the journal once every move in it has been undone.
+    """
+    journal = Journal(journal_path)
+    plan, done, _ = journal.read()
+    restored = 0
+    errors = []
+    devices = {}
+    for move in reversed(done):
+        try:
+            _move(move.target, move.source, devices)
+        except OSError as e:
+            errors.append((move.target, str(e)))
+            continue
+        journal.write({"op": "undone", "source": move.source, "target": move.target})
+        restored += 1
+    for target_dir in plan.target_dirs() if plan else []:
+        try:
+            os.rmdir(target_dir)
+        except OSError:
+            pass
+    journal.close()
+    if not errors:
+        # Nothing is left to undo or resume
+        journal.path.unlink()
+    return restored, errors
+
+
+def journals(journal_dir=DEFAULT_JOURNAL_DIR, root=None):
+    """Return journal paths, newest first, optionally only those for `root`"""
+    journal_dir = Path(journal_dir)
+    if not journal_dir.exists():
+        return []
+    pattern = "organize-*.jsonl" if root is None else f"organize-{_root_key(root)}-*.jsonl"
+    # Names order runs started within the same mtime tick
+    return sorted(journal_dir.glob(pattern), key=lambda p: (p.stat().st_mtime, p.name), reverse=True)
+
+
+def undoable_journal(root, journal_dir=DEFAULT_JOURNAL_DIR):
+    """Return the newest journal for `root` with moves still applied, or None"""
+    for path in journals(journal_dir, root):
+        if Journal(path).read()[1]:
+            return path
+    return None
+
+
+def incomplete_journal(root, journal_dir=DEFAULT_JOURNAL_DIR):
+    """Return the newest journal for `root` whose run never completed, or None"""
+    for path in journals(journal_dir, root):
+        plan, done, complete = Journal(path).read()
+        if not complete and (done or plan.moves):
+            return path
+    return None
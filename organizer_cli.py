@@ -0,0 +1,200 @@
+"""Command line / batch interface to the organizer, with JSON output.
+
+Examples:
+    python organizer_cli.py analyze ~/Downloads --workers 8
+    python organizer_cli.py search ~/projects readme --limit 50
+    python organizer_cli.py grep ~/projects "def main" --limit 20
+    python organizer_cli.py du ~ --top 10
+    python organizer_cli.py organize ~/Downloads --dry-run
+    python organizer_cli.py dedupe ~/Pictures --hardlink
+"""
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import json
+import sys
+
+import organizer_core
+
+
+def archive_index(args):
+    return None if args.no_archives else organizer_core.open_archive_index()
+
+
+def cmd_analyze(args, config):
+    return organizer_core.analyze(args.path, workers=args.workers, processes=args.processes,
+                                  top=args.top, archives=archive_index(args))
+
+
+def cmd_search(args, config):
+    results = []
+    for path, is_dir, size, mtime, ext in organizer_core.search(args.path, args.query,
+                                                                 max_age=args.max_age,
+                                                                 archives=archive_index(args)):
+        results.append({"path": path, "is_dir": bool(is_dir), "size": size, "mtime": mtime})
+        if args.limit and len(results) >= args.limit:
+            break
+    return results
+
+
+def cmd_grep(args, config):
+    results = []
+    matches = organizer_core.grep(args.path, args.pattern, regex=args.regex,
+                                  ignore_case=not args.case_sensitive, max_age=args.max_age)
+    try:
+        for match in matches:
+            results.append({"path": match.path, "lines": match.lines})
+            if args.limit and len(results) >= args.limit:
+                break
+    finally:
+        matches.close()  # stops the worker pool
+    return results
+
+
+def cmd_classify(args, config):
+    categories = organizer_core.classify(args.path, config, max_age=args.max_age)
+    if args.counts:
+        return {category: len(paths) for category, paths in categories.items()}
+    return categories
+
+
+def cmd_du(args, config):
+    return organizer_core.disk_usage(args.path, top=args.top)
+
+
+def cmd_organize(args, config):
+    return organizer_core.organize(args.path, config, workers=args.workers, dry_run=args.dry_run)
+
+
+def cmd_undo(args, config):
+    journal, restored, errors = organizer_core.undo_organize(args.path)
+    return {"journal": journal, "restored": restored, "errors": errors}
+
+
+def cmd_generate(args, config):
+    variables = dict(item.partition("=")[::2] for item in args.var)
+    projects = [dict(variables, name=name) for name in args.name]
+    if args.batch:
+        from scaffold import read_projects
+        projects += [dict(variables, **p) if isinstance(p, dict) else dict(variables, name=p)
+                     for p in read_projects(args.batch)]
+    if not projects:
+        raise SystemExit("generate: give project names or --batch")
+    if len(projects) == 1:
+        return {"project": organizer_core.generate_project(
+            projects[0]["name"], args.type, args.location, config, projects[0])}
+    paths, errors = organizer_core.generate_projects(projects, args.type, args.location, config,
+                                                     workers=args.workers)
+    return {"projects": paths, "errors": errors}
+
+
+def cmd_dedupe(args, config):
+    groups = organizer_core.find_duplicates(args.path, workers=args.workers,
+                                            archives=archive_index(args))
+    result = {"groups": groups, "wasted": sum(g.wasted for g in groups)}
+    if args.delete or args.hardlink:
+        from duplicates import resolve_duplicates
+        reclaimed, errors = resolve_duplicates(groups, mode="delete" if args.delete else "hardlink")
+        result.update({"reclaimed": reclaimed, "errors": errors})
+    return result
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="AI File Organizer (headless)")
+    parser.add_argument("--config", help="config file (default: ~/.ai_file_organizer_config.json)")
+    parser.add_argument("--timings", action="store_true",
+                        help="print startup and command time to stderr")
+    parser.add_argument("--indent", type=int, default=2, help="JSON indent (0 for compact)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("analyze", help="analyze a directory tree")
+    p.add_argument("path")
+    p.add_argument("--workers", type=int, default=1, help="walk in parallel with N workers")
+    p.add_argument("--processes", action="store_true", help="use processes instead of threads")
+    p.add_argument("--top", type=int, default=10, help="size of the largest/recent lists")
+    p.add_argument("--no-archives", action="store_true", help="do not look inside zip/tar archives")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser("search", help="find files by name")
+    p.add_argument("path")
+    p.add_argument("query")
+    p.add_argument("--limit", type=int, default=0)
+    p.add_argument("--max-age", type=float, default=60,
+                   help="re-scan the index if older than this many seconds")
+    p.add_argument("--no-archives", action="store_true", help="do not look inside zip/tar archives")
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("grep", help="find files by content")
+    p.add_argument("path")
+    p.add_argument("pattern")
+    p.add_argument("--regex", action="store_true", help="treat the pattern as a regular expression")
+    p.add_argument("--case-sensitive", action="store_true")
+    p.add_argument("--limit", type=int, default=0, help="stop after this many matching files")
+    p.add_argument("--max-age", type=float, default=60,
+                   help="re-scan the index if older than this many seconds")
+    p.set_defaults(func=cmd_grep)
+
+    p = sub.add_parser("classify", help="apply the organization rules to a whole tree")
+    p.add_argument("path")
+    p.add_argument("--counts", action="store_true", help="only print the number of files per category")
+    p.add_argument("--max-age", type=float, default=60,
+                   help="re-scan the index if older than this many seconds")
+    p.set_defaults(func=cmd_classify)
+
+    p = sub.add_parser("du", help="recursive directory sizes, largest subdirectories first")
+    p.add_argument("path")
+    p.add_argument("--top", type=int, default=20, help="number of subdirectories to list")
+    p.set_defaults(func=cmd_du)
+
+    p = sub.add_parser("organize", help="move files into category folders")
+    p.add_argument("path")
+    p.add_argument("--dry-run", action="store_true", help="only print the move plan")
+    p.add_argument("--workers", type=int, default=8)
+    p.set_defaults(func=cmd_organize)
+
+    p = sub.add_parser("undo", help="undo the last organize run in a directory")
+    p.add_argument("path")
+    p.set_defaults(func=cmd_undo)
+
+    p = sub.add_parser("generate", help="create projects from a template")
+    p.add_argument("name", nargs="*")
+    p.add_argument("--type", default="python")
+    p.add_argument("--location", default=".")
+    p.add_argument("--batch", help="file with one project name per line, or a CSV with a name column")
+    p.add_argument("--var", action="append", default=[], metavar="KEY=VALUE",
+                   help="template variable for every project (repeatable)")
+    p.add_argument("--workers", type=int, default=8)
+    p.set_defaults(func=cmd_generate)
+
+    p = sub.add_parser("dedupe", help="find duplicate files")
+    p.add_argument("path")
+    p.add_argument("--workers", type=int, default=None)
+    action = p.add_mutually_exclusive_group()
+    action.add_argument("--delete", action="store_true", help="delete extra copies")
+    action.add_argument("--hardlink", action="store_true", help="replace extra copies with hardlinks")
+    p.add_argument("--no-archives", action="store_true", help="do not look inside zip/tar archives")
+    p.set_defaults(func=cmd_dedupe)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = (organizer_core.load_config(args.config) if args.config
+              else organizer_core.load_config())
+    ready = time.perf_counter()
+
+    result = args.func(args, config)
+    done = time.perf_counter()
+
+    json.dump(organizer_core.to_jsonable(result), sys.stdout, indent=args.indent or None)
+    sys.stdout.write("\n")
+    if args.timings:
+        print(json.dumps({"startup_ms": round((ready - _START) * 1000, 2),
+                          "command_ms": round((done - ready) * 1000, 2)}), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""Headless core operations shared by the GUI and the command line.
+
+Only the standard library is imported at module level; the index, walker,
+pools and other helpers are imported inside the functions that need them so
+that a CLI invocation only pays for what it uses.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+
+CONFIG_PATH = Path.home() / ".ai_file_organizer_config.json"
+
+DEFAULT_CONFIG = {
+    "file_categories": {
+        "images": [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".svg"],
+        "documents": [".pdf", ".doc", ".docx", ".txt", ".rtf"],
+        "code": [".py", ".js", ".html", ".css", ".java", ".cpp", ".c"],
+        "archives": [".zip", ".rar", ".7z", ".tar", ".gz"],
+        "media": [".mp4", ".avi", ".mkv", ".mp3", ".wav", ".flac"]
+    },
+    "project_templates": {
+        "python": {
+            "src/${package}/__init__.py": "\"\"\"${name}\"\"\"\n\n__version__ = \"0.1.0\"\n",
+            "tests/": None,
+            "docs/": None,
+            "requirements.txt": "",
+            "README.md": "# ${name}\n\n${description}\n",
+            ".gitignore": "__pycache__/\n*.pyc\n.venv/\n"
+        },
+        "web": {
+            "css/style.css": "",
+            "js/": None,
+            "images/": None,
+            "index.html": "<!DOCTYPE html>\n<html>\n<head>\n  <title>${name}</title>\n"
+                          "  <link rel=\"stylesheet\" href=\"css/style.css\">\n</head>\n"
+                          "<body>\n</body>\n</html>\n"
+        },
+        "data_science": ["data/", "notebooks/", "models/", "src/"]
+    }
+}
+
+
+def load_config(config_path=CONFIG_PATH):
+    """Load configuration file, writing the defaults on first use"""
+    config_path = Path(config_path)
+    if config_path.exists():
+        with open(config_path, 'r') as f:
+            return json.load(f)
+    with open(config_path, 'w') as f:
+        json.dump(DEFAULT_CONFIG, f, indent=2)
+    return DEFAULT_CONFIG
+
+
+# The RuleSet last compiled, reused for the same config object: (config, RuleSet, time)
+_compiled_rules = None
+RULES_MAX_AGE = 60  # seconds; age conditions are measured from when the rules were compiled
+
+
+def compile_rules(config):
+    """Compile the config's "rules" and "file_categories" into a rules.RuleSet.
+
+    Per-file callers such as get_file_category get the same compiled RuleSet
+    for the same config object until it is RULES_MAX_AGE seconds old.
+    """
+    global _compiled_rules
+    cached = _compiled_rules
+    if cached is not None and cached[0] is config and time.monotonic() - cached[2] < RULES_MAX_AGE:
+        return cached[1]
+    from rules import RuleSet
+    rules = RuleSet.from_config(config)
+    _compiled_rules = (config, rules, time.monotonic())
+    return rules
+
+
+def get_file_category(config, extension):
+    """Get category for file extension"""
+    return compile_rules(config).category_for_extension(extension)
+
+
+def open_index():
+    """Open the persistent metadata index"""
+    from file_index import FileIndex
+    return FileIndex()
+
+
+def open_archive_index():
+    """Open the persistent cache of archive member listings"""
+    from archives import ArchiveIndex
+    return ArchiveIndex()
+
+
+def plan_organize(path, config):
+    """Build the move plan organize() would execute"""
+    from organize_plan import build_plan
+    rules = compile_rules(config)
+    return build_plan(path, rules.classify_entry, stat=rules.needs_stat)
+
+
+def classify(path, config, index=None, max_age=60, cancel=None):
+    """Classify every file below `path` with the organization rules.
+
+    Returns {category: [paths]}; the whole indexed tree is classified in one batch.
+    """
+    rules = compile_rules(config)
+    index = index if index is not None else open_index()
+    index.ensure(path, max_age, cancel=cancel)
+    categories = {}
+    for file_path, category in rules.classify_rows(index.iter_rows(path, cancel)):
+        categories.setdefault(category, []).append(file_path)
+    return categories
+
+
+def disk_usage(path, index=None, top=20, cancel=None):
+    """Recursive size of `path` and its largest subdirectories, from cached rollups.
+
+    Returns a dict with bytes/files/dirs totals and the `top` subdirectories by size.
+    """
+    from disk_usage import DiskUsage
+    index = index if index is not None else open_index()
+    total, largest = DiskUsage(index).largest(path, top, cancel)
+    if total is None:
+        return None
+    return dict(total._asdict(), path=os.path.abspath(path),
+                children=[dict(usage._asdict(), path=child) for child, usage in largest])
+
+
+def organize(path, config, workers=8, dry_run=False):
+    """Organize the files directly in `path` into category folders.
+
+    Returns a dict describing the plan, and for real runs the outcome and journal.
+    """
+    from organize_plan import Journal, execute
+    plan = plan_organize(path, config)
+    result = {"root": plan.root, "moves": [list(move) for move in plan.moves]}
+    if dry_run or not plan:
+        return result
+    journal = Journal.create(plan)
+    moved, errors = execute(plan, journal, workers)
+    result.update({"moved": moved, "errors": errors, "journal": str(journal.path)})
+    return result
+
+
+def undo_organize(path):
+    """Undo the most recent organize run in `path`; returns (journal, restored, errors)"""
+    from organize_plan import undo, undoable_journal
+    journal_path = undoable_journal(path)
+    if journal_path is None:
+        return None, 0, []
+    restored, errors = undo(journal_path)
+    return journal_path, restored, errors
+
+
+def analyze(path, index=None, workers=1, processes=False, top=10, progress=None, cancel=None,
+            archives=None):
+    """Analyze a directory tree and return the analysis dict (None if cancelled).
+
+    With `workers > 1` the tree is walked directly across a worker pool;
+    otherwise the persistent index is refreshed and analyzed. Given an
+    archives.ArchiveIndex, the members of zip/tar archives are summarized
+    under "archives" without extracting them.
+    """
+    if workers > 1:
+        from analysis import analyze_parallel
+        stats = analyze_parallel(path, workers, top, processes, progress, cancel)
+    else:
+        index = index if index is not None else open_index()
+        try:
+            # Only directories whose mtime changed since the last scan are re-read
+            index.refresh(path, cancel=cancel, progress=progress)
+        except PermissionError:
+            pass
+        stats = index.analyze_stats(path, top, progress, cancel)
+    if stats is None:
+        return None
+
+    result = stats.result()
+    if archives is not None and stats.archives:
+        from analysis import analyze_archives
+        if workers > 1:
+            index = index if index is not None else open_index()
+            try:
+                # The parallel walk bypassed the index, which lists the archives
+                index.refresh(path, cancel=cancel)
+            except PermissionError:
+                pass
+        members = analyze_archives(path, index, archives, top, progress, cancel)
+        if members is None:
+            return None
+        result["archives"] = members
+    return result
+
+
+def search(path, query, index=None, max_age=60, cancel=None, names=None, archives=None):
+    """Yield (path, is_dir, size, mtime, ext) for names below `path` containing `query`.
+
+    With a name_index.NameSearch (long-lived callers such as the GUI) lookups
+    use its trigram index and similar names follow the exact matches;
+    otherwise the index is scanned with SQL. Given an archives.ArchiveIndex,
+    matching archive members follow as "<archive>!/<member>" paths.
+    """
+    index = index if index is not None else open_index()
+    try:
+        index.ensure(path, max_age, cancel=cancel)
+    except PermissionError:
+        return
+    if names is not None:
+        yield from names.search(path, query, cancel)
+    else:
+        yield from index.iter_search(path, query, cancel)
+    if archives is not None and os.sep not in query:
+        # Archives are only re-stat'ed once the index saw one change (or after max_age)
+        archives.refresh(path, index, max_age, cancel)
+        yield from archives.iter_search(path, query, cancel)
+
+
+def grep(path, pattern, regex=False, ignore_case=True, index=None, max_age=60, cancel=None,
+         searcher=None, max_size=None):
+    """Yield content_search.FileMatches for files below `path` whose content matches `pattern`.
+
+    Binary files, files over `max_size` bytes and media/archive extensions are skipped.
+    Pass a long-lived ContentSearch as `searcher` to reuse its worker pool.
+    """
+    from content_search import DEFAULT_MAX_SIZE, ContentSearch, compile_pattern, select_files
+    compiled = compile_pattern(pattern, regex, ignore_case)
+    index = index if index is not None else open_index()
+    try:
+        index.ensure(path, max_age, cancel=cancel)
+    except PermissionError:
+        return
+    files = select_files(index.iter_rows(path, cancel), max_size or DEFAULT_MAX_SIZE)
+    owned = searcher is None
+    searcher = searcher if searcher is not None else ContentSearch()
+    try:
+        yield from searcher.search(files, compiled, cancel)
+    finally:
+        if owned:
+            searcher.close(wait=True)
+
+
+def generate_project(name, project_type, location, config, variables=None):
+    """Create a project skeleton from a template and return its path"""
+    from scaffold import Scaffolder
+    return Scaffolder.from_config(config).generate(name, project_type, location, variables)
+
+
+def generate_projects(projects, project_type, location, config, workers=8, progress=None, cancel=None):
+    """Create many projects in one batch; `projects` holds names or variable dicts with a "name".
+
+    Returns (project paths, [(path, error)]).
+    """
+    from scaffold import Scaffolder
+    return Scaffolder.from_config(config, workers).generate_many(
+        projects, project_type, location, progress, cancel)
+
+
+def structure_preview(path, max_depth=4, max_entries=50):
+    """Return the indented tree listing shown in the project structure preview, as one string"""
+    from scaffold import preview
+    return preview(path, max_depth, max_entries)
+
+
+def find_duplicates(path, workers=None, progress=None, cancel=None, archives=None):
+    """Return duplicate groups below `path` (including archive members, given an ArchiveIndex)"""
+    from duplicates import DuplicateFinder
+    return DuplicateFinder(workers=workers, archives=archives).find(path, progress, cancel)
+
+
+def to_jsonable(value):
+    """Convert analysis results (Paths, tuples, named tuples) to JSON-friendly values"""
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if hasattr(value, "_asdict"):
+        return {k: to_jsonable(v) for k, v in value._asdict().items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    return value
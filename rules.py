@@ -0,0 +1,198 @@
+import fnmatch
+import os
+import re
+import time
+from bisect import bisect_right
+
+
+DEFAULT_CATEGORY = "others"
+
+RULE_KEYS = {"category", "priority", "extensions", "glob", "path_prefix",
+             "min_size", "max_size", "older_than_days", "newer_than_days"}
+
+_SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2,
+               "g": 1024 ** 3, "gb": 1024 ** 3, "t": 1024 ** 4, "tb": 1024 ** 4}
+
+
+def parse_size(value):
+    """Bytes from an int or a string such as "500KB" or "1.5 GB" """
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r"\s*([\d.]+)\s*([a-zA-Z]*)\s*", str(value))
+    if not match or match.group(2).lower() not in _SIZE_UNITS:
+        raise ValueError(f"Invalid size: {value!r}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).lower()])
+
+
+def _as_list(value):
+    return [value] if isinstance(value, str) else list(value or [])
+
+
+def _bucket_masks(bounds, n_rules):
+    """Turn per-rule [low, high) ranges into sorted cut points and a rule mask per bucket.
+
+    bisect_right(cuts, value) picks the bucket; every rule whose range covers
+    that bucket has its bit set, so a range test is one bisect plus one AND.
+    """
+    cuts = sorted({b for low, high in bounds.values() for b in (low, high) if b is not None})
+    masks = []
+    for bucket in range(len(cuts) + 1):
+        # Any value in this bucket behaves like the bucket's lower cut point
+        probe = cuts[bucket - 1] if bucket else float("-inf")
+        mask = 0
+        for bit in range(n_rules):
+            low, high = bounds.get(bit, (None, None))
+            if (low is None or probe >= low) and (high is None or probe < high):
+                mask |= 1 << bit
+        masks.append(mask)
+    return cuts, masks
+
+
+class RuleSet:
+    """Organization rules compiled into a fast matcher.
+
+    Rules come from the "rules" list in the config, highest "priority" first
+    (config order breaks ties), followed by the plain "file_categories"
+    extension map. Each rule may combine:
+
+        extensions       [".mp4", ".mkv"]
+        glob             ["Screenshot*.png"] (file name, case-insensitive)
+        path_prefix      ["~/Downloads"]
+        min_size/max_size  bytes or "500MB"
+        older_than_days/newer_than_days  by modification time
+
+    Every condition is precompiled into a bitmask of rules it admits: an
+    extension dict, one combined regex per rule set of globs, bisected size
+    and age thresholds and a per-directory prefix cache. Classifying a file
+    ANDs those masks and picks the highest-priority bit left.
+    """
+
+    def __init__(self, rules, extension_map=None, default=DEFAULT_CATEGORY, now=None):
+        self.default = default
+        now = time.time() if now is None else now
+
+        ordered = sorted(enumerate(rules), key=lambda r: (-r[1].get("priority", 0), r[0]))
+        compiled = []
+        for position, rule in ordered:
+            unknown = set(rule) - RULE_KEYS
+            if unknown or "category" not in rule:
+                raise ValueError(f"Invalid rule #{position + 1}: "
+                                 + (f"unknown keys {sorted(unknown)}" if unknown else "missing category"))
+            compiled.append(rule)
+        for category, extensions in (extension_map or {}).items():
+            compiled.append({"category": category, "extensions": extensions})
+
+        self.categories = [rule["category"] for rule in compiled]
+        n = len(compiled)
+        self.all_mask = (1 << n) - 1
+
+        # Extensions: ext -> rules naming it; rules without an extension list admit any
+        self.ext_masks = {}
+        self.any_ext_mask = 0
+        self.plain_mask = 0     # rules that only look at the extension
+        size_bounds, mtime_bounds = {}, {}
+        self.prefixes = []      # (prefix, bit)
+        self.prefix_free_mask = 0
+        glob_rules = []
+        for bit, rule in enumerate(compiled):
+            extensions = _as_list(rule.get("extensions"))
+            if extensions:
+                for ext in extensions:
+                    ext = ext.lower() if ext.startswith(".") or not ext else "." + ext.lower()
+                    self.ext_masks[ext] = self.ext_masks.get(ext, 0) | 1 << bit
+            else:
+                self.any_ext_mask |= 1 << bit
+            if set(rule) <= {"category", "priority", "extensions"}:
+                self.plain_mask |= 1 << bit
+
+            if "min_size" in rule or "max_size" in rule:
+                size_bounds[bit] = (parse_size(rule["min_size"]) if "min_size" in rule else None,
+                                    parse_size(rule["max_size"]) + 1 if "max_size" in rule else None)
+            if "older_than_days" in rule or "newer_than_days" in rule:
+                older, newer = rule.get("older_than_days"), rule.get("newer_than_days")
+                mtime_bounds[bit] = (now - newer * 86400 if newer is not None else None,
+                                     now - older * 86400 if older is not None else None)
+
+            prefixes = _as_list(rule.get("path_prefix"))
+            if prefixes:
+                for prefix in prefixes:
+                    self.prefixes.append((os.path.abspath(os.path.expanduser(prefix)), bit))
+            else:
+                self.prefix_free_mask |= 1 << bit
+
+            globs = _as_list(rule.get("glob"))
+            if globs:
+                glob_rules.append((bit, re.compile("|".join(fnmatch.translate(g) for g in globs),
+                                                   re.IGNORECASE)))
+
+        self.size_cuts, self.size_masks = _bucket_masks(size_bounds, n)
+        self.mtime_cuts, self.mtime_masks = _bucket_masks(mtime_bounds, n)
+
+        # Globs: one combined regex rejects most names in a single match
+        self.glob_rules = glob_rules
+        self.no_glob_mask = self.all_mask
+        for bit, _ in glob_rules:
+            self.no_glob_mask &= ~(1 << bit)
+        self.any_glob = (re.compile("|".join(f"(?:{regex.pattern})" for _, regex in glob_rules),
+                                    re.IGNORECASE) if glob_rules else None)
+        self._prefix_cache = {}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get("rules", []), config.get("file_categories", {}),
+                   config.get("default_category", DEFAULT_CATEGORY))
+
+    @property
+    def needs_stat(self):
+        """True if some rule looks at file sizes or modification times"""
+        return bool(self.size_cuts or self.mtime_cuts)
+
+    def _prefix_mask(self, directory):
+        mask = self._prefix_cache.get(directory)
+        if mask is None:
+            mask = self.prefix_free_mask
+            for prefix, bit in self.prefixes:
+                if directory == prefix or directory.startswith(prefix.rstrip(os.sep) + os.sep):
+                    mask |= 1 << bit
+            if len(self._prefix_cache) > 100000:
+                self._prefix_cache.clear()
+            self._prefix_cache[directory] = mask
+        return mask
+
+    def classify(self, path, size=0, mtime=0.0, name=None, ext=None):
+        """Return the category of one file"""
+        name = name if name is not None else os.path.basename(path)
+        ext = ext if ext is not None else os.path.splitext(name)[1].lower()
+        mask = (self.ext_masks.get(ext, 0) | self.any_ext_mask)
+        if mask and self.size_cuts:
+            mask &= self.size_masks[bisect_right(self.size_cuts, size)]
+        if mask and self.mtime_cuts:
+            mask &= self.mtime_masks[bisect_right(self.mtime_cuts, mtime)]
+        if mask and self.prefixes:
+            mask &= self._prefix_mask(os.path.dirname(path))
+        if mask and self.any_glob is not None and mask & ~self.no_glob_mask:
+            glob_mask = self.no_glob_mask
+            if self.any_glob.match(name):
+                for bit, regex in self.glob_rules:
+                    if mask >> bit & 1 and regex.match(name):
+                        glob_mask |= 1 << bit
+            mask &= glob_mask
+        if not mask:
+            return self.default
+        return self.categories[(mask & -mask).bit_length() - 1]
+
+    def category_for_extension(self, ext):
+        """Category by extension alone (rules with other conditions are ignored)"""
+        mask = self.ext_masks.get(ext.lower(), 0) & self.plain_mask
+        return self.categories[(mask & -mask).bit_length() - 1] if mask else self.default
+
+    def classify_entry(self, entry):
+        """Category of an fs_walk.Entry"""
+        return self.classify(entry.path, entry.size, entry.mtime, entry.name, entry.ext)
+
+    def classify_rows(self, rows):
+        """Yield (path, category) for the files among (path, is_dir, size, mtime, ext) rows"""
+        classify = self.classify
+        for path, is_dir, size, mtime, ext in rows:
+            if not is_dir:
+                yield path, classify(path, size, mtime, None, ext)
@@ -0,0 +1,255 @@
+import csv
+import datetime
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import string
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+DEFAULT_CACHE_DIR = Path.home() / ".ai_file_organizer_templates"
+
+FICLONE = 0x40049409    # Linux ioctl: share the source's extents copy-on-write (btrfs, XFS, ...)
+LINK_MODES = ("reflink", "hardlink", "copy")
+
+
+def template_files(template):
+    """Normalize a template into [(relative path, content or None for a directory)].
+
+    A template is either the classic list of paths ("src/" for a directory,
+    an empty file otherwise) or a dict mapping paths to file contents, where
+    a trailing "/" or a null content marks a directory. Paths and contents may
+    use ${variables}.
+    """
+    if isinstance(template, dict):
+        items = template.items()
+    else:
+        items = ((item, "") for item in template)
+    return [(path.rstrip("/"), None) if path.endswith("/") or content is None else (path, content)
+            for path, content in items]
+
+
+def project_variables(name, extra=None):
+    """Variables available to every template: name, package, year, date, plus `extra`"""
+    today = datetime.date.today()
+    variables = {"name": name,
+                 "package": re.sub(r"\W+", "_", name).strip("_").lower() or "project",
+                 "year": str(today.year), "date": today.isoformat(),
+                 "author": "", "description": ""}
+    variables.update(extra or {})
+    return variables
+
+
+def render(files, variables):
+    """Substitute `variables` into template paths and contents"""
+    rendered = []
+    for path, content in files:
+        path = os.path.normpath(string.Template(path).safe_substitute(variables))
+        if os.path.isabs(path) or path == ".." or path.startswith(".." + os.sep):
+            raise ValueError(f"Template path leaves the project: {path}")
+        if content is not None:
+            content = string.Template(content).safe_substitute(variables)
+        rendered.append((path, content))
+    return rendered
+
+
+def read_projects(path):
+    """Read a batch: a CSV whose header has a "name" column (other columns become
+    template variables), otherwise one project name per line ("#" lines skipped)"""
+    with open(path, newline="", encoding="utf-8") as f:
+        text = f.read()
+    lines = text.splitlines()
+    header = next((line for line in lines if line.strip()), "")
+    if "," in header and "name" in [cell.strip().lower() for cell in header.split(",")]:
+        reader = csv.DictReader(io.StringIO(text))
+        reader.fieldnames = [field.strip().lower() for field in reader.fieldnames]
+        return [{key: (value or "").strip() for key, value in row.items() if key}
+                for row in reader if (row.get("name") or "").strip()]
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+
+def _is_static(path, content):
+    return content is not None and "$" not in path and "$" not in content
+
+
+class Scaffolder:
+    """Creates projects from the config's "project_templates".
+
+    Files without variables are rendered once into a cached template
+    directory (below `cache_dir`, keyed by their content) and each project
+    gets a copy-on-write clone of them (reflink) where the filesystem supports
+    it, a hardlink if `link="hardlink"` (only safe for files nobody edits in
+    place), or a plain copy. Files with variables are written per project.
+    Writes for all projects of a batch are spread over `workers` threads and
+    existing files are never overwritten.
+    """
+
+    def __init__(self, templates, defaults=None, cache_dir=DEFAULT_CACHE_DIR, workers=8, link="reflink"):
+        if link not in LINK_MODES:
+            raise ValueError(f"Unknown link mode: {link}")
+        self.templates = templates
+        self.defaults = defaults or {}
+        self.cache_dir = Path(cache_dir)
+        self.workers = workers
+        self.link = link
+        self._reflink = fcntl is not None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, workers=8):
+        return cls(config.get("project_templates", {}), config.get("template_variables"),
+                   workers=workers, link=config.get("scaffold_link", "reflink"))
+
+    def files(self, project_type):
+        if project_type not in self.templates:
+            raise ValueError(f"Unknown project type: {project_type}")
+        return template_files(self.templates[project_type])
+
+    def _static_dir(self, project_type, files):
+        """Return the cached directory holding the template's variable-free files, rendering it once"""
+        static = sorted((path, content) for path, content in files if _is_static(path, content))
+        if not static:
+            return None
+        key = hashlib.blake2b(json.dumps([project_type, static]).encode(), digest_size=10).hexdigest()
+        directory = self.cache_dir / (re.sub(r"[^\w.-]", "_", project_type) + "-" + key)
+        with self._lock:
+            if directory.is_dir():
+                return directory
+            tmp = self.cache_dir / f".{directory.name}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            for path, content in static:
+                target = tmp / path
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(content.encode("utf-8"))
+            try:
+                os.rename(tmp, directory)
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)  # another process finished first
+        return directory
+
+    def _clone(self, source, target):
+        """Create `target` from the cached `source` without overwriting anything"""
+        if self.link == "hardlink":
+            try:
+                os.link(source, target)
+                return
+            except FileExistsError:
+                raise
+            except OSError:
+                pass  # e.g. another filesystem: fall back to copying
+        with open(source, "rb") as src, open(target, "xb") as dst:
+            if self.link == "reflink" and self._reflink:
+                try:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                    return
+                except OSError:
+                    self._reflink = False   # not supported here; stop trying
+            shutil.copyfileobj(src, dst)
+
+    def generate(self, name, project_type, location, variables=None):
+        """Create one project and return its path; raises the first error"""
+        paths, errors = self.generate_many([dict(variables or {}, name=name)], project_type, location)
+        if errors:
+            raise OSError(f"{errors[0][0]}: {errors[0][1]}")
+        return paths[0]
+
+    def generate_many(self, projects, project_type, location, progress=None, cancel=None):
+        """Create several projects in one pass.
+
+        `projects` holds names or dicts of variables including "name".
+        Returns (project paths, [(path, error)]). `progress(done, total)` counts
+        files written; setting `cancel` stops before the next file.
+        """
+        files = self.files(project_type)
+        static_dir = self._static_dir(project_type, files)
+        location = Path(location)
+
+        roots, tasks, errors = [], [], []
+        made = set()
+        for project in projects:
+            extra = dict(self.defaults, **project) if isinstance(project, dict) else dict(self.defaults, name=project)
+            name = str(extra.get("name", "")).strip()
+            if not name or os.sep in name or name in (".", ".."):
+                errors.append((name, "invalid project name"))
+                continue
+            root = location / name
+            try:
+                rendered = render(files, project_variables(name, extra))
+                # Directories first, once each; the files can then be written in any order
+                for directory in [root] + [root / path if content is None else (root / path).parent
+                                           for path, content in rendered]:
+                    if directory not in made:
+                        directory.mkdir(parents=True, exist_ok=True)
+                        made.add(directory)
+            except (OSError, ValueError) as e:
+                errors.append((str(root), str(e)))
+                continue
+            roots.append(root)
+            for (path, content), template in zip(rendered, files):
+                if content is None:
+                    continue
+                if static_dir is not None and _is_static(*template):
+                    tasks.append((root / path, static_dir / path, None))
+                else:
+                    tasks.append((root / path, None, content.encode("utf-8")))
+
+        lock = threading.Lock()
+        done = 0
+
+        def run(task):
+            nonlocal done
+            if cancel is not None and cancel.is_set():
+                return
+            target, source, data = task
+            try:
+                if source is not None:
+                    self._clone(source, target)
+                else:
+                    with open(target, "xb") as f:
+                        f.write(data)
+            except FileExistsError:
+                pass    # keep what the user already has
+            except OSError as e:
+                with lock:
+                    errors.append((str(target), str(e)))
+            with lock:
+                done += 1
+                if progress is not None:
+                    progress(done, len(tasks))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(run, tasks))
+        return roots, errors
+
+
+def preview(path, max_depth=4, max_entries=50):
+    """Indented tree listing of `path` as one string.
+
+    Levels below `max_depth` are left out and directories with more than
+    `max_entries` children are cut short with a "… N more" line.
+    """
+    from fs_walk import scan_dir
+    lines = []
+
+    def visit(directory, depth):
+        entries = sorted(scan_dir(directory, stat=False), key=lambda e: (not e.is_dir, e.name.lower()))
+        for entry in entries[:max_entries]:
+            lines.append(f"{'  ' * depth}{'📁' if entry.is_dir else '📄'} {entry.name}")
+            if entry.is_dir and not entry.is_symlink:
+                if max_depth is None or depth + 1 < max_depth:
+                    visit(entry.path, depth + 1)
+        if len(entries) > max_entries:
+            lines.append(f"{'  ' * depth}… {len(entries) - max_entries} more")
+
+    visit(os.fspath(path), 0)
+    return "\n".join(lines)
@@ -0,0 +1,120 @@
+import queue
+import threading
+import time
+
+
+class BackgroundSearch:
+    """Debounced, cancellable search that runs off the Tk thread.
+
+    `search_func(*args, cancel)` is a generator run on a worker thread; it must
+    stop promptly once the `cancel` event is set. Rows are handed to the Tk
+    thread in batches via `root.after`, so widget updates only ever happen on
+    the main loop:
+
+    - `on_reset()` clears the view when a new search starts,
+    - `on_rows(rows)` inserts one batch,
+    - `on_status(text)` shows progress ("Searching…", result counts, errors).
+
+    A new request cancels the one in flight; results of a stale search are dropped.
+    """
+
+    def __init__(self, root, search_func, on_reset, on_rows, on_status,
+                 debounce_ms=250, batch_size=200, max_results=5000, poll_ms=40):
+        self.root = root
+        self.search_func = search_func
+        self.on_reset = on_reset
+        self.on_rows = on_rows
+        self.on_status = on_status
+        self.debounce_ms = debounce_ms
+        self.batch_size = batch_size
+        self.max_results = max_results
+        self.poll_ms = poll_ms
+
+        self._queue = queue.Queue()
+        self._generation = 0
+        self._cancel = None
+        self._debounce_id = None
+        self._poll_id = None
+        self._shown = 0
+
+    def request(self, *args):
+        """Schedule a search; calls arriving within `debounce_ms` replace each other"""
+        if self._debounce_id is not None:
+            self.root.after_cancel(self._debounce_id)
+        self._debounce_id = self.root.after(self.debounce_ms, self._start, args)
+
+    def cancel(self):
+        """Cancel any pending or running search"""
+        if self._debounce_id is not None:
+            self.root.after_cancel(self._debounce_id)
+            self._debounce_id = None
+        if self._cancel is not None:
+            self._cancel.set()
+            self._cancel = None
+        self._generation += 1
+
+    def is_running(self):
+        return self._cancel is not None
+
+    def _start(self, args):
+        self._debounce_id = None
+        self.cancel()
+        generation = self._generation
+        self._cancel = cancel = threading.Event()
+        self._shown = 0
+
+        self.on_reset()
+        self.on_status("Searching…")
+        threading.Thread(target=self._run, args=(generation, cancel, args), daemon=True).start()
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._drain)
+
+    def _run(self, generation, cancel, args):
+        """Worker thread: push batches of rows onto the queue"""
+        batch = []
+        found = 0
+        capped = False
+        try:
+            for row in self.search_func(*args, cancel):
+                if cancel.is_set():
+                    return
+                batch.append(row)
+                found += 1
+                if found >= self.max_results:
+                    capped = True
+                    break
+                if len(batch) >= self.batch_size:
+                    self._queue.put(("rows", generation, batch))
+                    batch = []
+            if batch:
+                self._queue.put(("rows", generation, batch))
+            self._queue.put(("done", generation, (found, capped)))
+        except Exception as e:
+            self._queue.put(("error", generation, e))
+
+    def _drain(self):
+        """Tk thread: apply queued batches for at most one frame's worth of time"""
+        self._poll_id = None
+        deadline = time.monotonic() + 0.03
+        while time.monotonic() < deadline:
+            try:
+                kind, generation, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation:
+                continue
+            if kind == "rows":
+                self.on_rows(payload)
+                self._shown += len(payload)
+                self.on_status(f"Searching… {self._shown} found")
+            elif kind == "done":
+                found, capped = payload
+                self._cancel = None
+                suffix = f" (showing first {found})" if capped else ""
+                self.on_status(f"{found} result{'s' if found != 1 else ''}{suffix}")
+            elif kind == "error":
+                self._cancel = None
+                self.on_status(f"Search failed: {payload}")
+
+        if self._cancel is not None or not self._queue.empty():
+            self._poll_id = self.root.after(self.poll_ms, self._drain)
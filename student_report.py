@@ -0,0 +1,211 @@
+"""Per-school and per-class statistics over the normalized student frame.
+
+StudentReport consumes the frame in chunks (students.iter_frames) and keeps
+only mergeable aggregates: per group and subject a histogram of marks, pass
+counts and a running top-N. Marks take few distinct values, so the
+histograms stay small however many students stream through, and means,
+medians and percentiles computed from them are exact (nearest-rank) rather
+than estimated. Ranks within a class are looked up from the same histograms
+in a second, equally chunked pass.
+"""
+
+
+PASS_MARK = 33
+PERCENTILES = (25, 50, 75, 90)
+TOTAL = "Total"
+LEVELS = {"school": ["School Name"], "class": ["School Name", "Class"]}
+ID_COLUMNS = ["roll no", "Name"]
+
+# Partial histograms are folded together once this many chunks have piled up
+_FOLD_EVERY = 16
+
+
+class StudentReport:
+    """Streaming aggregate report; add() each chunk, then result() and ranks()"""
+
+    def __init__(self, subjects=None, thresholds=PASS_MARK, percentiles=PERCENTILES, top=10,
+                 levels=None):
+        # Without explicit subjects every "Marks." column seen so far counts
+        self.subjects = list(subjects) if subjects else []
+        self._learn = not subjects
+        self.thresholds = thresholds
+        self.percentiles = tuple(percentiles)
+        self.top = top
+        self.levels = dict(levels or LEVELS)
+        self.rows = 0
+        self._hist = []
+        self._passed = []
+        self._top = {}
+        self._rank_tables = None
+
+    def threshold(self, subject):
+        if isinstance(self.thresholds, dict):
+            return self.thresholds.get(subject, self.thresholds.get(subject.split(".", 1)[-1], PASS_MARK))
+        return self.thresholds
+
+    def _keys(self):
+        return sorted({key for keys in self.levels.values() for key in keys})
+
+    def _prepare(self, frame, learn=True):
+        """Marks columns plus the Total, with group keys as plain values (categories differ per chunk).
+
+        Chunks need not share their columns: every known subject is present,
+        NaN (not graded) where the chunk lacks it, and with `learn` subjects
+        first seen in this chunk join the known ones.
+        """
+        import pandas as pd
+        if learn and self._learn:
+            self.subjects += [name for name in frame.columns
+                              if name.startswith("Marks.") and name not in self.subjects]
+        keys = self._keys()
+        ids = [name for name in ID_COLUMNS if name in frame.columns and name not in keys]
+        data = frame.reindex(columns=ids + keys + self.subjects)
+        for key in keys:
+            data[key] = data[key].astype(object)
+        for subject in self.subjects:
+            # One float dtype for every chunk; text marks such as "AB" count as not graded
+            data[subject] = pd.to_numeric(data[subject], errors="coerce").astype("float64")
+        data[TOTAL] = data[self.subjects].sum(axis=1, min_count=len(self.subjects))
+        return data
+
+    def add(self, frame):
+        """Fold one chunk of students into the report"""
+        data = self._prepare(frame)
+        keys = self._keys()
+        scored = self.subjects + [TOTAL]
+        self.rows += len(data)
+
+        # Aggregated once by every group key together; levels are summed out of it later
+        long = data.melt(id_vars=keys, value_vars=scored, var_name="subject",
+                         value_name="mark").dropna(subset=["mark"])
+        # One mark dtype for every chunk, so partial histograms line up
+        long["mark"] = long["mark"].astype("float64")
+        self._hist.append(long.groupby(keys + ["subject", "mark"], dropna=False, sort=False).size())
+
+        passed = data[keys].copy()
+        passed["students"] = 1
+        for subject in self.subjects:
+            passed[subject] = data[subject] >= self.threshold(subject)
+        # Subjects a student has no mark for are skipped; at least one must be graded
+        graded = data[self.subjects].notna()
+        passed["all_passed"] = (passed[self.subjects] | ~graded).all(axis=1) & graded.any(axis=1)
+        self._passed.append(passed.groupby(keys, dropna=False, sort=False).sum())
+
+        if len(self._hist) >= _FOLD_EVERY:
+            self._hist = [_fold(self._hist)]
+            self._passed = [_fold(self._passed)]
+
+        for subject in scored:
+            best = data.nlargest(self.top, subject)
+            if subject in self._top:
+                best = _concat([self._top[subject], best]).nlargest(self.top, subject)
+            self._top[subject] = best
+        self._rank_tables = None
+        return self
+
+    def histogram(self, level):
+        """Series of student counts indexed by (group keys..., subject, mark)"""
+        if not self._hist:
+            return None
+        self._hist = [_fold(self._hist)]
+        return _fold(self._hist, self.levels[level] + ["subject", "mark"])
+
+    def group_stats(self, level):
+        """One row per group: students and pass counts, then per subject mean, median and percentiles"""
+        import pandas as pd
+        keys = self.levels[level]
+        hist = self.histogram(level)
+        if hist is None:
+            return pd.DataFrame()
+        table = hist.rename("count").reset_index().sort_values(keys + ["subject", "mark"])
+        by = keys + ["subject"]
+        counts = table.groupby(by, dropna=False, sort=False)["count"]
+        table["cum"] = counts.cumsum()
+        table["n"] = counts.transform("sum")
+        table["weighted"] = table["mark"] * table["count"]
+
+        grouped = table.groupby(by, dropna=False, sort=False)
+        stats = grouped.agg(graded=("count", "sum"), weighted=("weighted", "sum"))
+        stats["mean"] = stats.pop("weighted") / stats["graded"]
+        names = []
+        for p in sorted(set(self.percentiles) | {50}):
+            # Nearest rank: the smallest mark with at least ceil(p% of n) students at or below it
+            need = ((table["n"] * p + 99) // 100).clip(lower=1)
+            name = "median" if p == 50 else f"p{p}"
+            stats[name] = table[table["cum"] >= need].groupby(by, dropna=False, sort=False)["mark"].first()
+            names.append(name)
+        stats = stats.unstack("subject")
+
+        self._passed = [_fold(self._passed)]
+        # Subjects that appeared in later chunks are missing (NaN) from earlier counts
+        passed = _fold(self._passed, keys).fillna(0).astype("int64")
+        result = passed[["students", "all_passed"]].copy()
+        for subject in self.subjects + [TOTAL]:
+            if subject != TOTAL:
+                graded = stats[("graded", subject)].reindex(result.index).fillna(0).astype("int64")
+                result[f"{subject} passed"] = passed[subject]
+                result[f"{subject} failed"] = graded - passed[subject]
+            for name in ["mean"] + names:
+                result[f"{subject} {name}"] = stats[(name, subject)].reindex(result.index)
+        return result.sort_index()
+
+    def top_students(self, subject):
+        """The `top` best students in `subject` ("Marks.Maths" or "Total"), best first"""
+        return self._top[subject].reset_index(drop=True)
+
+    def result(self):
+        """{"school": DataFrame, "class": DataFrame, "top": {subject: DataFrame}}"""
+        result = {level: self.group_stats(level) for level in self.levels}
+        result["top"] = {subject: self.top_students(subject) for subject in self._top}
+        return result
+
+    def ranks(self, frame, level="class"):
+        """Competition ranks (1 = best) of `frame`'s students within their `level` group.
+
+        Needs the whole data set added first; `frame` can then be any chunk.
+        Returns a DataFrame aligned with `frame` with one "<subject> rank" column
+        per subject and the Total.
+        """
+        import pandas as pd
+        keys = self.levels[level]
+        if self._rank_tables is None or self._rank_tables[0] != level:
+            table = self.histogram(level).rename("count").reset_index()
+            table = table.sort_values(keys + ["subject", "mark"])
+            grouped = table.groupby(keys + ["subject"], dropna=False, sort=False)["count"]
+            # Students with a higher mark, plus one
+            table["rank"] = grouped.transform("sum") - grouped.cumsum() + 1
+            self._rank_tables = (level, {subject: part.drop(columns=["subject", "count"])
+                                         for subject, part in table.groupby("subject")})
+        data = self._prepare(frame, learn=False)
+        ranks = pd.DataFrame(index=frame.index)
+        for subject in self.subjects + [TOTAL]:
+            lookup = self._rank_tables[1].get(subject)
+            if lookup is None:
+                ranks[f"{subject} rank"] = float("nan")
+                continue
+            left = data[keys + [subject]].rename(columns={subject: "mark"}).astype({"mark": "float64"})
+            merged = left.merge(lookup, on=keys + ["mark"], how="left")
+            ranks[f"{subject} rank"] = merged["rank"].to_numpy()
+        return ranks
+
+
+def _concat(parts):
+    import pandas as pd
+    return pd.concat(parts)
+
+
+def _fold(parts, levels=None):
+    """Sum partial aggregates (histograms or pass counts) by their index, or by some of its `levels`"""
+    if len(parts) == 1 and levels is None:
+        return parts[0]
+    combined = _concat(parts) if len(parts) > 1 else parts[0]
+    by = levels if levels is not None else list(range(combined.index.nlevels))
+    return combined.groupby(level=by, dropna=False, sort=False).sum()
+
+
+def report(frames, **options):
+    """Build a StudentReport over an iterable of frames (or chunks of one)"""
+    result = StudentReport(**options)
+    for frame in frames:
+        result.add(frame)
+    return result
@@ -0,0 +1,277 @@
+"""Streaming loader for the student exports (script.json).
+
+The exports look like {"Student": [{"roll no": 1, "Name": ..., "Class": ...,
+"School Name": ..., "Marks.Maths": 90, ...}, ...]}. Records are decoded one
+at a time from a buffered read of the file and collected column-wise into
+DataFrames of `chunk_rows` rows, so memory holds one chunk of Python objects
+at a time instead of the whole document plus an object column of dicts.
+"""
+import glob
+import json
+import os
+import re
+from pathlib import Path
+
+
+CHUNK_BYTES = 1024 * 1024   # read size for the incremental parser
+CHUNK_ROWS = 100_000        # records per DataFrame chunk
+
+CATEGORY_COLUMNS = ("Class", "School Name")
+INTEGER_COLUMNS = ("roll no",)
+MARK_PREFIX = "Marks."
+
+_SPACES = " \t\n\r"
+_WHITESPACE = re.compile(r"[ \t\n\r]*").match
+
+
+class _Reader:
+    """Buffered text reader that decodes one JSON value at a time"""
+
+    def __init__(self, f, chunk_bytes):
+        self.f = f
+        self.chunk_bytes = chunk_bytes
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        data = self.f.read(self.chunk_bytes)
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        self.eof = not data
+        return bool(data)
+
+    def peek(self):
+        """Next non-whitespace character ("" at the end of the file)"""
+        while True:
+            self.pos = _WHITESPACE(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r}, found {char or 'end of file'!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next value, reading more input until it is complete"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next read
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """Yield the values of the array whose "[" was just consumed"""
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        decode = self.decoder.raw_decode
+        while True:
+            # Fast path: decode straight from the buffer while values and separators are complete
+            buf, pos = self.buf, self.pos
+            try:
+                while True:
+                    if buf[pos] in _SPACES:
+                        pos = _WHITESPACE(buf, pos).end()
+                    value, end = decode(buf, pos)
+                    char = buf[end]
+                    if char in _SPACES:
+                        end = _WHITESPACE(buf, end).end()
+                        char = buf[end]
+                    if char == ",":
+                        self.pos = pos = end + 1
+                        yield value
+                    elif char == "]":
+                        self.pos = end + 1
+                        yield value
+                        return
+                    else:
+                        raise ValueError(f"Expected ',' or ']', found {char!r}")
+            except (json.JSONDecodeError, IndexError):
+                pass
+            # The buffer ends inside a value or before its separator
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+
+def iter_records(path, key="Student", chunk_bytes=CHUNK_BYTES):
+    """Yield the objects of the `key` array of the document at `path` one by one.
+
+    A document that is a bare array is streamed as is; other top-level keys
+    are skipped.
+    """
+    with open(path, encoding="utf-8") as f:
+        reader = _Reader(f, chunk_bytes)
+        if reader.peek() == "{":
+            reader.expect("{")
+            while True:
+                if reader.peek() == "}":
+                    return
+                name = reader.value()
+                reader.expect(":")
+                if name == key and reader.peek() == "[":
+                    break
+                reader.value()
+                if reader.expect(",}") == "}":
+                    return
+        reader.expect("[")
+        yield from reader.items()
+
+
+def _flatten(record, prefix=""):
+    """Flatten nested objects to "Marks.Maths"-style keys, like pandas.json_normalize"""
+    for key, value in record.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        else:
+            yield prefix + key, value
+
+
+def iter_columns(path, chunk_rows=CHUNK_ROWS, key="Student", chunk_bytes=CHUNK_BYTES):
+    """Yield chunks of records as {column: list of values}, missing fields as None"""
+    columns, count = {}, 0
+    names = columns.keys()
+    for record in iter_records(path, key, chunk_bytes):
+        if record.keys() == names:
+            # Same flat fields as the records so far (the usual case)
+            for name, value in record.items():
+                columns[name].append(value)
+        else:
+            for name, value in _flatten(record):
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = [None] * count
+                column.append(value)
+            for column in columns.values():
+                if len(column) <= count:
+                    column.append(None)
+        count += 1
+        if count == chunk_rows:
+            yield columns
+            columns, count = {}, 0
+            names = columns.keys()
+    if count:
+        yield columns
+
+
+def _compact_numbers(column):
+    """The smallest integer dtype that holds `column` (a nullable one such as Int16
+    where values are missing); fractional or non-numeric columns are returned as is"""
+    import pandas as pd
+    from pandas.api.types import infer_dtype, is_bool_dtype, is_numeric_dtype
+    if column.dtype == object:
+        # All missing in this chunk, or numbers mixed with None
+        if infer_dtype(column, skipna=True) not in ("integer", "floating", "mixed-integer-float", "empty"):
+            return column   # text such as "AB" among the marks stays as json_normalize has it
+        column = pd.to_numeric(column)
+    elif not is_numeric_dtype(column) or is_bool_dtype(column):
+        return column
+    present = column.dropna()
+    if not (present == present.round()).all():
+        return column
+    smallest = pd.to_numeric(present.astype("int64"), downcast="integer").dtype
+    if len(present) == len(column):
+        return column.astype(smallest)
+    return column.astype(smallest.name.capitalize())
+
+
+def compact(frame):
+    """Shrink a student frame in place: categoricals for class and school, the
+    smallest integer type for roll numbers and marks (a nullable Int8/Int16/...
+    where some are missing), leaving columns with any non-numeric value alone"""
+    for name in frame.columns:
+        if name in CATEGORY_COLUMNS:
+            frame[name] = frame[name].astype("category")
+        elif name in INTEGER_COLUMNS or name.startswith(MARK_PREFIX):
+            frame[name] = _compact_numbers(frame[name])
+    return frame
+
+
+def iter_frames(path, chunk_rows=CHUNK_ROWS, key="Student"):
+    """Yield compact DataFrames of up to `chunk_rows` students each"""
+    import pandas as pd
+    for columns in iter_columns(path, chunk_rows, key):
+        yield compact(pd.DataFrame(columns))
+
+
+def concat(frames):
+    """Concatenate chunks, merging categoricals instead of falling back to object columns"""
+    import pandas as pd
+    from pandas.api.types import union_categoricals
+    frames = list(frames)
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    order = list(dict.fromkeys(name for frame in frames for name in frame.columns))
+    categorical = [name for name in CATEGORY_COLUMNS
+                   if all(name in frame.columns for frame in frames)]
+    result = pd.concat([frame.drop(columns=categorical) for frame in frames], ignore_index=True)
+    for name in categorical:
+        result[name] = union_categoricals([frame[name] for frame in frames], ignore_order=True)
+    # Integer widths may differ between chunks; compact settles on the smallest that fits all
+    return compact(result.reindex(columns=order))
+
+
+def _sidecar(path, fmt):
+    st = os.stat(path)
+    return path.with_name(f".{path.name}.{st.st_size}-{st.st_mtime_ns}.{fmt}")
+
+
+def _read_sidecar(sidecar, fmt):
+    import pandas as pd
+    return pd.read_parquet(sidecar) if fmt == "parquet" else pd.read_feather(sidecar)
+
+
+def _write_sidecar(frame, source, sidecar, fmt):
+    """Write the cache atomically and drop sidecars of older versions of `source`"""
+    tmp = sidecar.with_name(sidecar.name + ".tmp")
+    try:
+        if fmt == "parquet":
+            frame.to_parquet(tmp, index=False)
+        else:
+            frame.to_feather(tmp)
+        os.replace(tmp, sidecar)
+    except (ImportError, OSError, TypeError, ValueError):
+        # No parquet/feather engine installed, an unwritable directory or a column mixing
+        # numbers and text the format cannot store: load without a cache
+        tmp.unlink(missing_ok=True)
+        return
+    for old in sidecar.parent.glob(f".{glob.escape(source.name)}.*-*.{fmt}"):
+        if old != sidecar and old.name[len(source.name) + 2:].split(".")[0].replace("-", "").isdigit():
+            old.unlink(missing_ok=True)
+
+
+def load_students(path="script.json", chunk_rows=CHUNK_ROWS, cache="parquet"):
+    """Load the flat, compact student frame, from the columnar sidecar cache when current.
+
+    The cache (".<source>.<size>-<mtime>.parquet" next to the source, or
+    "feather") is rewritten whenever the source changes; pass cache=None to
+    always parse the JSON.
+    """
+    path = Path(path)
+    sidecar = _sidecar(path, cache) if cache else None
+    if sidecar is not None and sidecar.exists():
+        try:
+            return _read_sidecar(sidecar, cache)
+        except (ImportError, OSError, ValueError):
+            pass
+    frame = concat(iter_frames(path, chunk_rows))
+    if sidecar is not None:
+        _write_sidecar(frame, path, sidecar, cache)
+    return frame
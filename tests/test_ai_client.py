@@ -0,0 +1,162 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import ai_client
+from ai_client import AIClient, AIError, ResponseCache
+
+
+class StubServer(ThreadingHTTPServer):
+    """Chat-completions endpoint that plays back queued (status, headers, body) replies"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.replies = []
+        self.requests = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append(json.loads(body))
+        self.server.gate.wait(5)
+        status, headers, payload = self.server.replies.pop(0)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def answer(text):
+    return 200, {"Content-Type": "application/json"}, json.dumps(
+        {"choices": [{"message": {"content": text}}]}).encode()
+
+
+def events(*pieces):
+    lines = [b"data: " + json.dumps({"choices": [{"delta": {"content": piece}}]}).encode()
+             for piece in pieces]
+    return 200, {"Content-Type": "text/event-stream"}, b"\n\n".join(lines + [b"data: [DONE]", b""])
+
+
+@pytest.fixture
+def server():
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(ai_client.time, "sleep", slept.append)
+    return slept
+
+
+@pytest.fixture
+def client(server):
+    client = AIClient(base_url=server.url, api_key="test", retries=2, backoff=0.5,
+                      cache=ResponseCache(None))
+    yield client
+    client.close()
+
+
+def test_retries_transient_failures_with_backoff(server, client, sleeps):
+    server.replies = [(503, {}, b""), (502, {}, b""), answer("hello")]
+    assert client.complete("hi") == "hello"
+    assert len(server.requests) == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_retry_after_replaces_the_backoff(server, client, sleeps):
+    server.replies = [(429, {"Retry-After": "3"}, b""), (429, {"Retry-After": "0"}, b""), answer("ok")]
+    assert client.complete("hi") == "ok"
+    assert sleeps == [3.0, 1.0]
+
+
+def test_gives_up_after_the_last_retry(server, client, sleeps):
+    server.replies = [(500, {}, b"")] * 3
+    with pytest.raises(AIError, match="after 3 attempts"):
+        client.complete("hi")
+    assert len(sleeps) == 2
+
+
+def test_client_errors_are_not_retried(server, client, sleeps):
+    server.replies = [(401, {}, b"bad key")]
+    with pytest.raises(AIError, match="HTTP 401"):
+        client.complete("hi")
+    assert sleeps == []
+
+
+def test_answers_are_cached(server, client, sleeps):
+    server.replies = [answer("cached")]
+    assert client.complete("question", context="ctx", system="sys") == "cached"
+    assert client.complete("question", context="ctx", system="sys") == "cached"
+    assert len(server.requests) == 1
+    assert server.requests[0]["messages"] == [
+        {"role": "system", "content": "sys"}, {"role": "user", "content": "ctx\n\nquestion"}]
+
+
+def test_identical_requests_in_flight_share_one_call(server, client, sleeps):
+    server.replies = [answer("shared"), answer("other")]
+    server.gate.clear()
+    first = client.submit("question", context="ctx")
+    second = client.submit("question", context="ctx")
+    different = client.submit("another question", context="ctx")
+    assert second is first and different is not first
+    server.gate.set()
+    assert {first.result(), different.result()} == {"shared", "other"}
+    assert len(server.requests) == 2
+
+
+def test_cache_persists_in_sqlite(tmp_path, server):
+    server.replies = [answer("stored")]
+    first = AIClient(base_url=server.url, cache=ResponseCache(tmp_path / "cache.db"))
+    assert first.complete("q") == "stored"
+    first.close()
+    second = AIClient(base_url=server.url, cache=ResponseCache(tmp_path / "cache.db"))
+    assert second.complete("q") == "stored"
+    second.close()
+    assert len(server.requests) == 1
+
+
+def test_stream_yields_pieces_and_caches_the_answer(server, client, sleeps):
+    messages = [{"role": "user", "content": "hi"}]
+    server.replies = [(503, {}, b""), events("Hel", "lo", "!")]
+    assert list(client.stream(messages)) == ["Hel", "lo", "!"]
+    assert server.requests[-1]["stream"] is True
+    assert list(client.stream(messages)) == ["Hello!"]
+    assert len(server.requests) == 2
+
+
+def test_stream_falls_back_to_a_plain_answer(server, client):
+    server.replies = [answer("whole")]
+    assert list(client.stream([{"role": "user", "content": "hi"}])) == ["whole"]
+
+
+def test_cancelled_stream_is_not_cached(server, client):
+    messages = [{"role": "user", "content": "hi"}]
+    cancel = threading.Event()
+    server.replies = [events("one", "two"), events("again")]
+    stream = client.stream(messages, cancel)
+    assert next(stream) == "one"
+    cancel.set()
+    assert list(stream) == []
+    assert list(client.stream(messages)) == ["again"]
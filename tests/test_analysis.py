@@ -0,0 +1,61 @@
+import os
+import zipfile
+
+import pytest
+
+import organizer_core
+from analysis import analyze_entries, analyze_parallel
+from archives import ArchiveIndex
+from file_index import FileIndex
+from fs_walk import walk
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "tree"
+    for i in range(40):
+        folder = root / f"d{i % 5}" / f"sub{i % 3}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"f{i}.{('txt', 'py', 'md')[i % 3]}").write_bytes(b"x" * (i * 37 % 500))
+        os.utime(folder / f"f{i}.{('txt', 'py', 'md')[i % 3]}", (1000 + i, 1000 + i))
+    (root / "top.txt").write_bytes(b"top")
+    with zipfile.ZipFile(root / "d1" / "arc.zip", "w") as z:
+        z.writestr("inner.txt", b"inside")
+    return root
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = FileIndex(tmp_path / "index.db")
+    yield index
+    index.close()
+
+
+def test_parallel_matches_serial(tree):
+    serial = analyze_entries(walk(str(tree)), top=5).result()
+    for processes in (False, True):
+        parallel = analyze_parallel(str(tree), workers=3, top=5, processes=processes).result()
+        assert parallel == serial
+
+
+def test_relative_root_matches_the_index(tree, index, tmp_path, monkeypatch):
+    archives = ArchiveIndex(tmp_path / "archives.db")
+    serial = organizer_core.analyze(str(tree), index=index, top=5, archives=archives)
+    monkeypatch.chdir(tree.parent)
+    parallel = organizer_core.analyze("tree", index=index, workers=3, top=5, archives=archives)
+    archives.close()
+    assert parallel == serial
+    assert all(path.is_absolute() for path, _ in parallel["largest_files"])
+    assert serial["archives"]["total_files"] == 1
+
+
+def test_archives_are_counted_not_collected(tree):
+    stats = analyze_parallel(str(tree), workers=2, top=5)
+    assert stats.archives == 1
+
+
+def test_parallel_archives_come_from_a_fresh_index(tree, index, tmp_path):
+    archives = ArchiveIndex(tmp_path / "archives.db")
+    result = organizer_core.analyze(str(tree), index=index, workers=2, archives=archives)
+    archives.close()
+    assert (result["archives"]["count"], result["archives"]["total_files"]) == (1, 1)
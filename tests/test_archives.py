@@ -0,0 +1,118 @@
+import bz2
+import gzip
+import io
+import os
+import tarfile
+import zipfile
+import zlib
+
+import pytest
+
+from archives import ArchiveIndex, is_member_path, list_archive, split_member_path
+from duplicates import DuplicateFinder, HashCache, resolve_duplicates
+
+
+def make_tar(path, files, mode="w"):
+    with tarfile.open(path, mode) as archive:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 1_700_000_000
+            archive.addfile(info, io.BytesIO(data))
+    return str(path)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ArchiveIndex(tmp_path / "archives.db")
+    yield index
+    index.close()
+
+
+def test_zip_listing_comes_with_crcs(tmp_path):
+    path = tmp_path / "a.zip"
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("docs/", b"")
+        z.writestr("docs/a.txt", b"hello")
+    members = {m.name: m for m in list_archive(str(path))}
+    assert members["docs"].is_dir
+    assert (members["docs/a.txt"].size, members["docs/a.txt"].crc) == (5, zlib.crc32(b"hello"))
+
+
+@pytest.mark.parametrize("suffix,mode", [(".tar", "w"), (".tar.gz", "w:gz"), (".tgz", "w:gz")])
+def test_tar_listing_reads_headers_only(tmp_path, suffix, mode):
+    path = make_tar(tmp_path / f"a{suffix}", {"a.txt": b"x" * 1000, "b.txt": b""}, mode)
+    members = sorted(list_archive(path))
+    assert [(m.name, m.size, m.mtime, m.crc) for m in members] == [
+        ("a.txt", 1000, 1_700_000_000, None), ("b.txt", 0, 1_700_000_000, None)]
+
+
+def test_single_compressed_files(tmp_path):
+    data = b"log line\n" * 1000
+    gz = tmp_path / "access.log.gz"
+    gz.write_bytes(gzip.compress(data))
+    bz = tmp_path / "access.log.bz2"
+    bz.write_bytes(bz2.compress(data))
+    for path in (gz, bz):
+        [member] = list_archive(str(path), mtime=5.0)
+        assert (member.name, member.size, member.mtime, member.crc) == (
+            "access.log", len(data), 5.0, zlib.crc32(data))
+
+
+def test_fill_checksums_reads_only_the_wanted_members(tmp_path, index):
+    path = make_tar(tmp_path / "a.tar", {"a.txt": b"aaa", "b.txt": b"bb", "c.txt": b"c"})
+    index.update(tmp_path, [(path, 0, 0)])
+    assert index.fill_checksums([(path, "b.txt")]) == {(path, "b.txt"): zlib.crc32(b"bb")}
+    crcs = {name: crc for _, name, _, crc in index.checksums(tmp_path)}
+    assert crcs == {"a.txt": None, "b.txt": zlib.crc32(b"bb"), "c.txt": None}
+
+
+def test_tar_members_take_part_in_deduplication(tmp_path, index):
+    root = tmp_path / "tree"
+    root.mkdir()
+    (root / "copy.txt").write_bytes(b"shared content")
+    make_tar(root / "backup.tar", {"orig.txt": b"shared content", "unique.txt": b"only here, longer"})
+    cache = HashCache(tmp_path / "hashes.db")
+    groups = DuplicateFinder(cache=cache, workers=1, archives=index).find(root)
+    cache.close()
+    assert [g.paths for g in groups] == [
+        [str(root / "copy.txt"), os.path.join(str(root), "backup.tar!", "orig.txt")]]
+    # The member no file could pair with was never read
+    crcs = {name: crc for _, name, _, crc in index.checksums(root)}
+    assert crcs["unique.txt"] is None
+
+
+def test_update_forgets_removed_and_rereads_changed_archives(tmp_path, index):
+    path = make_tar(tmp_path / "a.tar", {"a.txt": b"a"})
+    assert index.update(tmp_path, [(path, 0, 0)]) == 1
+    assert index.update(tmp_path, [(path, 0, 0)]) == 0
+    make_tar(path, {"a.txt": b"a", "b.txt": b"bbbb"})
+    os.utime(path, (1, 1))
+    assert index.update(tmp_path, [(path, 0, 0)]) == 1
+    assert sorted(m.name for m in index.members(path)) == ["a.txt", "b.txt"]
+    os.remove(path)
+    index.update(tmp_path, [])
+    assert index.stats(tmp_path) == (0, 0, 0)
+
+
+def test_folders_ending_in_an_exclamation_mark_are_not_archives(tmp_path):
+    folder = tmp_path / "Important!"
+    folder.mkdir()
+    (folder / "a.txt").write_bytes(b"twice")
+    (folder / "b.txt").write_bytes(b"twice")
+    odd = tmp_path / "odd.zip!"
+    odd.mkdir()
+    path = str(odd / "c.txt")
+    assert not is_member_path(str(folder / "a.txt"))
+    assert split_member_path(path) == (path, "")
+
+    with zipfile.ZipFile(tmp_path / "Important!" / "x.zip", "w") as z:
+        z.writestr("a.txt", b"twice")
+    member = os.path.join(str(folder), "x.zip!", "a.txt")
+    assert split_member_path(member) == (str(folder / "x.zip"), "a.txt")
+
+    cache = HashCache(tmp_path / "hashes.db")
+    groups = DuplicateFinder(cache=cache, workers=1).find(folder)
+    cache.close()
+    assert resolve_duplicates(groups) == (5, [])
+    assert sorted(os.listdir(folder)) == ["a.txt", "x.zip"]
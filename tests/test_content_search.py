@@ -0,0 +1,71 @@
+import os
+import signal
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import organizer_core
+from content_search import ContentSearch, compile_pattern, grep_file, select_files
+from file_index import FileIndex
+
+
+def test_anchors_match_at_every_line(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("foo\nbar foo\nfoo bar\nFOO\n")
+    assert grep_file(str(path), compile_pattern("^foo$", regex=True)) == [(1, "foo"), (4, "FOO")]
+    assert grep_file(str(path), compile_pattern("foo", ignore_case=False)) == [
+        (1, "foo"), (2, "bar foo"), (3, "foo bar")]
+    # Literal patterns are escaped, and each line is reported once
+    assert grep_file(str(path), compile_pattern("o.")) == []
+    assert grep_file(str(path), compile_pattern("o"), max_matches=2) == [(1, "foo"), (2, "bar foo")]
+
+
+def test_binary_and_empty_files_are_skipped(tmp_path):
+    (tmp_path / "bin").write_bytes(b"foo\0foo")
+    (tmp_path / "empty").write_bytes(b"")
+    pattern = compile_pattern("foo")
+    assert grep_file(str(tmp_path / "bin"), pattern) == []
+    assert grep_file(str(tmp_path / "empty"), pattern) == []
+    assert grep_file(str(tmp_path / "missing"), pattern) == []
+
+
+def test_select_files_skips_dirs_media_and_large_files():
+    rows = [("/d", True, 0, 0, ""), ("/a.txt", False, 10, 0, ".txt"), ("/b.png", False, 10, 0, ".png"),
+            ("/c.log", False, 0, 0, ".log"), ("/d.log", False, 500, 0, ".log")]
+    assert list(select_files(rows, max_size=100)) == [("/a.txt", 10)]
+
+
+def make_files(root, count):
+    files = []
+    for i in range(count):
+        path = root / f"f{i}.txt"
+        path.write_text(f"line one\nneedle {i}\n" if i % 3 == 0 else "nothing here\n")
+        files.append((str(path), path.stat().st_size))
+    return files
+
+
+def test_pool_search_and_recovery_from_a_dead_worker(tmp_path):
+    files = make_files(tmp_path, 100)
+    expected = {str(tmp_path / f"f{i}.txt"): [(2, f"needle {i}")] for i in range(0, 100, 3)}
+    searcher = ContentSearch(workers=2)
+    try:
+        assert dict(searcher.search(files, compile_pattern("needle"))) == expected
+        process = next(iter(searcher._pool._processes.values()))
+        os.kill(process.pid, signal.SIGKILL)
+        process.join(5)
+        with pytest.raises(BrokenProcessPool):
+            list(searcher.search(files, compile_pattern("needle")))
+        assert searcher._pool is None
+        assert dict(searcher.search(files, compile_pattern("needle"))) == expected
+    finally:
+        searcher.close(wait=True)
+
+
+def test_grep_uses_the_index(tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    make_files(root, 4)
+    (root / "photo.png").write_text("needle")
+    index = FileIndex(tmp_path / "index.db")
+    hits = organizer_core.grep(str(root), "NEEDLE", index=index)
+    assert sorted(m.path for m in hits) == [str(root / "f0.txt"), str(root / "f3.txt")]
@@ -0,0 +1,82 @@
+import os
+import sqlite3
+
+import digest
+from digest import DigestBuilder
+from file_index import FileIndex
+
+
+def make_tree(root):
+    for sub, names in {"docs": ["a.txt", "b.txt"], "src": ["main.py"]}.items():
+        (root / sub).mkdir(parents=True)
+        for name in names:
+            (root / sub / name).write_text(name * 10)
+
+
+def touch_dir(path, step):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + step * 10 ** 9))
+
+
+def rows(db):
+    with sqlite3.connect(db) as conn:
+        return sorted(conn.execute("SELECT path, kind FROM digests"))
+
+
+def test_digest_follows_index_changes(tmp_path):
+    root = tmp_path / "tree"
+    make_tree(root)
+    index = FileIndex(tmp_path / "index.db")
+    builder = DigestBuilder(index, tmp_path / "digests.db")
+
+    text = builder.build(root)
+    assert "Totals: 3 files, 2 folders" in text
+    assert ".txt 2" in text and "docs/" in text
+
+    (root / "docs" / "c.txt").write_text("c")
+    touch_dir(root / "docs", 1)
+    # Nothing told the index yet, so the remembered digest is still current
+    assert builder.build(root) == text
+    index.refresh(str(root))
+    assert "Totals: 4 files, 2 folders" in builder.build(root)
+
+
+def test_cache_keeps_one_row_per_path(tmp_path):
+    root = tmp_path / "tree"
+    make_tree(root)
+    index = FileIndex(tmp_path / "index.db")
+    db = tmp_path / "digests.db"
+    builder = DigestBuilder(index, db)
+    builder.build(root)
+    expected = [(str(root), "digest:800"), (str(root / "docs"), "subtree"),
+                (str(root / "src"), "subtree")]
+    assert rows(db) == expected
+
+    for step in range(1, 4):
+        (root / "docs" / f"new{step}.txt").write_text("x")
+        touch_dir(root / "docs", step)
+        assert f"Totals: {3 + step} files" in builder.build(root, max_age=0)
+    assert rows(db) == expected
+
+
+def test_old_cache_table_is_replaced(tmp_path):
+    db = tmp_path / "digests.db"
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE digests (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("INSERT INTO digests VALUES ('digest:abc:800', 'stale')")
+    root = tmp_path / "tree"
+    make_tree(root)
+    assert "Totals: 3 files" in DigestBuilder(FileIndex(tmp_path / "index.db"), db).build(root)
+
+
+def test_only_recent_roots_are_remembered(tmp_path, monkeypatch):
+    monkeypatch.setattr(digest, "RECENT_ROOTS", 2)
+    builder = DigestBuilder(FileIndex(tmp_path / "index.db"), tmp_path / "digests.db")
+    roots = []
+    for name in ["one", "two", "three"]:
+        root = tmp_path / name
+        make_tree(root)
+        builder.build(root)
+        roots.append(str(root))
+    assert list(builder._recent) == roots[1:]
+    assert set(builder._generations) == set(roots[1:])
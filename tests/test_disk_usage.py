@@ -0,0 +1,66 @@
+import os
+import shutil
+
+import disk_usage
+import organizer_core
+from disk_usage import DiskUsage, Usage
+from file_index import FileIndex
+
+
+def make_tree(root):
+    layout = {"a": {"x.bin": 100, "deep/y.bin": 1000, "deep/deeper/z.bin": 10},
+              "b": {"w.bin": 5}, "": {"top.bin": 1}}
+    for sub, files in layout.items():
+        for name, size in files.items():
+            path = root / sub / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"x" * size)
+
+
+def walk_usage(root):
+    """Rollups computed the slow way, straight from the filesystem"""
+    result = {}
+    for directory, dirs, files in os.walk(root, topdown=False):
+        total = Usage(sum(os.path.getsize(os.path.join(directory, f)) for f in files), len(files), len(dirs))
+        for d in dirs:
+            kid = result[os.path.join(directory, d)]
+            total = Usage(total.bytes + kid.bytes, total.files + kid.files, total.dirs + kid.dirs)
+        result[directory] = total
+    return result
+
+
+def touch_dir(path, step):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + step * 10 ** 9))
+
+
+def test_rollup_matches_a_walk_and_follows_changes(tmp_path):
+    root = tmp_path / "tree"
+    make_tree(root)
+    usage = DiskUsage(FileIndex(tmp_path / "index.db"))
+    assert usage.rollup(root) == walk_usage(str(root))
+    assert usage.rollup(root)[str(root)] == Usage(1116, 5, 4)
+
+    (root / "a" / "deep" / "deeper" / "new.bin").write_bytes(b"x" * 50)
+    touch_dir(root / "a" / "deep" / "deeper", 1)
+    shutil.rmtree(root / "b")
+    touch_dir(root, 1)
+    after = usage.rollup(root)
+    assert after == walk_usage(str(root))
+    assert after[str(root / "a")] == Usage(1160, 4, 2)
+    assert usage.cached([str(root / "b")]) == {}
+
+
+def test_bulk_rollup_gives_the_same_totals(tmp_path, monkeypatch):
+    root = tmp_path / "tree"
+    make_tree(root)
+    monkeypatch.setattr(disk_usage, "BULK_THRESHOLD", 0)
+    assert DiskUsage(FileIndex(tmp_path / "index.db")).rollup(root) == walk_usage(str(root))
+
+
+def test_largest_subdirectories_first(tmp_path):
+    root = tmp_path / "tree"
+    make_tree(root)
+    result = organizer_core.disk_usage(str(root), index=FileIndex(tmp_path / "index.db"), top=1)
+    assert (result["bytes"], result["files"], result["dirs"]) == (1116, 5, 4)
+    assert result["children"] == [{"bytes": 1110, "files": 3, "dirs": 2, "path": str(root / "a")}]
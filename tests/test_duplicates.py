@@ -0,0 +1,96 @@
+import os
+import zipfile
+
+import pytest
+
+from archives import ArchiveIndex
+from duplicates import DuplicateFinder, HashCache, resolve_duplicates
+
+
+@pytest.fixture
+def finder(tmp_path):
+    cache = HashCache(tmp_path / "hashes.db")
+    archives = ArchiveIndex(tmp_path / "archives.db")
+    yield DuplicateFinder(cache=cache, workers=1, archives=archives)
+    cache.close()
+    archives.close()
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_finds_copies_and_skips_unique_files(tmp_path, finder):
+    root = tmp_path / "tree"
+    big = os.urandom(20000)
+    a = write(root / "a.bin", big)
+    b = write(root / "sub" / "b.bin", big)
+    write(root / "c.bin", big[:-1] + b"x")           # same size and edges differ only at the end
+    small_a = write(root / "s1.txt", b"same")
+    small_b = write(root / "s2.txt", b"same")
+    groups = {tuple(g.paths) for g in finder.find(root)}
+    assert groups == {(a, b), (small_a, small_b)}
+
+
+def test_hardlinks_are_not_duplicates(tmp_path, finder):
+    root = tmp_path / "tree"
+    a = write(root / "a.txt", b"linked")
+    os.link(a, root / "b.txt")
+    assert finder.find(root) == []
+
+
+def test_archive_members_match_with_a_relative_root(tmp_path, finder, monkeypatch):
+    root = tmp_path / "tree"
+    on_disk = write(root / "inner.txt", b"inside and out")
+    (root / "a").mkdir()
+    with zipfile.ZipFile(root / "a" / "arc.zip", "w") as z:
+        z.writestr("inner.txt", b"inside and out")
+    monkeypatch.chdir(tmp_path)
+    groups = finder.find("tree")
+    assert [g.paths for g in groups] == [
+        [on_disk, os.path.join(str(root), "a", "arc.zip!", "inner.txt")]]
+
+
+def test_resolve_deletes_all_but_the_keeper(tmp_path, finder):
+    root = tmp_path / "tree"
+    paths = [write(root / name, b"dup" * 100) for name in ("a", "b", "c")]
+    groups = finder.find(root)
+    reclaimed, errors = resolve_duplicates(groups, keep={groups[0].digest: paths[1]})
+    assert (reclaimed, errors) == (600, [])
+    assert sorted(os.listdir(root)) == ["b"]
+
+
+def test_resolve_hardlinks_and_leaves_changed_files(tmp_path, finder):
+    root = tmp_path / "tree"
+    a, b, c = [write(root / name, b"dup" * 100) for name in ("a", "b", "c")]
+    groups = finder.find(root)
+    write(root / "c", b"changed since the scan")
+    reclaimed, errors = resolve_duplicates(groups, mode="hardlink")
+    assert reclaimed == 300
+    assert errors == [(c, "changed since scan")]
+    assert os.stat(a).st_ino == os.stat(b).st_ino != os.stat(c).st_ino
+    assert sorted(os.listdir(root)) == ["a", "b", "c"]
+
+
+def test_resolve_never_touches_archive_members(tmp_path, finder):
+    root = tmp_path / "tree"
+    on_disk = write(root / "inner.txt", b"only copy on disk")
+    with zipfile.ZipFile(root / "arc.zip", "w") as z:
+        z.writestr("inner.txt", b"only copy on disk")
+    groups = finder.find(root)
+    assert len(groups) == 1 and groups[0].wasted == 0
+    assert resolve_duplicates(groups) == (0, [])
+    assert os.path.exists(on_disk) and os.path.exists(root / "arc.zip")
+
+
+def test_cached_hashes_are_pruned_with_their_files(tmp_path, finder):
+    root = tmp_path / "tree"
+    write(root / "a", b"x" * 10)
+    b = write(root / "b", b"x" * 10)
+    finder.find(root)
+    os.remove(b)
+    assert finder.find(root) == []
+    rows = finder.cache._conn.execute("SELECT path FROM hashes").fetchall()
+    assert rows == [(str(root / "a"),)]
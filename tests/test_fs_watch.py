@@ -0,0 +1,58 @@
+import threading
+
+from fs_watch import DirectoryWatcher, FsEvent, _Coalescer
+
+
+def test_coalescer_merges_per_path_changes():
+    c = _Coalescer()
+    c.add("created", "/d/a")
+    c.add("modified", "/d/a")
+    c.add("created", "/d/b")
+    c.add("deleted", "/d/b")
+    c.add("deleted", "/d/c")
+    c.add("created", "/d/c")
+    assert c.flush() == [FsEvent("created", "/d/a", None), FsEvent("modified", "/d/c", None)]
+    assert c.flush() == []
+
+
+def test_coalescer_keeps_moves_in_arrival_order():
+    c = _Coalescer()
+    c.add("deleted", "/d/b")
+    c.add("moved", "/d/a", "/d/b")
+    c.add("modified", "/d/b")
+    assert c.flush() == [FsEvent("deleted", "/d/b", None), FsEvent("moved", "/d/a", "/d/b"),
+                         FsEvent("modified", "/d/b", None)]
+
+
+def test_coalescer_created_then_moved_is_created_at_target():
+    c = _Coalescer()
+    c.add("created", "/d/tmp")
+    c.add("moved", "/d/tmp", "/d/final")
+    c.add("rescan", "/d")
+    assert c.flush() == [FsEvent("created", "/d/final", None), FsEvent("rescan", "/d", None)]
+
+
+def test_polling_watcher_reports_changes(tmp_path):
+    (tmp_path / "old.txt").write_text("x")
+    received = []
+    seen = threading.Event()
+
+    def callback(events):
+        received.extend(events)
+        seen.set()
+
+    watcher = DirectoryWatcher(callback, coalesce=0.05, poll_interval=0.05, force_polling=True)
+    try:
+        watcher.watch(tmp_path)
+        (tmp_path / "new.txt").write_text("y")
+        (tmp_path / "old.txt").unlink()
+        assert seen.wait(5)
+        seen.clear()
+        while {e.kind for e in received} != {"created", "deleted"}:
+            assert seen.wait(5)
+            seen.clear()
+    finally:
+        watcher.close()
+    assert set(received) == {FsEvent("created", str(tmp_path / "new.txt"), None),
+                             FsEvent("deleted", str(tmp_path / "old.txt"), None)}
+    assert not watcher._thread.is_alive()
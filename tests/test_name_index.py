@@ -0,0 +1,56 @@
+from name_index import TrigramIndex
+
+
+def build(names):
+    index = TrigramIndex()
+    for name in names:
+        index.add(f"/root/{name}", name.lower())
+    return index
+
+
+def paths(index, ids, snapshot):
+    return [snapshot[0][i] for i in ids]
+
+
+def test_substring_matches_trigrams_and_short_queries():
+    index = build(["report.txt", "Reporter.py", "notes.md", "re.txt"])
+    snapshot = index.snapshot()
+    assert paths(index, index.substring("report", snapshot), snapshot) == [
+        "/root/report.txt", "/root/Reporter.py"]
+    assert paths(index, index.substring("re", snapshot), snapshot) == [
+        "/root/report.txt", "/root/Reporter.py", "/root/re.txt"]
+    assert list(index.substring("missing", snapshot)) == []
+
+
+def test_renamed_and_removed_names_stop_matching():
+    index = build(["alpha.txt", "beta.txt"])
+    index.add("/root/alpha.txt", "gamma.txt")
+    index.remove("/root/beta.txt")
+    snapshot = index.snapshot()
+    assert list(index.substring("alpha", snapshot)) == []
+    assert list(index.substring("beta", snapshot)) == []
+    assert paths(index, index.substring("gamma", snapshot), snapshot) == ["/root/alpha.txt"]
+    assert len(index) == 1
+
+
+def test_fuzzy_finds_typos_and_transpositions():
+    index = build(["invoice_2023.pdf", "holiday.jpg", "invoices.csv"])
+    snapshot = index.snapshot()
+    found = [snapshot[0][i] for _, i in index.fuzzy("invioce", snapshot, lambda i: True, 5)]
+    assert "/root/invoice_2023.pdf" in found
+    assert "/root/holiday.jpg" not in found
+
+
+def test_compaction_keeps_old_snapshots_consistent():
+    index = build([f"file{i}.txt" for i in range(30000)])
+    before = index.snapshot()
+    for i in range(20000):
+        index.remove(f"/root/file{i}.txt")
+    after = index.snapshot()
+    assert after is not before and len(after[0]) < len(before[0])
+    # A reader holding the old snapshot still gets ids that agree with its names
+    for snapshot in (before, after):
+        hits = paths(index, index.substring("file29999", snapshot), snapshot)
+        assert hits == ["/root/file29999.txt"]
+    assert list(index.substring("file00", after)) == []
+    assert len(index) == 10000
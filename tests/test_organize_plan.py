@@ -0,0 +1,125 @@
+import os
+import threading
+
+import organize_plan
+from organize_plan import (Journal, build_plan, execute, incomplete_journal, journals, resume, undo,
+                           undoable_journal)
+
+
+def categorize(entry):
+    return {".txt": "Documents", ".png": "Images"}.get(entry.ext)
+
+
+def make_files(root, names):
+    for name in names:
+        (root / name).write_text(name)
+
+
+def test_execute_then_undo_restores_every_file(tmp_path):
+    root, journal_dir = tmp_path / "root", tmp_path / "journals"
+    root.mkdir()
+    make_files(root, ["a.txt", "b.txt", "c.png", "notes"])
+
+    plan = build_plan(str(root), categorize)
+    assert len(plan) == 3
+    journal = Journal.create(plan, journal_dir)
+    moved, errors = execute(plan, journal, workers=2)
+    assert (moved, errors) == (3, [])
+    assert sorted(os.listdir(root)) == ["Documents", "Images", "notes"]
+    assert incomplete_journal(str(root), journal_dir) is None
+
+    restored, errors = undo(journal.path)
+    assert (restored, errors) == (3, [])
+    assert sorted(os.listdir(root)) == ["a.txt", "b.txt", "c.png", "notes"]
+    assert (root / "c.png").read_text() == "c.png"
+    # Fully undone journals are removed, so there is nothing left to undo or resume
+    assert not journal.path.exists()
+    assert undoable_journal(str(root), journal_dir) is None
+
+
+def test_undo_of_a_cancelled_run_moves_back_only_what_moved(tmp_path):
+    root, journal_dir = tmp_path / "root", tmp_path / "journals"
+    root.mkdir()
+    make_files(root, ["a.txt", "b.txt"])
+    plan = build_plan(str(root), categorize)
+    journal = Journal.create(plan, journal_dir)
+    # Simulate an interruption after the first move
+    first = plan.moves[0]
+    os.makedirs(os.path.dirname(first.target))
+    os.rename(first.source, first.target)
+    journal.write({"op": "moved", "source": first.source, "target": first.target})
+    journal.close()
+    assert incomplete_journal(str(root), journal_dir) == journal.path
+
+    restored, errors = undo(journal.path)
+    assert (restored, errors) == (1, [])
+    assert sorted(os.listdir(root)) == ["a.txt", "b.txt"]
+
+
+def test_journals_created_together_stay_separate(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    make_files(root, ["a.txt"])
+    plan = build_plan(str(root), categorize)
+    first = Journal.create(plan, tmp_path)
+    second = Journal.create(plan, tmp_path)
+    first.close()
+    second.close()
+    assert first.path != second.path
+    assert len(journals(tmp_path, root)) == 2
+    assert Journal(first.path).read()[0].moves == plan.moves
+
+
+def test_resume_finishes_an_interrupted_run(tmp_path):
+    root, journal_dir = tmp_path / "root", tmp_path / "journals"
+    root.mkdir()
+    make_files(root, ["a.txt", "b.txt", "c.png"])
+    plan = build_plan(str(root), categorize)
+    journal = Journal.create(plan, journal_dir)
+    cancel = threading.Event()
+
+    def stop_after_first(done, total):
+        cancel.set()
+
+    moved, errors = execute(plan, journal, workers=1, progress=stop_after_first, cancel=cancel)
+    assert (moved, errors) == (1, [])
+    assert incomplete_journal(str(root), journal_dir) == journal.path
+
+    moved, errors = resume(journal.path, workers=2)
+    assert (moved, errors) == (2, [])
+    assert sorted(os.listdir(root)) == ["Documents", "Images"]
+    _, done, complete = Journal(journal.path).read()
+    assert complete and len(done) == 3
+    assert incomplete_journal(str(root), journal_dir) is None
+    assert undoable_journal(str(root), journal_dir) == journal.path
+
+
+def test_journals_are_listed_per_root_without_reading_them(tmp_path):
+    journal_dir = tmp_path / "journals"
+    roots = [tmp_path / "one", tmp_path / "two"]
+    for root in roots:
+        root.mkdir()
+        make_files(root, ["a.txt"])
+        Journal.create(build_plan(str(root), categorize), journal_dir).close()
+    for path in journals(journal_dir, roots[1]):
+        path.write_text("not json\n")
+
+    assert len(journals(journal_dir)) == 2
+    [path] = journals(journal_dir, roots[0])
+    assert Journal(path).read()[0].root == str(roots[0])
+
+
+def test_only_the_newest_journals_of_a_root_are_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(organize_plan, "KEEP_JOURNALS", 2)
+    root, other = tmp_path / "root", tmp_path / "other"
+    for directory in (root, other):
+        directory.mkdir()
+        make_files(directory, ["a.txt"])
+    Journal.create(build_plan(str(other), categorize), tmp_path).close()
+    created = []
+    for _ in range(4):
+        journal = Journal.create(build_plan(str(root), categorize), tmp_path)
+        journal.close()
+        created.append(journal.path)
+    assert set(journals(tmp_path, root)) == set(created[-2:])
+    assert len(journals(tmp_path, other)) == 1
@@ -0,0 +1,86 @@
+import os
+import time
+
+import pytest
+
+import organizer_core
+from organize_plan import build_plan
+from rules import RuleSet, parse_size
+
+NOW = 1_700_000_000.0
+DAY = 86400
+
+RULES = [
+    {"category": "screenshots", "glob": ["Screenshot*.png"], "priority": 10},
+    {"category": "big_videos", "extensions": [".mp4", "mkv"], "min_size": "100MB"},
+    {"category": "old_downloads", "path_prefix": ["/home/u/Downloads"], "older_than_days": 30},
+    {"category": "recent", "newer_than_days": 1, "priority": -1},
+]
+CATEGORIES = {"images": [".png", ".jpg"], "videos": [".mp4"]}
+
+
+@pytest.fixture
+def rules():
+    return RuleSet(RULES, CATEGORIES, now=NOW)
+
+
+def test_parse_size():
+    assert parse_size(10) == 10
+    assert parse_size("500KB") == 500 * 1024
+    assert parse_size("1.5 GB") == int(1.5 * 1024 ** 3)
+    with pytest.raises(ValueError):
+        parse_size("ten")
+
+
+@pytest.mark.parametrize("path,size,mtime,expected", [
+    ("/x/Screenshot 2024.png", 10, NOW - 90 * DAY, "screenshots"),       # priority beats the map
+    ("/x/screenshot.PNG", 10, NOW - 90 * DAY, "screenshots"),            # globs ignore case
+    ("/x/photo.png", 10, NOW - 90 * DAY, "images"),
+    ("/x/film.MKV", 200 * 1024 ** 2, NOW - 90 * DAY, "big_videos"),
+    ("/x/film.mp4", 100 * 1024 ** 2 - 1, NOW - 90 * DAY, "videos"),      # just under min_size
+    ("/home/u/Downloads/setup.exe", 1, NOW - 31 * DAY, "old_downloads"),
+    ("/home/u/Downloads/sub/a.exe", 1, NOW - 31 * DAY, "old_downloads"),
+    ("/home/u/Downloads2/a.exe", 1, NOW - 31 * DAY, "others"),           # not under the prefix
+    ("/home/u/Downloads/setup.exe", 1, NOW - 2 * DAY, "others"),
+    ("/x/notes.txt", 1, NOW - 3600, "recent"),
+    ("/x/photo.png", 1, NOW - 3600, "recent"),                          # any rule beats the map
+    ("/x/notes.txt", 1, NOW - 90 * DAY, "others"),
+])
+def test_classify(rules, path, size, mtime, expected):
+    assert rules.classify(path, size, mtime) == expected
+
+
+def test_extension_only_lookup_ignores_conditional_rules(rules):
+    assert rules.category_for_extension(".PNG") == "images"
+    assert rules.category_for_extension(".mkv") == "others"
+    assert rules.needs_stat
+
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError, match="unknown keys"):
+        RuleSet([{"category": "a", "colour": "red"}])
+    with pytest.raises(ValueError, match="missing category"):
+        RuleSet([{"extensions": [".a"]}])
+
+
+def test_plan_moves_files_by_rule(tmp_path):
+    rules = RuleSet(RULES, CATEGORIES)
+    for name in ("Screenshot 1.png", "photo.png", "notes.txt"):
+        (tmp_path / name).write_bytes(b"x")
+    for name in ("photo.png", "notes.txt"):
+        os.utime(tmp_path / name, (time.time() - 90 * DAY,) * 2)
+    plan = build_plan(str(tmp_path), rules.classify_entry, stat=rules.needs_stat)
+    targets = {os.path.basename(m.source): os.path.relpath(m.target, tmp_path) for m in plan.moves}
+    assert targets == {"Screenshot 1.png": os.path.join("screenshots", "Screenshot 1.png"),
+                       "photo.png": os.path.join("images", "photo.png"),
+                       "notes.txt": os.path.join("others", "notes.txt")}
+
+
+def test_compiled_rules_are_reused_per_config(monkeypatch):
+    config = {"rules": RULES, "file_categories": CATEGORIES}
+    first = organizer_core.compile_rules(config)
+    assert organizer_core.compile_rules(config) is first
+    assert organizer_core.get_file_category(config, ".jpg") == "images"
+    assert organizer_core.compile_rules(dict(config)) is not first
+    monkeypatch.setattr(organizer_core, "RULES_MAX_AGE", 0)
+    assert organizer_core.compile_rules(config) is not first
@@ -0,0 +1,71 @@
+import datetime
+import os
+
+import pytest
+
+from organizer_core import DEFAULT_CONFIG
+from scaffold import Scaffolder, preview, read_projects, render
+
+
+@pytest.fixture
+def scaffolder(tmp_path):
+    return Scaffolder(DEFAULT_CONFIG["project_templates"], cache_dir=tmp_path / "cache", workers=2)
+
+
+def test_generate_renders_variables_and_keeps_existing_files(tmp_path, scaffolder):
+    location = tmp_path / "src"
+    root = scaffolder.generate("My Tool", "python", location, {"description": "Does things"})
+    assert root == location / "My Tool"
+    assert (root / "src" / "my_tool" / "__init__.py").read_text().startswith('"""My Tool"""')
+    assert (root / "README.md").read_text() == "# My Tool\n\nDoes things\n"
+    assert (root / "tests").is_dir() and (root / "docs").is_dir()
+    cached = next((tmp_path / "cache").glob("python-*"))
+    assert (root / ".gitignore").read_text() == (cached / ".gitignore").read_text() != ""
+
+    (root / "README.md").write_text("mine")
+    scaffolder.generate("My Tool", "python", location)
+    assert (root / "README.md").read_text() == "mine"
+
+
+def test_hardlinked_static_files_share_the_cached_copy(tmp_path):
+    scaffolder = Scaffolder({"web": DEFAULT_CONFIG["project_templates"]["web"]},
+                            cache_dir=tmp_path / "cache", link="hardlink")
+    roots, errors = scaffolder.generate_many(["one", "two"], "web", tmp_path / "out")
+    assert errors == []
+    first, second = (os.stat(root / "css" / "style.css") for root in roots)
+    assert first.st_ino == second.st_ino and first.st_nlink == 3
+    # Files with variables are written per project
+    assert "<title>two</title>" in (roots[1] / "index.html").read_text()
+    assert os.stat(roots[0] / "index.html").st_nlink == 1
+
+
+def test_batch_from_csv_with_extra_variables(tmp_path, scaffolder):
+    batch = tmp_path / "students.csv"
+    batch.write_text("Name, Description\nalice,First\n,skipped\nbob,Second\n")
+    projects = read_projects(batch)
+    assert projects == [{"name": "alice", "description": "First"}, {"name": "bob", "description": "Second"}]
+
+    counts = []
+    roots, errors = scaffolder.generate_many(projects + [".."], "python", tmp_path / "out",
+                                             progress=lambda done, total: counts.append(total))
+    assert [root.name for root in roots] == ["alice", "bob"]
+    assert errors == [("..", "invalid project name")]
+    assert counts == [8] * 8
+    assert (roots[1] / "README.md").read_text() == "# bob\n\nSecond\n"
+    year = str(datetime.date.today().year)
+    assert render([("LICENSE", "(c) ${year}")], {"year": year}) == [("LICENSE", f"(c) {year}")]
+
+
+def test_template_paths_stay_inside_the_project():
+    with pytest.raises(ValueError, match="leaves the project"):
+        render([("../${name}.txt", "")], {"name": "x"})
+    with pytest.raises(ValueError, match="Unknown link mode"):
+        Scaffolder({}, link="symlink")
+
+
+def test_preview_limits_depth_and_entries(tmp_path):
+    (tmp_path / "a" / "b" / "c").mkdir(parents=True)
+    for i in range(3):
+        (tmp_path / f"f{i}.txt").write_text("")
+    assert preview(tmp_path, max_depth=2, max_entries=3).splitlines() == [
+        "📁 a", "  📁 b", "📄 f0.txt", "📄 f1.txt", "… 1 more"]
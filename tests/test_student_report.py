@@ -0,0 +1,56 @@
+import pandas as pd
+
+from student_report import StudentReport, report
+
+
+def chunk(rows, **marks):
+    frame = pd.DataFrame({"roll no": [r[0] for r in rows], "Name": [f"s{r[0]}" for r in rows],
+                          "Class": [r[1] for r in rows], "School Name": ["S"] * len(rows)})
+    for subject, values in marks.items():
+        frame[f"Marks.{subject}"] = values
+    return frame
+
+
+def test_chunks_with_different_subjects():
+    first = chunk([(1, "8"), (2, "8")], Maths=[50, 20], Science=[40, 60])
+    second = chunk([(3, "8")], Maths=[70])
+    third = chunk([(4, "9")], Maths=[90], Science=[35], Art=[80])
+    result = report([first, second, third])
+    assert result.subjects == ["Marks.Maths", "Marks.Science", "Marks.Art"]
+
+    stats = result.group_stats("class")
+    eight, nine = stats.loc[("S", "8")], stats.loc[("S", "9")]
+    assert eight["students"] == 3 and eight["all_passed"] == 2
+    assert (eight["Marks.Maths passed"], eight["Marks.Maths failed"]) == (2, 1)
+    assert (eight["Marks.Science passed"], eight["Marks.Science failed"]) == (2, 0)
+    assert eight["Marks.Maths median"] == 50
+    assert pd.isna(eight["Marks.Art mean"]) and nine["Marks.Art mean"] == 80
+
+    ranks = result.ranks(second)
+    assert ranks["Marks.Maths rank"].tolist() == [1]
+    assert ranks["Marks.Science rank"].isna().all()
+
+
+def test_explicit_subjects_ignore_other_columns():
+    frame = chunk([(1, "8"), (2, "8")], Maths=[50, 20], Art=[90, 10])
+    result = StudentReport(subjects=["Marks.Maths"]).add(frame)
+    assert result.subjects == ["Marks.Maths"]
+    assert "Marks.Art mean" not in result.group_stats("school").columns
+    assert result.top_students("Total")["roll no"].tolist() == [1, 2]
+
+
+def test_text_marks_count_as_not_graded():
+    frame = chunk([(1, "8"), (2, "8")], Maths=[50, "AB"])
+    stats = report([frame]).group_stats("school").iloc[0]
+    assert (stats["Marks.Maths passed"], stats["Marks.Maths failed"]) == (1, 0)
+    assert stats["Marks.Maths mean"] == 50
+
+
+def test_missing_subject_is_skipped_for_all_passed():
+    first = chunk([(1, "8"), (2, "8")], Maths=[50, 60], Science=[40, None])
+    second = chunk([(3, "8")], Maths=[20])
+    third = chunk([(4, "8")], Science=[None])
+    stats = report([first, second, third]).group_stats("class").loc[("S", "8")]
+    # 1 passes both, 2 has no Science mark, 3 fails Maths, 4 has no marks at all
+    assert stats["students"] == 4 and stats["all_passed"] == 2
+    assert (stats["Marks.Science passed"], stats["Marks.Science failed"]) == (1, 0)
@@ -0,0 +1,101 @@
+import json
+
+import pandas as pd
+import pytest
+
+from students import concat, iter_frames, iter_records, load_students
+
+
+def student(i, **extra):
+    record = {"roll no": i, "Name": f"Student {i}", "Class": f"{i % 3 + 8}",
+              "School Name": f"School {i % 2}",
+              "Marks": {"Maths": i % 100, "Science": (i * 7) % 100}}
+    record.update(extra)
+    return record
+
+
+@pytest.fixture
+def export(tmp_path):
+    records = [student(i) for i in range(250)]
+    records[10]["Marks"]["Art"] = 55                # a subject only some students have
+    del records[20]["Marks"]["Science"]             # and a missing mark
+    path = tmp_path / "script.json"
+    path.write_text(json.dumps({"School Year": "2024", "Student": records}, indent=1))
+    return path, records
+
+
+def test_records_stream_across_small_reads(export):
+    path, records = export
+    # A read size smaller than one record forces every value to span several reads
+    assert list(iter_records(path, chunk_bytes=7)) == records
+    assert list(iter_records(path)) == records
+
+
+def test_bare_arrays_and_empty_exports(tmp_path):
+    path = tmp_path / "bare.json"
+    path.write_text(json.dumps([student(1), student(2)]))
+    assert [r["roll no"] for r in iter_records(path)] == [1, 2]
+    path.write_text('{"Student": []}')
+    assert list(iter_records(path)) == []
+
+
+def test_frames_match_json_normalize(export):
+    path, records = export
+    frame = load_students(path, chunk_rows=64, cache=None)
+    expected = pd.json_normalize(records)
+    assert list(frame.columns) == list(expected.columns)
+    assert len(frame) == 250
+    assert frame["Class"].dtype == "category" and frame["School Name"].dtype == "category"
+    for name in expected.columns:
+        left = frame[name].astype(object).where(frame[name].notna(), None).tolist()
+        right = expected[name].astype(object).where(expected[name].notna(), None).tolist()
+        if name.startswith("Marks.") or name == "roll no":
+            left = [None if v is None else float(v) for v in left]
+            right = [None if v is None else float(v) for v in right]
+        assert left == right, name
+
+
+def test_chunks_concatenate_to_one_frame(export):
+    path, _ = export
+    chunks = list(iter_frames(path, chunk_rows=100))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    assert concat(chunks)["School Name"].dtype == "category"
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather"])
+def test_sidecar_cache_is_reused_and_refreshed(export, fmt):
+    pytest.importorskip("pyarrow")
+    path, records = export
+    first = load_students(path, cache=fmt)
+    sidecars = list(path.parent.glob(f".script.json.*.{fmt}"))
+    assert len(sidecars) == 1
+    pd.testing.assert_frame_equal(load_students(path, cache=fmt), first)
+
+    records.append(student(999))
+    path.write_text(json.dumps({"Student": records}))
+    assert len(load_students(path, cache=fmt)) == 251
+    assert len(list(path.parent.glob(f".script.json.*.{fmt}"))) == 1
+
+
+def test_integers_with_gaps_stay_exact(tmp_path):
+    records = [student(2 ** 30 + i) for i in range(10)]
+    records[3]["roll no"] = None
+    del records[4]["Marks"]["Science"]
+    path = tmp_path / "script.json"
+    path.write_text(json.dumps({"Student": records}))
+    frame = load_students(path, chunk_rows=4, cache=None)
+    assert str(frame["roll no"].dtype) == "Int32"
+    assert str(frame["Marks.Science"].dtype) == "Int8"
+    assert str(frame["Marks.Maths"].dtype) == "int8"
+    assert frame["roll no"].iloc[9] == 2 ** 30 + 9
+    assert frame["roll no"].isna().tolist() == [i == 3 for i in range(10)]
+
+
+def test_text_marks_are_kept_like_json_normalize(tmp_path):
+    records = [student(i) for i in range(10)]
+    records[7]["Marks"]["Maths"] = "AB"
+    path = tmp_path / "script.json"
+    path.write_text(json.dumps({"Student": records}))
+    frame = load_students(path, chunk_rows=4, cache=None)
+    assert frame["Marks.Maths"].tolist() == pd.json_normalize(records)["Marks.Maths"].tolist()
+    assert str(frame["Marks.Science"].dtype) == "int8"